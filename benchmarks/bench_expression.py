@@ -0,0 +1,24 @@
+## ExprTNode.evaluate at 10^3 up to 10^7 points (10^8 with --full).
+
+import numpy as np
+from plotter.services.parser import Parser
+from .common import Case
+
+
+EXPRESSION = "3*x^3 - 2*x^2 + x/(x^2 + 1) - 7"
+
+
+def cases(full=False):
+    tree = Parser().parse(EXPRESSION)
+    max_exp = 8 if full else 7
+
+    for exp in range(3, max_exp + 1):
+        n = 10 ** exp
+        state = {}
+
+        def setup(n=n, state=state):
+            state['x'] = np.linspace(-10, 10, n)
+
+        yield Case(f"expression.evaluate[1e{exp}]",
+                   lambda state=state: tree.evaluate(state['x']),
+                   setup=setup, points=n)
@@ -0,0 +1,23 @@
+## Parser.parse throughput on generated expressions of growing length and
+## nesting depth.
+
+from plotter.services.parser import Parser
+from .common import Case, sum_expression, nested_expression
+
+
+def cases(full=False):
+    parser = Parser()
+    lengths = [10, 100, 1000] + ([10000] if full else [])
+    depths = [10, 50, 200]
+
+    for n in lengths:
+        string = sum_expression(n)
+        yield Case(f"parser.parse.length[{n}]",
+                   lambda string=string: parser.parse(string),
+                   chars=len(string))
+
+    for depth in depths:
+        string = nested_expression(depth)
+        yield Case(f"parser.parse.depth[{depth}]",
+                   lambda string=string: parser.parse(string),
+                   chars=len(string))
@@ -0,0 +1,40 @@
+## Plotter.plot end to end: range validation, grid generation and evaluation,
+## with automatic backend selection and with every backend forced. Also
+## Plotter.evaluate_at on unsorted x values, into a preallocated buffer.
+
+import numpy as np
+from plotter.services.parser import Parser
+from plotter.services.plotter import Plotter
+from plotter.services.backends import available_backends, default_selector
+from .common import Case
+
+
+EXPRESSION = "3*x^3 - 2*x^2 + x/(x^2 + 1) - 7"
+
+
+def cases(full=False):
+    tree = Parser().parse(EXPRESSION)
+    plotter = Plotter()
+    sizes = [1000, 100000] + ([10000000] if full else [])
+
+    for n in sizes:
+        yield Case(f"plotter.plot[{n}]",
+                   lambda n=n: plotter.plot(tree, -10, 10, x_tick_frequency=n),
+                   # calibrate before timing, not during the first call
+                   setup=lambda n=n: default_selector().select(tree, n),
+                   points=n)
+
+    for name in available_backends():
+        for n in sizes:
+            yield Case(f"plotter.plot.{name}[{n}]",
+                       lambda n=n, name=name: plotter.plot(
+                           tree, -10, 10, x_tick_frequency=n, backend=name),
+                       points=n, backend=name)
+
+    for n in sizes:
+        x = np.random.default_rng(0).uniform(-10, 10, n)
+        out = np.empty(n)
+        yield Case(f"plotter.evaluate_at[{n}]",
+                   lambda x=x, out=out: plotter.evaluate_at(tree, x, out=out),
+                   setup=lambda n=n: default_selector().select(tree, n),
+                   points=n)
@@ -0,0 +1,64 @@
+## Offscreen MplCanvasWidget.render_plot latency, skipped when Qt can't be
+## loaded, the time for the background RenderWorker to rasterize a plot to an
+## RGBA buffer, and the decimation of curves for the QPainter renderer.
+
+import os
+from functools import partial
+import numpy as np
+from plotter.views.drawing import draw_plot
+from plotter.views.geometry import decimate
+from .common import Case, BenchmarkSkipped
+
+
+_app = None
+
+
+def _create_widget():
+    global _app
+
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PySide2.QtWidgets import QApplication
+        from plotter.views.mplwidget import MplCanvasWidget
+    except ImportError as e:
+        raise BenchmarkSkipped(f"Qt is not available: {e}")
+
+    _app = QApplication.instance() or QApplication([])
+    widget = MplCanvasWidget()
+    widget.resize(640, 480)
+    return widget
+
+
+def cases(full=False):
+    state = {}
+
+    for n in [1000, 100000] + ([1000000] if full else []):
+        def setup(n=n):
+            if 'widget' not in state:
+                state['widget'] = _create_widget()
+            state['x'] = np.linspace(-10, 10, n)
+            state['y'] = np.sin(state['x'])
+
+        yield Case(f"render.render_plot[{n}]",
+                   lambda: state['widget'].render_plot(state['x'],
+                                                       state['y']),
+                   setup=setup, points=n)
+
+    for n in [1000, 100000] + ([1000000] if full else []):
+        def setup_worker(n=n):
+            from plotter.views.renderworker import RenderWorker
+            if 'worker' not in state:
+                state['worker'] = RenderWorker()
+            x = np.linspace(-10, 10, n)
+            state['scene'] = [partial(draw_plot, x=x, y=np.sin(x))]
+
+        yield Case(f"render.worker[{n}]",
+                   lambda: state['worker'].submit(state['scene'], 640,
+                                                  480)[1].result(),
+                   setup=setup_worker, points=n)
+
+    for n in [100000] + ([10000000] if full else []):
+        x = np.linspace(-10, 10, n)
+        y = np.sin(x)
+        yield Case(f"render.decimate[{n}]",
+                   lambda x=x, y=y: decimate(x, y, -10, 10, 1000), points=n)
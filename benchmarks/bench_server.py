@@ -0,0 +1,176 @@
+## Throughput of the HTTP/JSON server under a local load client. Each case
+## starts a server on a free port in a background thread and times bursts of
+## concurrent requests, which exercises the queue, the micro-batching and the
+## deduplication of identical requests.
+##
+## The load client can also be run against a server started separately:
+##     python -m plotter.server --port 8000
+##     python -m benchmarks.bench_server --port 8000 -n 2000 -c 32
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+from .common import Case
+
+
+async def _send(reader, writer, path, data):
+    """
+    Sends a request on a keep-alive connection and reads the response.
+
+    Returns
+    -------
+    status : int
+        The HTTP status of the response
+    """
+
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode('latin-1') +
+                 data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def load(port, requests, concurrency, host='127.0.0.1'):
+    """
+    Sends requests over concurrent keep-alive connections.
+
+    Parameters
+    ----------
+    port : int
+        The port of the server
+    requests : list((str, dict))
+        The path and JSON body of every request
+    concurrency : int
+        The number of connections, each sends its share of the requests one
+        after the other
+    host : str
+        The address of the server. Defaults to localhost.
+
+    Returns
+    -------
+    results : list((int, float))
+        The status and latency in seconds of every request
+    """
+
+    async def connection(share):
+        reader, writer = await asyncio.open_connection(host, port)
+        results = []
+        try:
+            for path, fields in share:
+                start = time.perf_counter()
+                status = await _send(reader, writer, path,
+                                     json.dumps(fields).encode('utf-8'))
+                results.append((status, time.perf_counter() - start))
+        finally:
+            writer.close()
+        return results
+
+    shares = [requests[i::concurrency] for i in range(concurrency)]
+    done = await asyncio.gather(*[connection(share) for share in shares
+                                  if share])
+    return [result for results in done for result in results]
+
+
+class _BackgroundServer(object):
+    """
+    A PlotServer running on its own event loop in a daemon thread.
+    """
+
+    def __init__(self, **kwargs):
+        from plotter.server import PlotServer
+
+        self.loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        thread.start()
+        self.server = PlotServer(**kwargs)
+        self.port = asyncio.run_coroutine_threadsafe(
+            self.server.start(), self.loop).result()
+
+
+def _plot(expression, points=1000):
+    return '/plot', {'expression': expression, 'x_min': -10, 'x_max': 10,
+                     'points': points}
+
+
+def cases(full=False):
+    state = {}
+
+    def setup():
+        if 'server' not in state:
+            # large enough that the bursts below are never rejected
+            state['server'] = _BackgroundServer(max_queue=1024)
+
+    def burst(requests, concurrency):
+        def run():
+            asyncio.run(load(state['server'].port, requests, concurrency))
+        return run
+
+    bursts = [
+        ('parse', [('/parse', {'expression': "3*x^3 - 2*x^2 + x - 7"})] * 32,
+         1),
+        ('plot.same', [_plot("x^2 + 1")] * 64, 32),
+        ('plot.distinct', [_plot(f"x^2 + {i}") for i in range(64)], 32),
+        ('render', [('/render', {'expression': f"x^{i % 4}", 'x_min': -1,
+                                 'x_max': 1})
+                    for i in range(8)], 8),
+    ]
+    if full:
+        bursts.append(('plot.distinct.large',
+                       [_plot(f"x^2 + {i}", 100000) for i in range(64)], 32))
+
+    for name, requests, concurrency in bursts:
+        yield Case(f"server.{name}[{len(requests)}x{concurrency}]",
+                   burst(requests, concurrency), setup=setup,
+                   requests=len(requests), concurrency=concurrency)
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks."
+                                              "bench_server")
+    arg_parser.add_argument('--host', default='127.0.0.1')
+    arg_parser.add_argument('-p', '--port', type=int, default=8000)
+    arg_parser.add_argument('-n', '--requests', type=int, default=1000,
+                            help="total requests to send")
+    arg_parser.add_argument('-c', '--concurrency', type=int, default=32,
+                            help="concurrent connections")
+    arg_parser.add_argument('--distinct', type=int, default=16,
+                            help="number of different expressions sent")
+    arg_parser.add_argument('--points', type=int, default=1000)
+    args = arg_parser.parse_args(argv)
+
+    requests = [_plot(f"x^2 + {i % args.distinct}", args.points)
+                for i in range(args.requests)]
+    start = time.perf_counter()
+    results = asyncio.run(load(args.port, requests, args.concurrency,
+                               args.host))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for status, latency in results
+                       if status == 200)
+    statuses = {}
+    for status, latency in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    print(f"{len(results) / elapsed:10.1f} requests/s")
+    print(f"statuses: {statuses}")
+    if latencies:
+        for percentile in (50, 90, 99):
+            index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+            print(f"p{percentile}: {latencies[index] * 1e3:8.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+## Shared helpers for the benchmark suite: the benchmark case type, the timer
+## and generators for test expressions.
+
+
+class BenchmarkSkipped(Exception):
+    pass
+
+
+class Case(object):
+    """
+    A single benchmark case: a named callable timed by the runner.
+    """
+
+    def __init__(self, name, func, setup=None, **meta):
+        """
+        Parameters
+        ----------
+        name : str
+            The unique name of the case, e.g. 'parser.parse.length[100]'
+        func : () -> None
+            The function to time
+        setup : () -> None
+            Called once before timing, may raise BenchmarkSkipped
+        meta
+            Extra values stored with the results, e.g. the input size
+        """
+
+        self.name = name
+        self.func = func
+        self.setup = setup
+        self.meta = meta
+
+
+def time_case(case, min_time=0.2, repeat=5):
+    """
+    Times a case. The number of calls per measurement is chosen so that one
+    measurement takes at least min_time / repeat seconds.
+
+    Returns
+    -------
+    result : dict
+        'min' and 'median' seconds per call, 'calls' per measurement and the
+        case's meta values
+    """
+
+    import time
+    import statistics
+
+    if case.setup is not None:
+        case.setup()
+
+    # warm up and find how many calls fit in one measurement
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            case.func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeat or calls >= 1 << 20:
+            break
+        calls *= 2 if elapsed == 0 else max(2, int(min_time / repeat /
+                                                   elapsed) + 1)
+
+    times = [elapsed / calls]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(calls):
+            case.func()
+        times.append((time.perf_counter() - start) / calls)
+
+    result = {'min': min(times), 'median': statistics.median(times),
+              'calls': calls}
+    result.update(case.meta)
+    return result
+
+
+def sum_expression(n_terms):
+    """
+    Returns
+    -------
+    expression : str
+        A flat expression with n_terms terms, e.g. 'x*1 + x^2 - 3/x ...'
+    """
+
+    ops = ['+', '-']
+    terms = ['x*1.5', 'x^2', '3/x', '-x', '(x+2)']
+    parts = [terms[0]]
+    for i in range(1, n_terms):
+        parts.append(ops[i % 2])
+        parts.append(terms[i % len(terms)])
+    return ' '.join(parts)
+
+
+def nested_expression(depth):
+    """
+    Returns
+    -------
+    expression : str
+        An expression nested depth parentheses deep, e.g. '((x+1)*2+1)*2'
+    """
+
+    expression = 'x'
+    for i in range(depth):
+        expression = f"({expression}+1)*{1 + (i % 3)}"
+    return expression
@@ -0,0 +1,152 @@
+## Runs the benchmark suite, writes the results as JSON and compares them to a
+## stored baseline. Exits with status 1 if any case regressed.
+##
+## Usage:
+##     python -m benchmarks.run                    # run and compare
+##     python -m benchmarks.run --save-baseline    # run and store a baseline
+##     python -m benchmarks.run -k parser --full   # filter, largest sizes
+
+import os
+import sys
+import json
+import argparse
+import platform
+import importlib
+from .common import BenchmarkSkipped, time_case
+
+
+# benchmark modules, each has a cases(full=False) generator
+MODULES = [
+    'benchmarks.bench_parser',
+    'benchmarks.bench_expression',
+    'benchmarks.bench_plotter',
+    'benchmarks.bench_render',
+    'benchmarks.bench_server',
+]
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def run(filter_=None, full=False, min_time=0.2, out=sys.stdout):
+    """
+    Runs all benchmark cases whose name contains filter_.
+
+    Returns
+    -------
+    results : dict(str, dict)
+        Maps case names to their timing results
+    """
+
+    results = {}
+    for module_name in MODULES:
+        module = importlib.import_module(module_name)
+        for case in module.cases(full=full):
+            if filter_ and filter_ not in case.name:
+                continue
+            try:
+                results[case.name] = time_case(case, min_time=min_time)
+            except BenchmarkSkipped as e:
+                print(f"{case.name:45s} skipped: {e}", file=out)
+                continue
+            print(f"{case.name:45s} {results[case.name]['min'] * 1e3:12.4f} ms",
+                  file=out)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Compares results to a baseline using the best time of each case.
+
+    Parameters
+    ----------
+    results : dict(str, dict)
+        The current results
+    baseline : dict(str, dict)
+        The stored baseline results
+    threshold : float
+        The allowed relative slowdown, e.g. 0.25 allows 25% slower
+
+    Returns
+    -------
+    regressions : list((str, float, float))
+        The name, baseline time and current time of every regressed case
+    """
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before = baseline[name]['min']
+        after = result['min']
+        if after > before * (1 + threshold):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def main(argv=None):
+    arg_parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    arg_parser.add_argument('-k', '--filter', default=None,
+                            help="only run cases whose name contains this")
+    arg_parser.add_argument('--full', action='store_true',
+                            help="include the largest input sizes")
+    arg_parser.add_argument('--min-time', type=float, default=0.2,
+                            help="seconds to spend timing each case")
+    arg_parser.add_argument('-o', '--output', default=None,
+                            help="write the results to this JSON file")
+    arg_parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                            help="baseline JSON file to compare against")
+    arg_parser.add_argument('--save-baseline', action='store_true',
+                            help="store the results as the new baseline")
+    arg_parser.add_argument('--threshold', type=float, default=0.25,
+                            help="allowed relative slowdown before failing")
+    args = arg_parser.parse_args(argv)
+
+    results = run(args.filter, args.full, args.min_time)
+    document = {
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)['results']
+        baseline.update(results)
+        document['results'] = baseline
+        with open(args.baseline, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}, run with --save-baseline")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)['results']
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nREGRESSIONS (more than {args.threshold:.0%} slower):",
+              file=sys.stderr)
+        for name, before, after in regressions:
+            print(f"  {name:45s} {before * 1e3:10.4f} ms -> "
+                  f"{after * 1e3:10.4f} ms ({after / before:.2f}x)",
+                  file=sys.stderr)
+        return 1
+
+    print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
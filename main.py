@@ -1,25 +1,52 @@
 ## The entry point of the program that runs to start the application
+##
+## Run with --profile-startup to print an import time breakdown and the time
+## taken by each startup phase until the window is first painted.
+## Run with --instrument to show the time taken by each pipeline stage on top
+## of the plot.
+## Run with --no-cache to disable the on-disk cache of evaluated plots.
+## Run with --render-thread to rasterize plots in a background thread instead
+## of the GUI thread.
+## Run with --native-render to draw plots with QPainter instead of Matplotlib.
 
 import sys
-from PySide2 import QtCore
-from PySide2.QtWidgets import QApplication, QLabel
-from plotter.views.mainwidget import MainWidget
-from plotter.services.parser import Parser
-from plotter.services.plotter import Plotter
-from plotter.presenter import Presenter
-
-def create_mvp():
+import time
+
+
+def create_mvp(cache_dir=None, renderer='matplotlib'):
     """
     Create instances of the services, views and presenter and returns them
+
+    Parameters
+    ----------
+    cache_dir : str
+        If provided, plots are cached on disk in this directory
+    renderer : str
+        The plot widget of the main widget, see MainWidget. Defaults to
+        'matplotlib'.
     """
 
+    from plotter.views.mainwidget import MainWidget
+    from plotter.services.parser import Parser
+    from plotter.services.plotter import Plotter
+    from plotter.services.analysis import Analyzer
+    from plotter.services.integration import Integrator
+    from plotter.presenter import Presenter
+
     # services
     parser = Parser()
-    plotter = Plotter()
-    services = {"parser": parser, "plotter": plotter}
+    cache = None
+    if cache_dir is not None:
+        from plotter.services.cache import PlotCache
+        cache = PlotCache(cache_dir)
+    plotter = Plotter(cache)
+    analyzer = Analyzer()
+    integrator = Integrator()
+    services = {"parser": parser, "plotter": plotter, "analyzer": analyzer,
+                "integrator": integrator}
 
     # views
-    widget = MainWidget()
+    widget = MainWidget(renderer=renderer)
     size = (640, 640)
     widget.setMinimumSize(*size)
     widget.resize(*size)
@@ -31,14 +58,86 @@ def create_mvp():
 
     return services, views, presenter
 
-if __name__ == "__main__":
+
+def main(argv):
+    """
+    Starts the application and runs the Qt main loop.
+
+    Parameters
+    ----------
+    argv : list(str)
+        The command line arguments, without the program name
+
+    Returns
+    -------
+    status : int
+        The exit status of the Qt application
+    """
+
+    profile = '--profile-startup' in argv
+    if profile:
+        from plotter.util import ImportProfiler
+        profiler = ImportProfiler()
+        profiler.start()
+
+    phases = []
+    start = time.perf_counter()
+
+    def mark(phase):
+        phases.append((phase, time.perf_counter()))
+
     # create the Qt application
+    from PySide2.QtWidgets import QApplication
+    mark("import Qt")
     app = QApplication([])
+    mark("create QApplication")
 
     # MVP components
-    services, views, presenter = create_mvp()
+    cache_dir = None
+    if '--no-cache' not in argv:
+        from plotter.services.cache import default_cache_dir
+        cache_dir = default_cache_dir()
+    renderer = 'matplotlib'
+    if '--render-thread' in argv:
+        renderer = 'threaded'
+    elif '--native-render' in argv:
+        renderer = 'native'
+    services, views, presenter = create_mvp(cache_dir, renderer)
+    mark("create MVP")
     main_widget = views['main_widget']
+    if '--instrument' in argv:
+        from plotter.instrumentation import instrumentation
+        instrumentation.enable(track_allocations=True)
+        presenter.show_timings = True
     main_widget.show()
+    app.processEvents()
+    mark("show window")
+
+    if profile:
+        # let the deferred plot canvas get created as well
+        app.processEvents()
+        mark("create plot canvas")
+        profiler.stop()
+
+        print("Import times:")
+        print(profiler.report())
+        print("\nStartup phases:")
+        previous = start
+        for phase, end in phases:
+            print(f"{(end - previous) * 1000:9.1f} ms  {phase}")
+            previous = end
+        print(f"{(previous - start) * 1000:9.1f} ms  total")
+
+    # measure the evaluation backends in the background instead of in the
+    # first plot
+    import threading
+    from plotter.services.backends import default_selector
+    threading.Thread(target=default_selector().ensure_calibrated,
+                     daemon=True).start()
 
     # run the main Qt loop
-    sys.exit(app.exec_())
\ No newline at end of file
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
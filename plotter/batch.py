@@ -0,0 +1,331 @@
+## Headless batch plotting. Reads many expressions and x ranges from a file or
+## stdin, parses and evaluates them in parallel using the Parser and Plotter
+## services and writes the results to disk. Nothing in this module imports Qt,
+## so it can run on servers without a display.
+##
+## Usage:
+##     python -m plotter.batch jobs.txt -o out --format png --workers 8
+##
+## Each non-empty line of the input is a job of the form
+##     expression, x_min, x_max
+## Lines starting with '#' are ignored.
+
+import os
+import sys
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from .services.parser import Parser, ParserError
+from .services.plotter import Plotter, XRangeError
+
+
+# supported output formats
+FORMATS = ['csv', 'npy', 'png']
+
+
+class BatchError(Exception):
+    pass
+
+
+class PlotJob(object):
+    """
+    A single plotting job: an expression and the x range to plot it on.
+    """
+
+    def __init__(self, index, expression, x_min, x_max):
+        """
+        Parameters
+        ----------
+        index : int
+            The position of the job in the input, used to name the output
+        expression : str
+            The raw function expression
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        """
+
+        self.index = index
+        self.expression = expression
+        self.x_min = x_min
+        self.x_max = x_max
+
+    def __eq__(self, other):
+        if not isinstance(other, PlotJob):
+            return False
+        return (self.index == other.index and
+                self.expression == other.expression and
+                self.x_min == other.x_min and
+                self.x_max == other.x_max)
+
+
+def parse_job_line(line, index):
+    """
+    Parses one line of batch input.
+
+    Parameters
+    ----------
+    line : str
+        A line of the form 'expression, x_min, x_max'
+    index : int
+        The index to give the job
+
+    Returns
+    -------
+    job : PlotJob
+        The parsed job, or None if the line is empty or a comment
+
+    Raises
+    ------
+    BatchError
+        The line is malformed
+    """
+
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    # the expression grammar has no commas, split from the right anyway
+    parts = line.rsplit(',', 2)
+    if len(parts) != 3:
+        raise BatchError(f"Expected 'expression, x_min, x_max', got '{line}'")
+
+    expression, x_min, x_max = parts
+    try:
+        x_min = float(x_min)
+        x_max = float(x_max)
+    except ValueError:
+        raise BatchError(f"X Min and X Max must be numbers in '{line}'")
+
+    return PlotJob(index, expression.strip(), x_min, x_max)
+
+
+def read_jobs(stream):
+    """
+    Reads all jobs from a text stream.
+
+    Parameters
+    ----------
+    stream : iterable(str)
+        A file-like object or any iterable of lines
+
+    Returns
+    -------
+    jobs : list(PlotJob)
+        The jobs in input order
+
+    Raises
+    ------
+    BatchError
+        A line is malformed
+    """
+
+    jobs = []
+    for line in stream:
+        job = parse_job_line(line, len(jobs))
+        if job is not None:
+            jobs.append(job)
+    return jobs
+
+
+def output_path(job, output_dir, fmt):
+    """
+    Returns
+    -------
+    path : str
+        The file the result of the job is written to
+    """
+
+    return os.path.join(output_dir, f"plot_{job.index:05d}.{fmt}")
+
+
+def write_result(path, x, y, fmt, title=""):
+    """
+    Writes the x and y values of a plot to a file.
+
+    Parameters
+    ----------
+    path : str
+        The output file path
+    x : numpy.ndarray
+        The x values of the points
+    y : numpy.ndarray
+        The y values of the points
+    fmt : str
+        One of 'csv', 'npy' or 'png'
+    title : str
+        The plot title, only used for 'png'
+    """
+
+    import numpy as np
+
+    if fmt == 'csv':
+        np.savetxt(path, np.column_stack((x, y)), delimiter=',',
+                   header='x,y', comments='')
+    elif fmt == 'npy':
+        # a (2, n) array, row 0 is x and row 1 is y
+        np.save(path, np.vstack((x, y)))
+    elif fmt == 'png':
+        render_png(path, x, y, title)
+    else:
+        raise BatchError(f"Unknown output format '{fmt}'")
+
+
+def render_png(file, x, y, title="", width=500, height=400):
+    """
+    Renders a plot to a PNG image.
+
+    Parameters
+    ----------
+    file : str or file-like object
+        The output file path, or a binary stream to write the image to
+    x : numpy.ndarray
+        The x values of the points
+    y : numpy.ndarray
+        The y values of the points
+    title : str
+        The plot title
+    width : int
+        The image width in pixels. Defaults to 500.
+    height : int
+        The image height in pixels. Defaults to 400.
+    """
+
+    # use the Agg canvas directly, never pyplot, so no GUI backend is ever
+    # selected and figures are not kept in a global registry
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+    FigureCanvasAgg(fig)
+    axes = fig.add_subplot(1, 1, 1)
+    axes.set_xlim(x[0], x[-1])
+    axes.set_xlabel("x")
+    axes.set_ylabel("f(x)")
+    axes.set_title(title)
+    axes.plot(x, y)
+    fig.savefig(file, format='png')
+
+
+def run_job(job, output_dir, fmt, points):
+    """
+    Parses, evaluates and writes a single job. This is a module level function
+    so it can be sent to worker processes.
+
+    Returns
+    -------
+    index : int
+        The index of the job
+    error : str
+        The error message, or None if the job succeeded
+    """
+
+    try:
+        tree = Parser().parse(job.expression)
+        if tree is None:
+            raise ParserError("Empty expression")
+        x, y = Plotter().plot(tree, job.x_min, job.x_max,
+                              x_tick_frequency=points)
+        write_result(output_path(job, output_dir, fmt), x, y, fmt,
+                     title=job.expression)
+    except (ParserError, XRangeError, BatchError) as e:
+        return job.index, str(e)
+    except Exception as e:
+        # any other failure, e.g. an evaluation or I/O error, fails this job
+        # only instead of aborting the whole run from a worker process
+        return job.index, f"{type(e).__name__}: {e}"
+
+    return job.index, None
+
+
+def run_jobs(jobs, output_dir, fmt='csv', points=1000, workers=None):
+    """
+    Runs all the jobs, in parallel worker processes if workers > 1.
+
+    Parameters
+    ----------
+    jobs : list(PlotJob)
+        The jobs to run
+    output_dir : str
+        The directory to write results to, created if missing
+    fmt : str
+        One of 'csv', 'npy' or 'png'
+    points : int
+        How many points to evaluate per plot
+    workers : int
+        The number of worker processes. Defaults to the number of CPUs.
+
+    Returns
+    -------
+    errors : dict(int, str)
+        Maps the index of every failed job to its error message
+    """
+
+    if fmt not in FORMATS:
+        raise BatchError(f"Unknown output format '{fmt}'")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    if workers <= 1 or len(jobs) <= 1:
+        results = (run_job(job, output_dir, fmt, points) for job in jobs)
+        return {i: e for i, e in results if e is not None}
+
+    n = len(jobs)
+    # hand out jobs in chunks so small plots don't drown in IPC overhead
+    chunksize = max(1, n // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(run_job, jobs, [output_dir] * n, [fmt] * n,
+                               [points] * n, chunksize=chunksize)
+        return {i: e for i, e in results if e is not None}
+
+
+def main(argv=None):
+    """
+    The command line entry point.
+
+    Returns
+    -------
+    status : int
+        0 if all jobs succeeded, 1 otherwise
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m plotter.batch",
+        description="Plot many functions without a GUI. Each input line "
+                    "has the form 'expression, x_min, x_max'.")
+    arg_parser.add_argument('input', nargs='?', default='-',
+                            help="job file, '-' or omitted for stdin")
+    arg_parser.add_argument('-o', '--output-dir', default='.',
+                            help="directory to write results to")
+    arg_parser.add_argument('-f', '--format', choices=FORMATS, default='csv',
+                            help="output format")
+    arg_parser.add_argument('-n', '--points', type=int, default=1000,
+                            help="points to evaluate per plot")
+    arg_parser.add_argument('-j', '--workers', type=int, default=None,
+                            help="worker processes, defaults to CPU count")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        if args.input == '-':
+            jobs = read_jobs(sys.stdin)
+        else:
+            with open(args.input) as f:
+                jobs = read_jobs(f)
+        errors = run_jobs(jobs, args.output_dir, args.format, args.points,
+                          args.workers)
+    except BatchError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    for index in sorted(errors):
+        print(f"job {index} ({jobs[index].expression}): {errors[index]}",
+              file=sys.stderr)
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
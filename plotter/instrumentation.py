@@ -0,0 +1,284 @@
+## Per-stage timing instrumentation for the plotting pipeline. Stages are
+## recorded with a context manager or a decorator into a fixed size ring
+## buffer that can be queried from code or shown on screen. When disabled, a
+## stage costs one attribute check.
+##
+## Usage:
+##     from plotter.instrumentation import instrumentation
+##
+##     instrumentation.enable(track_allocations=True)
+##     with instrumentation.stage('plotter.evaluate', count=len(x)):
+##         y = tree.evaluate(x)
+##     print(instrumentation.format_records())
+
+import time
+import functools
+import threading
+import tracemalloc
+from collections import deque, namedtuple
+
+
+# a single recorded stage
+# - name: the stage name, e.g. 'parser.tokenize'
+# - wall_time: seconds spent in the stage
+# - allocated: peak bytes allocated in the stage, None if not tracked
+# - count: the number of elements processed, None if unknown
+# - timestamp: time.perf_counter() when the stage started
+# - depth: how many stages were active when this one started
+StageRecord = namedtuple('StageRecord',
+    ['name', 'wall_time', 'allocated', 'count', 'timestamp', 'depth'])
+
+
+class _NullStage(object):
+    """
+    The stage returned while instrumentation is disabled. It does nothing.
+    """
+
+    count = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage(object):
+    """
+    An active stage. Set its count attribute inside the with block if the
+    element count is only known after the work is done.
+    """
+
+    def __init__(self, instrumentation, name, count=None):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.count = count
+        self.peak = 0
+
+    def __enter__(self):
+        active = self.instrumentation._active
+        self.depth = len(active)
+
+        self.tracing = self.instrumentation.track_allocations
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if active:
+                # remember the parent's peak before resetting it
+                active[-1].peak = max(active[-1].peak, peak)
+            if hasattr(tracemalloc, 'reset_peak'):
+                tracemalloc.reset_peak()
+            self.start_memory = current
+            self.peak = current
+
+        active.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        wall_time = time.perf_counter() - self.start
+
+        active = self.instrumentation._active
+        active.pop()
+
+        allocated = None
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            self.peak = max(self.peak, peak)
+            allocated = self.peak - self.start_memory
+            if active:
+                active[-1].peak = max(active[-1].peak, self.peak)
+
+        self.instrumentation.records.append(StageRecord(self.name, wall_time,
+            allocated, self.count, self.start, self.depth))
+        return False
+
+
+class Instrumentation(object):
+    """
+    Records stage timings into a ring buffer. Disabled by default.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Parameters
+        ----------
+        capacity : int
+            How many records to keep, older records are dropped.
+            Defaults to 1024.
+        """
+
+        self.enabled = False
+        self.track_allocations = False
+        self.records = deque(maxlen=capacity)
+        # the stack of active stages of each thread, stages run in worker
+        # threads too and must not nest under another thread's stages
+        self._local = threading.local()
+        self._started_tracemalloc = False
+
+    @property
+    def _active(self):
+        """
+        The active stages of the calling thread, innermost last
+        """
+
+        try:
+            return self._local.active
+        except AttributeError:
+            self._local.active = []
+            return self._local.active
+
+    def enable(self, track_allocations=False):
+        """
+        Starts recording stages.
+
+        Parameters
+        ----------
+        track_allocations : bool
+            Also record the peak bytes allocated in each stage. This uses
+            tracemalloc and slows down everything allocating memory.
+        """
+
+        self.enabled = True
+        self.track_allocations = track_allocations
+        if track_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def disable(self):
+        """
+        Stops recording stages. Recorded stages are kept.
+        """
+
+        self.enabled = False
+        self.track_allocations = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def clear(self):
+        """
+        Removes all the recorded stages.
+        """
+
+        self.records.clear()
+
+    def stage(self, name, count=None):
+        """
+        Returns a context manager that records the stage it wraps.
+
+        Parameters
+        ----------
+        name : str
+            The stage name
+        count : int
+            The number of elements processed in the stage, can also be set
+            later on the returned object
+
+        Returns
+        -------
+        stage
+            A context manager with a settable count attribute
+        """
+
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, count)
+
+    def timed(self, name, count=None):
+        """
+        Decorator recording every call of the function as a stage.
+
+        Parameters
+        ----------
+        name : str
+            The stage name
+        count : (result) -> int
+            Optional function computing the element count from the result
+        """
+
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Stage(self, name) as stage:
+                    result = func(*args, **kwargs)
+                    if count is not None:
+                        stage.count = count(result)
+                return result
+            return wrapper
+        return decorator
+
+    def get_records(self, name=None, since=None):
+        """
+        Parameters
+        ----------
+        name : str
+            Only return records of this stage
+        since : float
+            Only return records of stages started at or after this
+            time.perf_counter() value
+
+        Returns
+        -------
+        records : list(StageRecord)
+            The matching records, oldest first
+        """
+
+        return [r for r in self.records
+                if (name is None or r.name == name) and
+                   (since is None or r.timestamp >= since)]
+
+    def summary(self):
+        """
+        Returns
+        -------
+        summary : dict(str, dict)
+            Maps each stage name to its 'calls', 'total', 'mean' and 'max'
+            wall time in seconds
+        """
+
+        summary = {}
+        for r in self.records:
+            s = summary.setdefault(r.name,
+                                   {'calls': 0, 'total': 0.0, 'max': 0.0})
+            s['calls'] += 1
+            s['total'] += r.wall_time
+            s['max'] = max(s['max'], r.wall_time)
+        for s in summary.values():
+            s['mean'] = s['total'] / s['calls']
+        return summary
+
+    def format_records(self, records=None):
+        """
+        Formats records as text, one indented line per stage in start order.
+
+        Parameters
+        ----------
+        records : list(StageRecord)
+            The records to format. Defaults to all recorded stages.
+
+        Returns
+        -------
+        text : str
+        """
+
+        if records is None:
+            records = list(self.records)
+
+        lines = []
+        for r in sorted(records, key=lambda r: r.timestamp):
+            line = f"{'  ' * r.depth}{r.name}: {r.wall_time * 1000:.2f} ms"
+            if r.count is not None:
+                line += f", {r.count} items"
+            if r.allocated is not None:
+                line += f", {r.allocated / 1024:.1f} KiB"
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+# the instrumentation shared by the whole application
+instrumentation = Instrumentation()
@@ -0,0 +1,291 @@
+## Symbolic differentiation of expression trees. The derivative is built from
+## the same five operators as the original expression, so it evaluates with
+## ExprTNode.evaluate() like any parsed function. Nodes are created through
+## simplifying constructors that fold constants and drop the zeros and ones
+## the differentiation rules produce, which keeps derivative trees about as
+## small as the function they come from. Unchanged subtrees of the original
+## tree are shared, not copied.
+
+import math
+from .expression import (
+    Operand, ExprTNode, PowOperator, MulOperator, DivOperator, AddOperator,
+    SubOperator
+    )
+
+
+class DifferentiationError(Exception):
+    pass
+
+
+def _const(value):
+    return ExprTNode(Operand(value=float(value)))
+
+
+def _value(node):
+    """
+    Returns
+    -------
+    value : float
+        The value of a numeric constant node, or None for any other node
+    """
+
+    op = node.key
+    if isinstance(op, Operand) and not op.is_x and op.name is None:
+        return op.value
+    return None
+
+
+def _fold(func, a, b):
+    try:
+        value = func(a, b)
+    except (ArithmeticError, ValueError):
+        # e.g. division by zero, left for evaluation to turn into inf or nan
+        return None
+    if not isinstance(value, float) or not math.isfinite(value):
+        return None
+    return _const(value)
+
+
+def add(a, b):
+    """
+    Returns
+    -------
+    node : ExprTNode
+        A simplified tree of a + b
+    """
+
+    va, vb = _value(a), _value(b)
+    if va == 0:
+        return b
+    if vb == 0:
+        return a
+    if va is not None and vb is not None:
+        folded = _fold(lambda p, q: p + q, va, vb)
+        if folded is not None:
+            return folded
+    return ExprTNode(AddOperator(), a, b)
+
+
+def sub(a, b):
+    """
+    Returns
+    -------
+    node : ExprTNode
+        A simplified tree of a - b
+    """
+
+    va, vb = _value(a), _value(b)
+    if vb == 0:
+        return a
+    if a == b:
+        return _const(0)
+    if va is not None and vb is not None:
+        folded = _fold(lambda p, q: p - q, va, vb)
+        if folded is not None:
+            return folded
+    if va == 0:
+        return mul(_const(-1), b)
+    return ExprTNode(SubOperator(), a, b)
+
+
+def mul(a, b):
+    """
+    Returns
+    -------
+    node : ExprTNode
+        A simplified tree of a * b
+    """
+
+    va, vb = _value(a), _value(b)
+    if va == 0 or vb == 0:
+        return _const(0)
+    if va == 1:
+        return b
+    if vb == 1:
+        return a
+    if va is not None and vb is not None:
+        folded = _fold(lambda p, q: p * q, va, vb)
+        if folded is not None:
+            return folded
+    # keep constants on the left and merge them, c1 * (c2 * u) = (c1*c2) * u
+    if vb is not None:
+        a, b, va, vb = b, a, vb, va
+    if va is not None and isinstance(b.key, MulOperator):
+        inner = _value(b.left)
+        if inner is not None:
+            return mul(_const(va * inner), b.right)
+    return ExprTNode(MulOperator(), a, b)
+
+
+def div(a, b):
+    """
+    Returns
+    -------
+    node : ExprTNode
+        A simplified tree of a / b
+    """
+
+    va, vb = _value(a), _value(b)
+    if vb == 1:
+        return a
+    if va == 0 and vb != 0:
+        return _const(0)
+    if va is not None and vb is not None:
+        folded = _fold(lambda p, q: p / q, va, vb)
+        if folded is not None:
+            return folded
+    return ExprTNode(DivOperator(), a, b)
+
+
+def power(a, b):
+    """
+    Returns
+    -------
+    node : ExprTNode
+        A simplified tree of a ^ b
+    """
+
+    va, vb = _value(a), _value(b)
+    if vb == 0:
+        return _const(1)
+    if vb == 1:
+        return a
+    if va is not None and vb is not None:
+        folded = _fold(math.pow, va, vb)
+        if folded is not None:
+            return folded
+    return ExprTNode(PowOperator(), a, b)
+
+
+_CONSTRUCTORS = {
+    PowOperator: power,
+    MulOperator: mul,
+    DivOperator: div,
+    AddOperator: add,
+    SubOperator: sub
+}
+
+
+def simplify(tree):
+    """
+    Rebuilds an expression tree bottom-up through the simplifying
+    constructors, folding constant subexpressions.
+
+    Parameters
+    ----------
+    tree : ExprTNode
+        The expression tree to simplify
+
+    Returns
+    -------
+    tree : ExprTNode
+        An equivalent, possibly smaller tree
+    """
+
+    op = tree.key
+    if isinstance(op, Operand):
+        return tree
+    left = simplify(tree.left)
+    right = simplify(tree.right)
+    return _CONSTRUCTORS[type(op)](left, right)
+
+
+def _is_var(op, var):
+    if var == 'x':
+        return op.is_x
+    return op.name == var
+
+
+def _depends(node, var, memo):
+    """
+    Returns
+    -------
+    depends : bool
+        True if the subtree contains the variable
+    """
+
+    key = id(node)
+    if key not in memo:
+        op = node.key
+        if isinstance(op, Operand):
+            memo[key] = _is_var(op, var)
+        else:
+            memo[key] = (_depends(node.left, var, memo) or
+                         _depends(node.right, var, memo))
+    return memo[key]
+
+
+def differentiate(tree, var='x'):
+    """
+    Differentiates an expression tree.
+
+    Parameters
+    ----------
+    tree : ExprTNode
+        The expression tree to differentiate
+    var : str
+        The variable to differentiate with respect to, 'x' or the name of a
+        parameter operand. Defaults to 'x'.
+
+    Returns
+    -------
+    derivative : ExprTNode
+        A simplified expression tree of the derivative
+
+    Raises
+    ------
+    DifferentiationError
+        The tree is built incorrectly, or has a power whose base and exponent
+        both depend on the variable, or a variable exponent over a base that
+        isn't a positive number
+    """
+
+    return _differentiate(tree, var, {})
+
+
+def _differentiate(node, var, memo):
+    if not isinstance(node, ExprTNode):
+        raise DifferentiationError("Expression tree has an incorrect "
+                                   "syntactical structure")
+    op = node.key
+    if isinstance(op, Operand):
+        if _is_var(op, var):
+            return _const(-1 if op.is_neg else 1)
+        return _const(0)
+    if node.left is None or node.right is None:
+        raise DifferentiationError("Expression tree has an incorrect "
+                                   "syntactical structure")
+
+    u, v = node.left, node.right
+    if not _depends(node, var, memo):
+        return _const(0)
+    du = _differentiate(u, var, memo)
+    dv = _differentiate(v, var, memo)
+
+    if isinstance(op, AddOperator):
+        return add(du, dv)
+    elif isinstance(op, SubOperator):
+        return sub(du, dv)
+    elif isinstance(op, MulOperator):
+        return add(mul(du, v), mul(u, dv))
+    elif isinstance(op, DivOperator):
+        if not _depends(v, var, memo):
+            return div(du, v)
+        return div(sub(mul(du, v), mul(u, dv)), power(v, _const(2)))
+    elif isinstance(op, PowOperator):
+        if not _depends(v, var, memo):
+            # power rule, d(u^c) = c * u^(c-1) * du
+            return mul(mul(v, power(u, sub(v, _const(1)))), du)
+        if _depends(u, var, memo):
+            raise DifferentiationError(f"Can't differentiate '^' when both "
+                                       f"the base and the exponent depend "
+                                       f"on {var}")
+        # exponential rule, d(c^v) = c^v * ln(c) * dv
+        base = _value(simplify(u))
+        if base is None or base <= 0:
+            raise DifferentiationError("Can't differentiate '^' with a "
+                                       "variable exponent unless the base is "
+                                       "a positive number")
+        return mul(mul(_const(math.log(base)), node), dv)
+    else:
+        raise DifferentiationError(f"Unexpected object '{op}' in tree node")
@@ -2,7 +2,6 @@
 ## trees that can be evaluated.
 
 from ..util import EvaluationError
-import numpy as np
 
 
 class Operator(object):
@@ -36,6 +35,11 @@ class Operator(object):
             return False
         return self.string == other.string
 
+    def __reduce__(self):
+        # the functions are lambdas, which can't be pickled, the operator
+        # subclasses take no arguments and recreate them
+        return self.__class__, ()
+
 
 class PowOperator(Operator):
     def __init__(self):
@@ -77,10 +81,11 @@ OPERATORS = list(OPERATORS_DICT.keys())
 
 class Operand(object):
     """
-    An operand can either be x or a float value.
+    An operand can either be x, a named parameter or a float value.
     """
 
-    def __init__(self, is_x=False, is_neg_x=False, value=None):
+    def __init__(self, is_x=False, is_neg_x=False, value=None, name=None,
+                 is_neg=False):
         """
         Parameters
         ----------
@@ -90,14 +95,24 @@ class Operand(object):
             If True, creates a '-x' operand
         value : float
             If provided, creates a float operand with this value
+        name : str
+            If provided, creates a parameter operand with this name whose
+            value is given when evaluated
+        is_neg : bool
+            If True, the parameter operand is negated
         """
 
+        self.name = None
         if is_x:
             self.is_x = True
             self.is_neg = False
         elif is_neg_x:
             self.is_x = True
             self.is_neg = True
+        elif name is not None:
+            self.is_x = False
+            self.name = name
+            self.is_neg = is_neg
         else:
             self.is_x = False
             self.value = value
@@ -106,7 +121,9 @@ class Operand(object):
         if not isinstance(other, Operand):
             return False
 
-        if self.is_x and other.is_x:
+        if self.name is not None or other.name is not None:
+            return self.name == other.name and self.is_neg == other.is_neg
+        elif self.is_x and other.is_x:
             return self.is_neg == other.is_neg
         elif self.is_x != other.is_x:
             return False
@@ -119,10 +136,12 @@ class Operand(object):
                 return '-x'
             else:
                 return 'x'
+        elif self.name is not None:
+            return f"{'-' if self.is_neg else ''}{self.name}"
         else:
             return str(self.value)
     
-    def evaluate(self, x=0.0):
+    def evaluate(self, x=0.0, params=None):
         """
         Evaluate the operand.
         
@@ -132,16 +151,34 @@ class Operand(object):
             The value of x to substitute into the operand if it's a variable
             'x' operand. Can be a numpy ndarray.
             Defaults to 0.
+        params : dict(str, value)
+            The values of named parameters. A value can be a numpy ndarray
+            that broadcasts against x.
 
         Returns
         -------
         result
-            Has the same type as x
+            Has the same type as x, or the broadcast type of x and the
+            parameter value for parameter operands
+
+        Raises
+        ------
+        EvaluationError
+            No value given for a parameter operand
         """
 
         if self.is_x:
             return x * (-1 if self.is_neg else 1)
+        elif self.name is not None:
+            try:
+                value = params[self.name]
+            except (KeyError, TypeError):
+                raise EvaluationError(f"No value given for parameter "
+                                      f"'{self.name}'")
+            return value * (-1 if self.is_neg else 1)
         else:
+            # imported here so parsing never pays for loading numpy
+            import numpy as np
             if isinstance(x, np.ndarray):
                 return np.full_like(x, self.value)
             return self.value
@@ -181,7 +218,93 @@ class ExprTNode(object):
                 self.left == other.left and
                 self.right == other.right)
     
-    def evaluate(self, x=0.0):
+    def __reduce_ex__(self, protocol):
+        # pickle trees in the compact binary encoding, which is smaller and
+        # faster than pickling the graph of node objects. Trees it can't
+        # encode, e.g. with array constants, are pickled node by node.
+        from .serialization import decode, SerializationError
+        try:
+            return decode, (self.to_bytes(),)
+        except SerializationError:
+            return super().__reduce_ex__(protocol)
+
+    def __copy__(self):
+        # copy.copy() would otherwise go through __reduce_ex__ and copy the
+        # whole tree, a shallow copy shares the key and children
+        copy = self.__class__.__new__(self.__class__)
+        copy.__dict__.update(self.__dict__)
+        return copy
+
+    def to_bytes(self):
+        """
+        Encodes the expression tree in a compact binary format, see the
+        serialization module.
+
+        Returns
+        -------
+        data : bytes
+            The encoded tree
+
+        Raises
+        ------
+        SerializationError
+            Tree is built incorrectly or has a non-float constant
+        """
+
+        from .serialization import encode
+        return encode(self)
+
+    @staticmethod
+    def from_bytes(data):
+        """
+        Decodes an expression tree encoded by to_bytes().
+
+        Parameters
+        ----------
+        data : bytes-like
+            The encoded tree
+
+        Returns
+        -------
+        tree : ExprTNode
+            The decoded expression tree
+
+        Raises
+        ------
+        SerializationError
+            The data is not a valid encoded tree
+        """
+
+        from .serialization import decode
+        return decode(data)
+
+    def derivative(self, var='x'):
+        """
+        Differentiates the expression tree symbolically, see the derivative
+        module.
+
+        Parameters
+        ----------
+        var : str
+            The variable to differentiate with respect to, 'x' or the name of
+            a parameter operand. Defaults to 'x'.
+
+        Returns
+        -------
+        derivative : ExprTNode
+            A simplified expression tree of the derivative
+
+        Raises
+        ------
+        DifferentiationError
+            Tree is built incorrectly or has a power that can't be
+            differentiated with the five operators
+        """
+
+        from .derivative import differentiate
+        return differentiate(self, var)
+
+    def evaluate(self, x=0.0, params=None):
         """
         Evaluate the expression tree.
         
@@ -191,6 +314,10 @@ class ExprTNode(object):
             The value of x to substitute into 'x' operands.
             Can be a numpy ndarray.
             Defaults to 0.
+        params : dict(str, value)
+            The values of named parameter operands. Values can be numpy
+            ndarrays that broadcast against x, e.g. a column of parameter
+            values against a row of x values evaluates a family of curves.
 
         Returns
         -------
@@ -200,20 +327,20 @@ class ExprTNode(object):
         Raises
         ------
         EvaluationError
-            Tree is built incorrectly
+            Tree is built incorrectly or a parameter has no value
         """
 
         op = self.key
         if isinstance(op, Operand):
-            return op.evaluate(x)
+            return op.evaluate(x, params)
         elif isinstance(op, Operator):
             if self.left is None or self.right is None:
                 raise EvaluationError(f"Expression tree has an incorrect "
                     "syntactical structure")
                     
             # postorder traversal
-            a = self.left.evaluate(x)
-            b = self.right.evaluate(x)
+            a = self.left.evaluate(x, params)
+            b = self.right.evaluate(x, params)
             return op.func(a, b)
         else:
             raise EvaluationError(f"Unexpected object '{op}' in tree node")
@@ -0,0 +1,190 @@
+## Compact, versioned binary encoding of expression trees. A tree is stored
+## as its postfix opcode stream plus a pool of float constants and parameter
+## names, so it can be decoded in one linear pass with a stack, without
+## recursion and without re-parsing the source string.
+##
+## Layout (little-endian), version 1:
+##     header     '<4sBIII'   magic b'PFXT', version, opcode stream length
+##                            in bytes, constant count, name count
+##     constants  float64 * constant count, in the order CONST opcodes use them
+##     names      (uint8 length, utf-8 bytes) * name count
+##     opcodes    one byte each, PARAM and NEG_PARAM are followed by a one
+##                byte index into the names
+
+import struct
+from .expression import (
+    OPERATORS, OPERATORS_DICT, Operator, Operand, ExprTNode
+    )
+
+
+MAGIC = b'PFXT'
+VERSION = 1
+
+_HEADER = struct.Struct('<4sBIII')
+
+# opcodes 0-4 are the operators in the order of OPERATORS
+OP_CONST = 5
+OP_X = 6
+OP_NEG_X = 7
+OP_PARAM = 8
+OP_NEG_PARAM = 9
+
+_OPERATOR_CODES = {string: code for code, string in enumerate(OPERATORS)}
+
+
+class SerializationError(Exception):
+    pass
+
+
+def encode(tree):
+    """
+    Encodes an expression tree.
+
+    Parameters
+    ----------
+    tree : ExprTNode
+        The expression tree to encode
+
+    Returns
+    -------
+    data : bytes
+        The encoded tree
+
+    Raises
+    ------
+    SerializationError
+        The tree is built incorrectly or has a non-float constant
+    """
+
+    opcodes = bytearray()
+    constants = []
+    names = []
+    name_indices = {}
+
+    # iterative postorder traversal, deep trees don't hit the recursion limit
+    stack = [(tree, False)]
+    while stack:
+        node, visited = stack.pop()
+        if not isinstance(node, ExprTNode):
+            raise SerializationError("Expression tree has an incorrect "
+                                     "syntactical structure")
+        op = node.key
+        if isinstance(op, Operator):
+            if visited:
+                opcodes.append(_OPERATOR_CODES[op.string])
+            else:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+        elif isinstance(op, Operand):
+            if op.is_x:
+                opcodes.append(OP_NEG_X if op.is_neg else OP_X)
+            elif op.name is not None:
+                if op.name not in name_indices:
+                    if len(names) == 256:
+                        raise SerializationError("Too many parameters")
+                    name_indices[op.name] = len(names)
+                    names.append(op.name)
+                opcodes.append(OP_NEG_PARAM if op.is_neg else OP_PARAM)
+                opcodes.append(name_indices[op.name])
+            else:
+                try:
+                    constants.append(float(op.value))
+                except (TypeError, ValueError):
+                    raise SerializationError(f"Can't encode constant "
+                                             f"'{op.value}'")
+                opcodes.append(OP_CONST)
+        else:
+            raise SerializationError(f"Unexpected object '{op}' in tree node")
+
+    parts = [_HEADER.pack(MAGIC, VERSION, len(opcodes), len(constants),
+                          len(names)),
+             struct.pack(f'<{len(constants)}d', *constants)]
+    for name in names:
+        encoded = name.encode('utf-8')
+        if len(encoded) > 255:
+            raise SerializationError(f"Parameter name '{name}' is too long")
+        parts.append(bytes([len(encoded)]))
+        parts.append(encoded)
+    parts.append(bytes(opcodes))
+    return b''.join(parts)
+
+
+def decode(data):
+    """
+    Decodes an expression tree encoded by encode().
+
+    Parameters
+    ----------
+    data : bytes-like
+        The encoded tree
+
+    Returns
+    -------
+    tree : ExprTNode
+        The decoded expression tree
+
+    Raises
+    ------
+    SerializationError
+        The data is not a valid encoded tree
+    """
+
+    data = memoryview(data)
+    try:
+        magic, version, n_bytes, n_consts, n_names = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise SerializationError("Not an encoded expression tree")
+        if version != VERSION:
+            raise SerializationError(f"Unsupported version {version}")
+
+        pos = _HEADER.size
+        constants = struct.unpack_from(f'<{n_consts}d', data, pos)
+        pos += 8 * n_consts
+
+        names = []
+        for _ in range(n_names):
+            length = data[pos]
+            names.append(bytes(data[pos+1:pos+1+length]).decode('utf-8'))
+            pos += 1 + length
+    except (struct.error, IndexError, UnicodeDecodeError):
+        raise SerializationError("Truncated or corrupt data")
+
+    opcodes = bytes(data[pos:])
+    if len(opcodes) != n_bytes:
+        raise SerializationError("Truncated or corrupt data")
+
+    # operators are stateless, share one instance of each per tree
+    operators = [OPERATORS_DICT[string]() for string in OPERATORS]
+
+    stack = []
+    i = 0
+    next_const = 0
+    try:
+        while i < n_bytes:
+            code = opcodes[i]
+            i += 1
+            if code < OP_CONST:
+                right = stack.pop()
+                left = stack.pop()
+                stack.append(ExprTNode(operators[code], left, right))
+            elif code == OP_CONST:
+                stack.append(ExprTNode(Operand(value=constants[next_const])))
+                next_const += 1
+            elif code == OP_X:
+                stack.append(ExprTNode(Operand(is_x=True)))
+            elif code == OP_NEG_X:
+                stack.append(ExprTNode(Operand(is_neg_x=True)))
+            elif code == OP_PARAM or code == OP_NEG_PARAM:
+                name = names[opcodes[i]]
+                i += 1
+                stack.append(ExprTNode(Operand(name=name,
+                                               is_neg=code == OP_NEG_PARAM)))
+            else:
+                raise SerializationError(f"Unknown opcode {code}")
+    except IndexError:
+        raise SerializationError("Truncated or corrupt data")
+
+    if len(stack) != 1 or next_const != n_consts:
+        raise SerializationError("Truncated or corrupt data")
+    return stack[0]
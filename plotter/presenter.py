@@ -3,10 +3,19 @@
 ## - Invokes the Parser service to generate the expression tree
 ## - Invokes the Plotter service to evaluate the expression tree based on the
 ##   x min and max values
+## - Invokes the Analyzer service to find the roots, extrema and intersections
+##   to mark when the view asks for them
+## - Invokes the Integrator service to compute the area under the function
+##   when the view asks for it
+## - Invokes the Plotter service to sweep a parameter of the function when
+##   the view asks for it, rendered as a family of curves or a heatmap
 ## - Updates the view to show the plot, or error messages
 
+import time
+import numpy as np
 from PySide2.QtCore import Slot
 from .util import EvaluationError
+from .instrumentation import instrumentation
 from .services.parser import ParserError
 from .services.plotter import XRangeError
 
@@ -25,7 +34,8 @@ class Presenter(object):
         ----------
         services : dict
             A dictionary of services to use. Must have a Parser with key
-            'parser' and a Plotter with key 'plotter'
+            'parser', a Plotter with key 'plotter', an Analyzer with key
+            'analyzer' and an Integrator with key 'integrator'
         views : dict
             A dictionary of views to control. Must have a MainWidget with key
             'main_widget'
@@ -36,6 +46,21 @@ class Presenter(object):
 
         self.parser = self.services['parser']
         self.plotter = self.services['plotter']
+        self.analyzer = self.services['analyzer']
+        self.integrator = self.services['integrator']
+
+        # show the recorded stage timings on top of the plot after each plot,
+        # only has an effect while instrumentation is enabled
+        self.show_timings = False
+
+        # single precision is enough for display, the Plotter falls back to
+        # double precision when it would visibly distort the curve
+        self.dtype = 'float32'
+
+        # how many parameter values a sweep plots as curves, and as heatmap
+        # rows
+        self.sweep_curves = 11
+        self.sweep_rows = 256
 
         # connect view signals to presenter slots
         self.main_widget = views['main_widget']
@@ -47,14 +72,30 @@ class Presenter(object):
         This slot is connected to the view's on_plot signal.
         """
 
+        start = time.perf_counter()
+        with instrumentation.stage('presenter.on_plot'):
+            self._plot()
+
+        if self.show_timings and instrumentation.enabled:
+            records = instrumentation.get_records(since=start)
+            self.main_widget.update_timing_overlay(
+                instrumentation.format_records(records))
+
+    def _plot(self):
+        """
+        Validates the inputs, then plots and renders the function or shows
+        error messages. Called by on_plot().
+        """
+
         error = False
 
         # clear error messages
         self.main_widget.update_syntax_error_message()
         self.main_widget.update_range_error_message()
+        self.main_widget.update_stats_message()
         
-        # get the functino input text
-        func_string = self.main_widget.get_input_string()
+        # get the function input texts
+        func_strings = self.main_widget.get_input_strings()
         
         try:
             # validate that x min and x max are floats
@@ -70,13 +111,164 @@ class Presenter(object):
                 error = True
 
             try:
-                # parse the input function expression
-                func_expr = self.parser.parse(func_string)
-            except ParserError as e:
-                self.main_widget.update_syntax_error_message(str(e))
+                # the parameter to sweep, if any, is allowed in the functions
+                sweep = self.main_widget.get_sweep()
+            except ValueError as e:
+                self.main_widget.update_range_error_message(str(e))
                 error = True
-        
-            if not error and func_expr is not None:
-                # plot and render
-                x, y = self.plotter.plot(func_expr, x_min, x_max)
-                self.main_widget.render_plot(x, y)
+                sweep = None
+            params = [sweep[0]] if sweep is not None else []
+
+            func_exprs = []
+            for i, func_string in enumerate(func_strings):
+                try:
+                    # parse the input function expression
+                    func_expr = self.parser.parse(func_string, params)
+                except ParserError as e:
+                    if len(func_strings) > 1:
+                        e = f"f{i+1}: {e}"
+                    self.main_widget.update_syntax_error_message(str(e))
+                    error = True
+                    break
+                if func_expr is not None:
+                    func_exprs.append(func_expr)
+
+            if not error and sweep is not None and func_exprs:
+                self._plot_sweep(func_exprs, sweep, x_min, x_max)
+                return
+
+            if not error and len(func_exprs) == 1:
+                # plot and render, the statistics computed while evaluating
+                # also give the y limits
+                x, y, stats = self.plotter.plot_with_stats(
+                    func_exprs[0], x_min, x_max, dtype=self.dtype,
+                    split_poles=True)
+                self.main_widget.render_plot(x, y, stats.y_limits())
+                stats_text = self._format_stats(stats)
+                if self.main_widget.get_show_area():
+                    stats_text += "\n" + self._shade_area(func_exprs[0], x, y,
+                                                           x_min, x_max)
+                self.main_widget.update_stats_message(stats_text)
+            elif not error and func_exprs:
+                # plot all functions on a shared grid and render them at once
+                x, y = self.plotter.plot_many(func_exprs, x_min, x_max)
+                self.main_widget.render_plots(x, y)
+
+            if not error and func_exprs and self.main_widget.get_show_points():
+                self._mark_points(func_exprs, x, y)
+
+    def _plot_sweep(self, func_exprs, sweep, x_min, x_max):
+        """
+        Plots the function for evenly spaced values of the swept parameter,
+        in a single vectorized evaluation, and renders the curves or a
+        heatmap.
+
+        Parameters
+        ----------
+        func_exprs : list(ExprTNode)
+            The parsed functions, a sweep plots exactly one
+        sweep : (str, float, float)
+            The parameter name and its first and last value
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        """
+
+        if len(func_exprs) > 1:
+            self.main_widget.update_syntax_error_message(
+                "A sweep plots a single function")
+            return
+
+        name, first, last = sweep
+        heatmap = self.main_widget.get_show_heatmap()
+        values = np.linspace(first, last, self.sweep_rows if heatmap else
+                             self.sweep_curves)
+        with instrumentation.stage('presenter.sweep'):
+            x, y = self.plotter.sweep(func_exprs[0], x_min, x_max,
+                                      {name: values})
+            if heatmap:
+                self.main_widget.render_heatmap(x, values, y, name)
+            else:
+                self.main_widget.render_plots(x, y)
+        self.main_widget.update_stats_message(
+            f"{len(values)} values of {name} from {first:g} to {last:g}")
+
+    def _format_stats(self, stats):
+        """
+        Parameters
+        ----------
+        stats : StreamingStats
+            The statistics of a plot
+
+        Returns
+        -------
+        text : str
+            The statistics to show under the plot
+        """
+
+        if not stats.finite_count:
+            return "No finite values"
+        text = (f"min {stats.min:.6g} at x = {stats.argmin:.6g}   "
+                f"max {stats.max:.6g} at x = {stats.argmax:.6g}   "
+                f"mean {stats.mean:.6g}   "
+                f"integral {stats.simpson:.6g}")
+        undefined = stats.count - stats.finite_count
+        if undefined:
+            text += f"   {undefined} undefined"
+        return text
+
+    def _shade_area(self, func_expr, x, y, x_min, x_max):
+        """
+        Integrates the function over the x range and shades the area.
+
+        Returns
+        -------
+        text : str
+            The integral and its error estimate to show under the plot
+        """
+
+        with instrumentation.stage('presenter.shade_area'):
+            value, error = self.integrator.integrate(func_expr, x_min, x_max)
+            self.main_widget.render_area(x, y)
+        return f"area {value:.10g} \u00b1 {error:.2g}"
+
+    def _mark_points(self, func_exprs, x, y):
+        """
+        Marks the roots and extrema of every function and the intersections of
+        every pair of functions on the rendered plot.
+
+        Parameters
+        ----------
+        func_exprs : list(ExprTNode)
+            The plotted expression trees
+        x : numpy.ndarray
+            The x values of the plot
+        y : numpy.ndarray
+            The y values of the plot, one row per function if there are
+            several
+        """
+
+        if len(func_exprs) == 1:
+            y = [y]
+
+        with instrumentation.stage('presenter.mark_points'):
+            # collected first and drawn together, a redraw per set would
+            # redraw the whole plot once for every function and pair
+            marker_sets = []
+            for func_expr, func_y in zip(func_exprs, y):
+                roots = self.analyzer.find_roots(func_expr, x, func_y)
+                marker_sets.append((roots, np.zeros_like(roots), 'o', 'k',
+                                    "roots"))
+                ext_x, ext_y, is_max = self.analyzer.find_extrema(
+                    func_expr, x, func_y)
+                marker_sets.append((ext_x, ext_y, 'D', 'r', "extrema"))
+
+            for i in range(len(func_exprs)):
+                for j in range(i + 1, len(func_exprs)):
+                    cross_x, cross_y = self.analyzer.find_intersections(
+                        func_exprs[i], func_exprs[j], x)
+                    marker_sets.append((cross_x, cross_y, 's', 'b',
+                                        "intersections"))
+
+            self.main_widget.render_marker_sets(marker_sets)
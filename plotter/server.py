@@ -0,0 +1,658 @@
+## A local HTTP/JSON service exposing the Parser and Plotter services, so other
+## tools can parse and evaluate expressions over localhost without embedding
+## Qt. It is built on asyncio and the standard library only; nothing here
+## imports Qt.
+##
+## Usage:
+##     python -m plotter.server --port 8000 --workers 4
+##
+## Endpoints, all POST with a JSON object body:
+##     /parse   {"expression": "x^2"}
+##              -> {"postfix": ["x", "2.0", "^"], "nodes": 3}
+##     /plot    {"expression": "x^2", "x_min": -1, "x_max": 1, "points": 1000}
+##              -> {"x": [...], "y": [...]}, undefined values are null
+##     /render  the /plot fields and "width", "height" in pixels
+##              -> an image/png rendered with Matplotlib's Agg backend
+## Errors are JSON objects {"error": message} with a 4xx or 5xx status.
+##
+## Requests are put on a bounded queue and answered with 503 Service
+## Unavailable when it's full, so overload shows up as fast rejections
+## instead of unbounded latency. Worker tasks take requests off the queue in
+## micro-batches and run each batch in a thread pool. Within a batch,
+## identical requests are computed once, every expression is parsed once and
+## plots sharing an x grid are evaluated together with Plotter.plot_many(),
+## which generates x once and shares common subexpressions.
+
+import io
+import sys
+import math
+import json
+import asyncio
+import argparse
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from .util import EvaluationError
+from .services.parser import Parser, ParserError
+from .services.plotter import Plotter, XRangeError
+from .services.backends import default_selector
+
+
+ENDPOINTS = ['/parse', '/plot', '/render']
+
+# request limits
+MAX_BODY = 1 << 16
+MAX_POINTS = 1 << 20
+MAX_PIXELS = 4096
+
+JSON_TYPE = 'application/json'
+PNG_TYPE = 'image/png'
+
+
+class ServerError(Exception):
+    """
+    A request that can't be served, with the HTTP status to answer it with.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Job(object):
+    """
+    A validated request waiting for a worker.
+    """
+
+    def __init__(self, kind, expression, x_min=None, x_max=None, points=None,
+                 width=None, height=None):
+        """
+        Parameters
+        ----------
+        kind : str
+            'parse', 'plot' or 'render'
+        expression : str
+            The raw function expression
+        x_min : float
+            The minimum value of x, for plot and render jobs
+        x_max : float
+            The maximum value of x, for plot and render jobs
+        points : int
+            How many points to evaluate, for plot and render jobs
+        width : int
+            The image width in pixels, for render jobs
+        height : int
+            The image height in pixels, for render jobs
+        """
+
+        self.kind = kind
+        self.expression = expression
+        self.x_min = x_min
+        self.x_max = x_max
+        self.points = points
+        self.width = width
+        self.height = height
+        # set by the server to the asyncio future of the response
+        self.future = None
+
+    @property
+    def grid(self):
+        """
+        Returns
+        -------
+        grid : (float, float, int)
+            The x_min, x_max and points that define the x values
+        """
+
+        return self.x_min, self.x_max, self.points
+
+    @property
+    def key(self):
+        """
+        Returns
+        -------
+        key : tuple
+            Equal for requests with the same response
+        """
+
+        return (self.kind, self.expression) + self.grid + (self.width,
+                                                           self.height)
+
+
+def _get_number(fields, name, default=None, integer=False, low=None,
+                high=None):
+    """
+    Reads a number from the fields of a request body.
+
+    Raises
+    ------
+    ServerError
+        The field is missing or not a number in [low, high]
+    """
+
+    value = fields.get(name, default)
+    if value is None:
+        raise ServerError(400, f"Missing field '{name}'")
+    # bool is an int, but true isn't a number
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ServerError(400, f"Field '{name}' must be a number")
+    try:
+        # huge integer literals overflow a float, that's not finite either
+        finite = math.isfinite(value)
+    except (OverflowError, TypeError):
+        finite = False
+    if not finite:
+        raise ServerError(400, f"Field '{name}' must be finite")
+    if integer:
+        if value != int(value):
+            raise ServerError(400, f"Field '{name}' must be an integer")
+        value = int(value)
+    if (low is not None and value < low) or (high is not None and
+                                             value > high):
+        raise ServerError(400, f"Field '{name}' must be between {low} and "
+                               f"{high}")
+    return value
+
+
+def make_job(path, body):
+    """
+    Validates a request.
+
+    Parameters
+    ----------
+    path : str
+        The request path, one of ENDPOINTS
+    body : bytes
+        The request body, a JSON object
+
+    Returns
+    -------
+    job : Job
+        The job computing the response
+
+    Raises
+    ------
+    ServerError
+        Unknown path or invalid body
+    """
+
+    if path not in ENDPOINTS:
+        raise ServerError(404, f"Unknown path '{path}'")
+    try:
+        fields = json.loads(body.decode('utf-8'))
+    except (UnicodeDecodeError, ValueError):
+        raise ServerError(400, "The body must be a JSON object")
+    if not isinstance(fields, dict):
+        raise ServerError(400, "The body must be a JSON object")
+
+    expression = fields.get('expression')
+    if not isinstance(expression, str):
+        raise ServerError(400, "Field 'expression' must be a string")
+
+    kind = path[1:]
+    if kind == 'parse':
+        return Job(kind, expression)
+
+    x_min = float(_get_number(fields, 'x_min'))
+    x_max = float(_get_number(fields, 'x_max'))
+    points = _get_number(fields, 'points', 1000, integer=True, low=2,
+                         high=MAX_POINTS)
+    if kind == 'plot':
+        return Job(kind, expression, x_min, x_max, points)
+
+    width = _get_number(fields, 'width', 640, integer=True, low=16,
+                        high=MAX_PIXELS)
+    height = _get_number(fields, 'height', 480, integer=True, low=16,
+                         high=MAX_PIXELS)
+    return Job(kind, expression, x_min, x_max, points, width, height)
+
+
+def _error_response(status, message):
+    return status, JSON_TYPE, json.dumps({'error': message}).encode('utf-8')
+
+
+def _to_list(values):
+    """
+    Returns
+    -------
+    values : list(float)
+        The values with None in place of NaN and inf, which JSON can't
+        represent
+    """
+
+    finite = np.isfinite(values)
+    if finite.all():
+        return values.tolist()
+    values = values.astype(object)
+    values[~finite] = None
+    return values.tolist()
+
+
+def _postfix(tree):
+    """
+    Returns
+    -------
+    tokens : list(str)
+        The nodes of the tree in postfix order
+    """
+
+    tokens = []
+    stack = [(tree, False)]
+    while stack:
+        node, visited = stack.pop()
+        if node is None:
+            continue
+        if visited:
+            tokens.append(str(node.key))
+        else:
+            stack.append((node, True))
+            stack.append((node.right, False))
+            stack.append((node.left, False))
+    return tokens
+
+
+def _evaluate_group(plotter, trees, x_min, x_max, points):
+    """
+    Plots expressions on the same x grid, with plot_many() if there are
+    several.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        The x values of the points
+    y : numpy.ndarray
+        Row i holds the y values of trees[i]
+    """
+
+    if len(trees) == 1:
+        x, y = plotter.plot(trees[0], x_min, x_max, points)
+        return x, np.broadcast_to(y, x.shape)[np.newaxis]
+    return plotter.plot_many(trees, x_min, x_max, points)
+
+
+def run_batch(jobs, parser, plotter):
+    """
+    Computes the responses of a batch of jobs. Identical jobs are computed
+    once, every expression is parsed once and the plots of each x grid are
+    evaluated together.
+
+    Parameters
+    ----------
+    jobs : list(Job)
+        The jobs to run
+    parser : Parser
+        Parses the expressions
+    plotter : Plotter
+        Evaluates the plots
+
+    Returns
+    -------
+    responses : list((int, str, bytes))
+        The status, content type and body of the response to every job
+    """
+
+    # imported here so the server starts without loading Matplotlib
+    from .batch import render_png
+
+    unique = {}
+    for job in jobs:
+        unique.setdefault(job.key, job)
+
+    trees = {}
+    for job in unique.values():
+        if job.expression in trees:
+            continue
+        try:
+            tree = parser.parse(job.expression)
+            if tree is None:
+                raise ParserError("Empty expression")
+            trees[job.expression] = tree
+        except ParserError as e:
+            trees[job.expression] = e
+
+    responses = {}
+    grids = {}
+    for key, job in unique.items():
+        tree = trees[job.expression]
+        if isinstance(tree, ParserError):
+            responses[key] = _error_response(400, str(tree))
+        elif job.kind == 'parse':
+            postfix = _postfix(tree)
+            body = {'postfix': postfix, 'nodes': len(postfix)}
+            responses[key] = 200, JSON_TYPE, json.dumps(body).encode('utf-8')
+        else:
+            grids.setdefault(job.grid, []).append(job)
+
+    for (x_min, x_max, points), group in grids.items():
+        expressions = list(dict.fromkeys(job.expression for job in group))
+        try:
+            # undefined values are answered as null, not warned about
+            with np.errstate(all='ignore'):
+                x, rows = _evaluate_group(plotter, [trees[e] for e in
+                                                    expressions],
+                                          x_min, x_max, points)
+        except (XRangeError, EvaluationError) as e:
+            for job in group:
+                responses[job.key] = _error_response(400, str(e))
+            continue
+        except Exception as e:
+            # an unexpected failure only fails the jobs of this grid, not
+            # the unrelated jobs that happen to share the batch
+            for job in group:
+                responses[job.key] = _error_response(500, str(e))
+            continue
+
+        rows = dict(zip(expressions, rows))
+        for job in group:
+            y = rows[job.expression]
+            if job.kind == 'plot':
+                body = {'x': _to_list(x), 'y': _to_list(y)}
+                responses[job.key] = (200, JSON_TYPE, json.dumps(
+                    body, allow_nan=False).encode('utf-8'))
+                continue
+            try:
+                image = io.BytesIO()
+                render_png(image, x, y, job.expression, job.width,
+                           job.height)
+            except Exception as e:
+                # like an evaluation failure, a failed render only fails
+                # its own job
+                responses[job.key] = _error_response(500, str(e))
+                continue
+            responses[job.key] = 200, PNG_TYPE, image.getvalue()
+
+    return [responses[job.key] for job in jobs]
+
+
+class Request(object):
+    """
+    An HTTP request read from a connection.
+    """
+
+    def __init__(self, method, path, version, headers, body):
+        self.method = method
+        self.path = path
+        self.version = version
+        self.headers = headers
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        """
+        Returns
+        -------
+        keep_alive : bool
+            Whether the client wants to send more requests on the connection
+        """
+
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+
+async def read_request(reader):
+    """
+    Reads one HTTP request.
+
+    Parameters
+    ----------
+    reader : asyncio.StreamReader
+        The connection to read from
+
+    Returns
+    -------
+    request : Request
+        The request, or None if the connection was closed
+
+    Raises
+    ------
+    ServerError
+        Malformed request or body too large
+    """
+
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ServerError(400, "Malformed request line")
+    method, target, version = parts
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise ServerError(400, "Malformed Content-Length")
+    if length > MAX_BODY:
+        raise ServerError(413, f"The body must be at most {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length > 0 else b''
+
+    path = target.split('?', 1)[0]
+    return Request(method.upper(), path, version, headers, body)
+
+
+def write_response(writer, status, content_type, body, keep_alive=True):
+    """
+    Writes an HTTP response, see run_batch() for the parameters.
+    """
+
+    head = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if status == 503:
+        head.append("Retry-After: 1")
+    writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+
+
+class PlotServer(object):
+    """
+    Represents the HTTP server. Create it, then await start() from a running
+    event loop and stop() to shut it down.
+    """
+
+    def __init__(self, parser=None, plotter=None, workers=4, max_queue=64,
+                 max_batch=32, batch_window=0.001):
+        """
+        Parameters
+        ----------
+        parser : Parser
+            The Parser service. Defaults to a new Parser.
+        plotter : Plotter
+            The Plotter service. Defaults to a new Plotter without a cache.
+        workers : int
+            The number of batches computed at the same time, each in its own
+            thread. Defaults to 4.
+        max_queue : int
+            The number of requests that can wait for a worker before new
+            ones are rejected with 503. Defaults to 64.
+        max_batch : int
+            The maximum number of requests computed in one batch.
+            Defaults to 32.
+        batch_window : float
+            Seconds an idle worker waits after the first request of a batch
+            for more to arrive, 0 to never wait. Defaults to 0.001.
+        """
+
+        self.parser = parser or Parser()
+        self.plotter = plotter or Plotter()
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self.port = None
+        self._server = None
+        self._queue = None
+        self._tasks = []
+        self._executor = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        """
+        Starts listening and the worker tasks.
+
+        Parameters
+        ----------
+        host : str
+            The address to listen on. Defaults to localhost only.
+        port : int
+            The port to listen on, 0 for any free port. Defaults to 0.
+
+        Returns
+        -------
+        port : int
+            The port the server listens on
+        """
+
+        self._queue = asyncio.Queue(self.max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        # measure the backends now instead of in the first plot request
+        self._executor.submit(default_selector().ensure_calibrated)
+        self._tasks = [asyncio.ensure_future(self._work())
+                       for _ in range(self.workers)]
+        self._server = await asyncio.start_server(self._handle, host, port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        """
+        Stops listening, cancels the workers and fails waiting requests.
+        """
+
+        self._server.close()
+        await self._server.wait_closed()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_result(_error_response(
+                    503, "The server is shutting down"))
+        self._executor.shutdown(wait=True)
+
+    async def _work(self):
+        """
+        Takes batches of jobs off the queue and computes them in the thread
+        pool.
+        """
+
+        loop = asyncio.get_running_loop()
+        while True:
+            jobs = [await self._queue.get()]
+            if self.batch_window and self._queue.empty():
+                await asyncio.sleep(self.batch_window)
+            while len(jobs) < self.max_batch and not self._queue.empty():
+                jobs.append(self._queue.get_nowait())
+
+            try:
+                responses = await loop.run_in_executor(
+                    self._executor, run_batch, jobs, self.parser,
+                    self.plotter)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # a bug in a service must not take the worker down with it
+                responses = [_error_response(500, str(e))] * len(jobs)
+
+            for job, response in zip(jobs, responses):
+                # the client may have disconnected in the meantime
+                if not job.future.done():
+                    job.future.set_result(response)
+
+    async def _respond(self, request):
+        """
+        Returns
+        -------
+        response : (int, str, bytes)
+            The status, content type and body of the response
+        """
+
+        if request.path not in ENDPOINTS:
+            return _error_response(404, f"Unknown path '{request.path}'")
+        if request.method != 'POST':
+            return _error_response(405, "Use POST")
+        try:
+            job = make_job(request.path, request.body)
+        except ServerError as e:
+            return _error_response(e.status, str(e))
+
+        job.future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return _error_response(503, "The server is busy, try again")
+        return await job.future
+
+    async def _handle(self, reader, writer):
+        """
+        Serves the requests of one connection until it's closed.
+        """
+
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except ServerError as e:
+                    write_response(writer, *_error_response(e.status, str(e)),
+                                   keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                response = await self._respond(request)
+                write_response(writer, *response,
+                               keep_alive=request.keep_alive)
+                await writer.drain()
+                if not request.keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def main(argv=None):
+    """
+    The command line entry point, serves until interrupted.
+    """
+
+    arg_parser = argparse.ArgumentParser(
+        prog="python -m plotter.server",
+        description="Serve the Parser and Plotter over HTTP/JSON.")
+    arg_parser.add_argument('--host', default='127.0.0.1',
+                            help="address to listen on")
+    arg_parser.add_argument('-p', '--port', type=int, default=8000,
+                            help="port to listen on")
+    arg_parser.add_argument('-j', '--workers', type=int, default=4,
+                            help="batches computed at the same time")
+    arg_parser.add_argument('-q', '--max-queue', type=int, default=64,
+                            help="waiting requests before answering 503")
+    args = arg_parser.parse_args(argv)
+
+    async def serve():
+        server = PlotServer(workers=args.workers, max_queue=args.max_queue)
+        port = await server.start(args.host, args.port)
+        print(f"Serving on http://{args.host}:{port}", file=sys.stderr)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await server.stop()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
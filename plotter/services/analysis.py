@@ -0,0 +1,272 @@
+## The analysis service finds the roots, extrema and intersections of plotted
+## functions. The evaluated grid is scanned for sign changes in one vectorized
+## pass, then all the brackets found are refined at once: every iteration
+## evaluates the expression tree a single time on an array holding one new
+## point per bracket.
+
+import numpy as np
+from ..models.expression import ExprTNode, SubOperator
+from .discontinuity import find_jumps
+
+
+# the inverse golden ratio, used by the golden section search
+_INV_PHI = (np.sqrt(5) - 1) / 2
+
+
+class Analyzer(object):
+    """
+    Represents an Analyzer service. The Analyzer takes an expression tree and
+    the grid it was evaluated on, and locates roots, extrema and
+    intersections to full precision.
+    """
+
+    def __init__(self, tol=1e-12, max_iter=100):
+        """
+        Parameters
+        ----------
+        tol : float
+            The relative width at which a bracket is considered converged.
+            Defaults to 1e-12.
+        max_iter : int
+            The maximum number of refinement iterations. Defaults to 100.
+        """
+
+        self.tol = tol
+        self.max_iter = max_iter
+
+    def _prepare(self, tree, x, y, params):
+        x = np.asarray(x, dtype=np.float64)
+        if y is None:
+            y = tree.evaluate(x, params)
+        y = np.broadcast_to(np.asarray(y, dtype=np.float64), x.shape)
+
+        def f(t):
+            return np.broadcast_to(tree.evaluate(t, params), t.shape)
+
+        return x, y, f
+
+    def find_roots(self, tree, x, y=None, params=None):
+        """
+        Finds the roots of the function on the grid's range.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression of the function
+        x : numpy.ndarray
+            The sorted grid the function was evaluated on
+        y : numpy.ndarray
+            The values of the function on the grid, evaluated if not given
+        params : dict(str, value)
+            The values of named parameter operands
+
+        Returns
+        -------
+        roots : numpy.ndarray
+            The sorted x values of the roots
+        """
+
+        x, y, f = self._prepare(tree, x, y, params)
+
+        with np.errstate(all='ignore'):
+            finite = np.isfinite(y[:-1]) & np.isfinite(y[1:])
+            brackets = np.flatnonzero(finite & (y[:-1] * y[1:] < 0))
+        # a sign change across a pole is not a root
+        brackets = np.setdiff1d(brackets, find_jumps(y))
+
+        exact = x[y == 0]
+        if brackets.size == 0:
+            return np.unique(exact)
+
+        a = x[brackets]
+        b = x[brackets + 1]
+        fa = y[brackets]
+        fb = y[brackets + 1]
+        roots = self._refine_roots(f, a, b, fa, fb)
+
+        # reject brackets where the function grows while converging, i.e.
+        # poles the jump detection missed
+        with np.errstate(all='ignore'):
+            f_roots = np.abs(f(roots))
+        keep = f_roots <= np.minimum(np.abs(fa), np.abs(fb))
+        return np.unique(np.concatenate((exact, roots[keep])))
+
+    def _refine_roots(self, f, a, b, fa, fb):
+        """
+        Refines all brackets at once with the Illinois variant of regula
+        falsi, falling back to bisection when the secant step leaves the
+        bracket. Like Brent's method it always keeps a valid bracket and
+        converges superlinearly on smooth functions.
+
+        Returns
+        -------
+        roots : numpy.ndarray
+            The root in every bracket
+        """
+
+        a = a.copy()
+        b = b.copy()
+        fa = fa.copy()
+        fb = fb.copy()
+        c = (a + b) / 2
+        # which end was kept by the last step, -1 for a and 1 for b
+        kept = np.zeros(a.shape, dtype=np.int8)
+        active = np.arange(a.size)
+
+        with np.errstate(all='ignore'):
+            for _ in range(self.max_iter):
+                if active.size == 0:
+                    break
+                ai, bi, fai, fbi = a[active], b[active], fa[active], fb[active]
+
+                ci = bi - fbi * (bi - ai) / (fbi - fai)
+                outside = ~((ci > np.minimum(ai, bi)) &
+                            (ci < np.maximum(ai, bi)))
+                ci[outside] = ((ai + bi) / 2)[outside]
+                fci = f(ci)
+                c[active] = ci
+
+                same_as_a = np.signbit(fci) == np.signbit(fai)
+                keep_b = same_as_a
+                # Illinois: halve the value of an end kept twice in a row
+                ki = kept[active]
+                fbi = np.where(keep_b & (ki == 1), fbi / 2, fbi)
+                fai = np.where(~keep_b & (ki == -1), fai / 2, fai)
+
+                a[active] = np.where(keep_b, ci, ai)
+                fa[active] = np.where(keep_b, fci, fai)
+                b[active] = np.where(keep_b, bi, ci)
+                fb[active] = np.where(keep_b, fbi, fci)
+                kept[active] = np.where(keep_b, 1, -1)
+
+                width = np.abs(b[active] - a[active])
+                done = ((fci == 0) |
+                        (width <= self.tol * np.maximum(1.0, np.abs(ci))))
+                active = active[~done]
+
+        return c
+
+    def find_extrema(self, tree, x, y=None, params=None):
+        """
+        Finds the local minima and maxima of the function inside the grid's
+        range.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression of the function
+        x : numpy.ndarray
+            The sorted grid the function was evaluated on
+        y : numpy.ndarray
+            The values of the function on the grid, evaluated if not given
+        params : dict(str, value)
+            The values of named parameter operands
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The x values of the extrema, sorted
+        y : numpy.ndarray
+            The y values of the extrema
+        is_max : numpy.ndarray
+            True for maxima and False for minima
+        """
+
+        x, y, f = self._prepare(tree, x, y, params)
+
+        with np.errstate(all='ignore'):
+            dy = np.diff(y)
+            turning = np.flatnonzero(dy[:-1] * dy[1:] < 0) + 1
+        finite = (np.isfinite(y[turning - 1]) & np.isfinite(y[turning]) &
+                  np.isfinite(y[turning + 1]))
+        # the largest point next to a pole is not a maximum
+        near_pole = np.isin(turning, find_jumps(y)) | \
+                    np.isin(turning - 1, find_jumps(y))
+        turning = turning[finite & ~near_pole]
+
+        if turning.size == 0:
+            empty = np.empty(0)
+            return empty, empty, np.empty(0, dtype=bool)
+
+        is_max = dy[turning - 1] > 0
+        # minimize f for minima and -f for maxima
+        sign = np.where(is_max, -1.0, 1.0)
+        x_ext = self._golden_section(f, x[turning - 1], x[turning + 1], sign)
+        with np.errstate(all='ignore'):
+            y_ext = f(x_ext)
+
+            # a smooth extremum is only slightly beyond the sampled one, the
+            # search runs away towards a pole that doesn't change sign
+            gain = np.abs(y_ext - y[turning])
+            step = np.maximum(np.abs(dy[turning - 1]), np.abs(dy[turning]))
+            keep = np.isfinite(y_ext) & (gain <= 10 * step)
+        return x_ext[keep], y_ext[keep], is_max[keep]
+
+    def _golden_section(self, f, a, b, sign):
+        """
+        Minimizes sign * f in all brackets at once with the golden section
+        search, one new point per bracket and iteration.
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The minimizer in every bracket
+        """
+
+        a = a.copy()
+        b = b.copy()
+        c = b - _INV_PHI * (b - a)
+        d = a + _INV_PHI * (b - a)
+        with np.errstate(all='ignore'):
+            fc = sign * f(c)
+            fd = sign * f(d)
+
+            for _ in range(self.max_iter):
+                if (np.abs(b - a) <=
+                        self.tol * np.maximum(1.0, np.abs(a))).all():
+                    break
+
+                left = fc < fd
+                # the minimum is in [a, d] if left, else in [c, b]
+                b = np.where(left, d, b)
+                a = np.where(left, a, c)
+                new_c = b - _INV_PHI * (b - a)
+                new_d = a + _INV_PHI * (b - a)
+                new_x = np.where(left, new_c, new_d)
+                f_new = sign * f(new_x)
+
+                fd, fc = (np.where(left, fc, f_new),
+                          np.where(left, f_new, fd))
+                d, c = (np.where(left, c, new_d),
+                        np.where(left, new_c, d))
+
+        return (a + b) / 2
+
+    def find_intersections(self, tree_a, tree_b, x, params=None):
+        """
+        Finds the points where two functions intersect, the roots of their
+        difference.
+
+        Parameters
+        ----------
+        tree_a : ExprTNode
+            The expression of the first function
+        tree_b : ExprTNode
+            The expression of the second function
+        x : numpy.ndarray
+            The sorted grid to search on
+        params : dict(str, value)
+            The values of named parameter operands
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The sorted x values of the intersections
+        y : numpy.ndarray
+            The y values of the intersections
+        """
+
+        difference = ExprTNode(SubOperator(), left=tree_a, right=tree_b)
+        roots = self.find_roots(difference, x, params=params)
+        y = np.broadcast_to(tree_a.evaluate(roots, params), roots.shape)
+        return roots, np.array(y)
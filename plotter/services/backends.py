@@ -0,0 +1,633 @@
+## The backends service provides interchangeable ways of evaluating an
+## expression tree on an array of x values, and picks the fastest one for a
+## call from the number of points and the size of the tree:
+## - tree: ExprTNode.evaluate(), walks the tree for every call
+## - compiled: the tree compiled once into nested closures with scalar
+##   constants, so no constant arrays are allocated
+## - threaded: the compiled closures run on shards of x in a thread pool,
+##   numpy releases the GIL inside its loops
+## - fused: the tree compiled into a flat program of ufunc calls that runs
+##   whole on one cache-sized block of x at a time, writing every
+##   intermediate into a small scratch buffer that stays in the CPU cache
+##
+## The choice is made from a table measured by a short calibration run the
+## first time a backend is selected automatically. Backends can also be
+## registered by other modules and forced by name.
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from ..util import EvaluationError
+from ..models.expression import (
+    Operator, Operand, PowOperator, MulOperator, DivOperator, AddOperator,
+    SubOperator
+    )
+from ..models.serialization import SerializationError
+
+
+class BackendError(Exception):
+    pass
+
+
+def count_nodes(tree):
+    """
+    Returns
+    -------
+    count : int
+        The number of nodes in the tree
+    """
+
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node is None:
+            continue
+        count += 1
+        stack.append(node.left)
+        stack.append(node.right)
+    return count
+
+
+def _as_result(value, x):
+    """
+    Returns
+    -------
+    y : numpy.ndarray
+        The value of an expression as a new, writable array shaped like x
+    """
+
+    if isinstance(value, np.ndarray) and value.shape == x.shape:
+        # the tree 'x' evaluates to x itself
+        return value.copy() if value is x else value
+    y = np.empty(x.shape, dtype=np.result_type(x.dtype, value))
+    y[...] = value
+    return y
+
+
+class Backend(object):
+    """
+    The base class of evaluation backends.
+    """
+
+    # the name the backend is registered and forced with
+    name = None
+
+    def evaluate(self, tree, x):
+        """
+        Evaluates an expression tree.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression tree to evaluate
+        x : numpy.ndarray
+            The x values
+
+        Returns
+        -------
+        y : numpy.ndarray
+            The values of the expression in a new array shaped like x
+
+        Raises
+        ------
+        EvaluationError
+            Tree is built incorrectly
+        """
+
+        raise NotImplementedError
+
+
+class TreeWalkBackend(Backend):
+    """
+    Evaluates with ExprTNode.evaluate().
+    """
+
+    name = 'tree'
+
+    def evaluate(self, tree, x):
+        return _as_result(tree.evaluate(x), x)
+
+
+def compile_tree(tree):
+    """
+    Compiles an expression tree into a function of x made of nested
+    closures. Constants stay Python floats and broadcast in the operations
+    using them without changing the dtype of x. Subtrees without x are
+    folded into a single constant when compiled, with numpy semantics, e.g.
+    1/0 is inf instead of raising ZeroDivisionError.
+
+    Parameters
+    ----------
+    tree : ExprTNode
+        The expression tree to compile
+
+    Returns
+    -------
+    func : (numpy.ndarray) -> value
+        Evaluates the expression, returns a float if it doesn't use x
+
+    Raises
+    ------
+    EvaluationError
+        Tree is built incorrectly or has parameter operands
+    """
+
+    return _compile_node(tree)[0]
+
+
+def _compile_node(tree):
+    """
+    Returns
+    -------
+    func : (numpy.ndarray) -> value
+        The compiled subtree
+    value : float
+        The value of the subtree if it's constant, otherwise None
+    """
+
+    op = tree.key
+    if isinstance(op, Operand):
+        if op.is_x:
+            if op.is_neg:
+                return (lambda x: -x), None
+            return (lambda x: x), None
+        elif op.name is not None:
+            raise EvaluationError(f"Can't compile parameter '{op.name}'")
+        value = op.value
+        return (lambda x: value), value
+    elif isinstance(op, Operator):
+        if tree.left is None or tree.right is None:
+            raise EvaluationError(f"Expression tree has an incorrect "
+                "syntactical structure")
+
+        func = op.func
+        left, left_value = _compile_node(tree.left)
+        right, right_value = _compile_node(tree.right)
+        if left_value is not None and right_value is not None:
+            # fold with numpy scalars for the same results as arrays
+            with np.errstate(all='ignore'):
+                value = float(_UFUNCS[type(op)](np.float64(left_value),
+                                                np.float64(right_value)))
+            return (lambda x: value), value
+        return (lambda x: func(left(x), right(x))), None
+    else:
+        raise EvaluationError(f"Unexpected object '{op}' in tree node")
+
+
+class CompiledBackend(Backend):
+    """
+    Evaluates with closures compiled from the tree, see compile_tree().
+    Compiled trees are kept for reuse, keyed by their binary encoding.
+    """
+
+    name = 'compiled'
+
+    # how many compiled trees to keep
+    MAX_COMPILED = 128
+
+    def __init__(self):
+        self._compiled = {}
+        # backends are shared between threads, e.g. the server's batches
+        self._lock = threading.Lock()
+
+    def compile(self, tree):
+        """
+        Returns
+        -------
+        func : (numpy.ndarray) -> value
+            The compiled tree, from the cache if it was compiled before
+        """
+
+        try:
+            key = tree.to_bytes()
+        except SerializationError:
+            return self._build(tree)
+
+        with self._lock:
+            func = self._compiled.pop(key, None)
+            if func is not None:
+                self._compiled[key] = func
+                return func
+
+        # build outside the lock, two threads may build the same tree once
+        func = self._build(tree)
+        with self._lock:
+            self._compiled.pop(key, None)
+            if len(self._compiled) >= self.MAX_COMPILED:
+                # dicts keep insertion order, the first key is the oldest
+                del self._compiled[next(iter(self._compiled))]
+            self._compiled[key] = func
+        return func
+
+    def _build(self, tree):
+        return compile_tree(tree)
+
+    def evaluate(self, tree, x):
+        return _as_result(self.compile(tree)(x), x)
+
+
+class ShardedBackend(CompiledBackend):
+    """
+    Evaluates compiled trees on equal shards of x in a thread pool.
+    """
+
+    name = 'threaded'
+
+    def __init__(self, workers=None):
+        """
+        Parameters
+        ----------
+        workers : int
+            The number of threads. Defaults to the number of CPUs.
+        """
+
+        super().__init__()
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = None
+
+    def evaluate(self, tree, x):
+        func = self.compile(tree)
+        if self.workers == 1 or x.ndim != 1 or len(x) < 2 * self.workers:
+            return _as_result(func(x), x)
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers)
+
+        out = np.empty(x.shape, dtype=np.result_type(x.dtype, np.float32))
+        bounds = np.linspace(0, len(x), self.workers + 1).astype(np.intp)
+
+        def evaluate_shard(shard):
+            start, stop = bounds[shard], bounds[shard + 1]
+            out[start:stop] = func(x[start:stop])
+
+        # consume the iterator to raise any evaluation error
+        list(self._executor.map(evaluate_shard, range(self.workers)))
+        return out
+
+
+# operand kinds of fused program instructions
+_X = 0
+_SLOT = 1
+_CONST = 2
+
+_UFUNCS = {
+    PowOperator: np.power,
+    MulOperator: np.multiply,
+    DivOperator: np.true_divide,
+    AddOperator: np.add,
+    SubOperator: np.subtract
+}
+
+# powers ndarray.__pow__ computes with a cheaper ufunc, used for the same
+# results as ExprTNode.evaluate()
+_POWER_UFUNCS = {
+    2.0: np.square,
+    0.5: np.sqrt,
+    1.0: np.positive,
+    -1.0: np.reciprocal
+}
+
+
+class FusedProgram(object):
+    """
+    An expression tree compiled into a flat list of ufunc calls in postfix
+    order. Every stack position of the postfix evaluation is a slot with its
+    own scratch buffer, so running the program on a block of x allocates
+    nothing.
+    """
+
+    def __init__(self, tree):
+        """
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression tree to compile
+
+        Raises
+        ------
+        EvaluationError
+            Tree is built incorrectly or has parameter operands
+        """
+
+        # instructions are (ufunc, kind_a, a, kind_b, b, slot) tuples, where
+        # an operand is x, a slot index or a constant, and b is None for
+        # unary ufuncs
+        self.instructions = []
+        self.n_slots = 0
+        self.result = self._compile(tree, 0)
+
+    def _compile(self, node, slot):
+        """
+        Emits the instructions of a subtree whose value goes to the given
+        stack position.
+
+        Returns
+        -------
+        operand : (int, value)
+            The kind and value of the subtree's result
+        """
+
+        op = node.key
+        if isinstance(op, Operand):
+            if op.is_x:
+                if not op.is_neg:
+                    return _X, None
+                self._emit(np.negative, (_X, None), None, slot)
+                return _SLOT, slot
+            elif op.name is not None:
+                raise EvaluationError(f"Can't compile parameter '{op.name}'")
+            return _CONST, op.value
+        elif isinstance(op, Operator):
+            if node.left is None or node.right is None:
+                raise EvaluationError(f"Expression tree has an incorrect "
+                    "syntactical structure")
+
+            left = self._compile(node.left, slot)
+            right = self._compile(node.right, slot + 1)
+            if left[0] == _CONST and right[0] == _CONST:
+                # fold with numpy scalars for the same results as arrays
+                with np.errstate(all='ignore'):
+                    value = _UFUNCS[type(op)](np.float64(left[1]),
+                                              np.float64(right[1]))
+                return _CONST, float(value)
+
+            if (isinstance(op, PowOperator) and right[0] == _CONST and
+                    right[1] in _POWER_UFUNCS):
+                self._emit(_POWER_UFUNCS[right[1]], left, None, slot)
+            else:
+                self._emit(_UFUNCS[type(op)], left, right, slot)
+            return _SLOT, slot
+        else:
+            raise EvaluationError(f"Unexpected object '{op}' in tree node")
+
+    def _emit(self, ufunc, a, b, slot):
+        kind_b, b = b if b is not None else (None, None)
+        self.instructions.append((ufunc, a[0], a[1], kind_b, b, slot))
+        self.n_slots = max(self.n_slots, slot + 1)
+
+    def run(self, x, out, block_size):
+        """
+        Runs the program block by block.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The 1-D x values
+        out : numpy.ndarray
+            The 1-D array to write the values to, slot 0 of every block is
+            its slice of out so the result needs no copy
+        block_size : int
+            The number of points per block
+        """
+
+        kind, value = self.result
+        if kind == _X:
+            out[...] = x
+            return
+        elif kind == _CONST:
+            out[...] = value
+            return
+
+        scratch = [np.empty(block_size, dtype=out.dtype)
+                   for _ in range(self.n_slots - 1)]
+        instructions = self.instructions
+        with np.errstate(all='ignore'):
+            for start in range(0, len(x), block_size):
+                stop = min(start + block_size, len(x))
+                x_block = x[start:stop]
+                if stop - start == block_size:
+                    slots = [out[start:stop]] + scratch
+                else:
+                    slots = [out[start:stop]] + [buffer[:stop - start]
+                                                 for buffer in scratch]
+
+                for ufunc, kind_a, a, kind_b, b, slot in instructions:
+                    if kind_a == _X:
+                        a = x_block
+                    elif kind_a == _SLOT:
+                        a = slots[a]
+                    if kind_b is None:
+                        ufunc(a, out=slots[slot])
+                        continue
+                    if kind_b == _X:
+                        b = x_block
+                    elif kind_b == _SLOT:
+                        b = slots[b]
+                    ufunc(a, b, out=slots[slot])
+
+
+class FusedBackend(CompiledBackend):
+    """
+    Evaluates fused programs, see FusedProgram, so every intermediate stays
+    in the CPU cache and only x and the result go through main memory.
+    """
+
+    name = 'fused'
+
+    # 4096 float64 values are 32 KiB, a few scratch buffers fit in L2
+    BLOCK_SIZE = 4096
+
+    def __init__(self, block_size=None):
+        """
+        Parameters
+        ----------
+        block_size : int
+            The number of points per block. Defaults to BLOCK_SIZE.
+        """
+
+        super().__init__()
+        self.block_size = block_size or self.BLOCK_SIZE
+
+    def _build(self, tree):
+        return FusedProgram(tree)
+
+    def evaluate(self, tree, x):
+        program = self.compile(tree)
+        flat = np.ravel(x)
+        out = np.empty(flat.shape, dtype=np.result_type(x.dtype, np.float32))
+        program.run(flat, out, self.block_size)
+        return out.reshape(x.shape)
+
+
+_BACKENDS = {}
+
+
+def register_backend(backend):
+    """
+    Registers a backend so it can be forced by name and is considered by
+    automatic selection.
+
+    Parameters
+    ----------
+    backend : Backend
+        The backend instance, registered under backend.name
+    """
+
+    _BACKENDS[backend.name] = backend
+    # a new backend invalidates the measured choices
+    _default_selector.table = None
+
+
+def get_backend(name):
+    """
+    Parameters
+    ----------
+    name : str
+        The name of a registered backend
+
+    Returns
+    -------
+    backend : Backend
+
+    Raises
+    ------
+    BackendError
+        No backend is registered with this name
+    """
+
+    try:
+        return _BACKENDS[name]
+    except KeyError:
+        raise BackendError(f"Unknown backend '{name}', available backends "
+                           f"are {', '.join(available_backends())}")
+
+
+def available_backends():
+    """
+    Returns
+    -------
+    names : list(str)
+        The names of the registered backends
+    """
+
+    return list(_BACKENDS)
+
+
+class BackendSelector(object):
+    """
+    Picks the fastest registered backend for a number of points and a tree
+    size, from a table measured the first time it's needed. The calibration
+    runs once, threads selecting at the same time wait for it.
+    """
+
+    # the grid sizes measured by the calibration, the largest doesn't fit in
+    # the CPU caches, which is where the fused backend pays off
+    SIZES = (1 << 10, 1 << 13, 1 << 16, 1 << 20)
+    # sizes above this are timed once, a single run is long enough
+    REPEAT_BELOW = 1 << 16
+    # backends more than this many times slower than the fastest at a size
+    # are not timed at the larger sizes
+    PRUNE_FACTOR = 2.0
+    # trees representative of small and large expressions, and the node
+    # count separating the two classes
+    SHAPES = {'small': "x^2", 'large': "3*x^3 - 2*x^2 + x/(x^2 + 1) - 7"}
+    LARGE_TREE = 7
+
+    def __init__(self):
+        self.table = None
+        self._lock = threading.Lock()
+
+    def calibrate(self, repeat=3):
+        """
+        Times every registered backend on every calibration size and tree
+        shape, and keeps the fastest. Backends far behind the fastest at one
+        size are dropped for the larger sizes, so the largest size costs
+        little.
+
+        Parameters
+        ----------
+        repeat : int
+            How many times to time each combination up to REPEAT_BELOW
+            points, the fastest run counts. Defaults to 3.
+
+        Returns
+        -------
+        table : dict((int, str), str)
+            Maps (size, shape) to the name of the fastest backend
+        """
+
+        # imported here, the parser is only needed to build the trees
+        from .parser import Parser
+
+        parser = Parser()
+        table = {}
+        for shape, expression in self.SHAPES.items():
+            tree = parser.parse(expression)
+            candidates = dict(_BACKENDS)
+            for size in self.SIZES:
+                x = np.linspace(-10, 10, size)
+                runs = repeat if size <= self.REPEAT_BELOW else 1
+                times = {}
+                for name, backend in candidates.items():
+                    for _ in range(runs):
+                        start = time.perf_counter()
+                        backend.evaluate(tree, x)
+                        elapsed = time.perf_counter() - start
+                        times[name] = min(times.get(name, np.inf), elapsed)
+                best = min(times, key=times.get)
+                table[size, shape] = best
+                candidates = {name: backend
+                              for name, backend in candidates.items()
+                              if times[name] <= self.PRUNE_FACTOR *
+                              times[best]}
+        self.table = table
+        return table
+
+    def ensure_calibrated(self):
+        """
+        Calibrates unless a table was already measured. Can be called from a
+        background thread at startup, so the first plot doesn't wait for the
+        calibration.
+        """
+
+        if self.table is None:
+            with self._lock:
+                # another thread may have calibrated while this one waited
+                if self.table is None:
+                    self.calibrate()
+
+    def select(self, tree, n):
+        """
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression tree to evaluate
+        n : int
+            The number of points
+
+        Returns
+        -------
+        backend : Backend
+            The backend measured fastest for the closest size and shape
+        """
+
+        self.ensure_calibrated()
+
+        size = min(self.SIZES, key=lambda s: abs(np.log2(s) -
+                                                 np.log2(max(n, 1))))
+        shape = 'large' if count_nodes(tree) >= self.LARGE_TREE else 'small'
+        return _BACKENDS[self.table[size, shape]]
+
+
+_default_selector = BackendSelector()
+
+
+def default_selector():
+    """
+    Returns
+    -------
+    selector : BackendSelector
+        The selector shared by the whole process, calibrated once
+    """
+
+    return _default_selector
+
+
+for _backend in (TreeWalkBackend(), CompiledBackend(), ShardedBackend(),
+                 FusedBackend()):
+    register_backend(_backend)
@@ -0,0 +1,264 @@
+## The plot cache service stores evaluated plots on disk so they survive
+## restarts. Entries are .npy files keyed by a content hash of the expression
+## and the grid, hits are memory-mapped instead of read, and the total size of
+## the cache directory is bounded by evicting the least recently used entries.
+## Several processes can share a cache directory: entries are written to a
+## temporary file and atomically renamed into place.
+##
+## The cache is only an optimization: if the directory can't be created or
+## written, e.g. it's read-only or the disk is full, the error is logged and
+## plots are evaluated without the cache.
+
+import os
+import struct
+import hashlib
+import logging
+import tempfile
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_dir():
+    """
+    Returns
+    -------
+    directory : str
+        The per-user cache directory of the application
+    """
+
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser('~'), '.cache'))
+    return os.path.join(base, 'function-plotter')
+
+
+class PlotCache(object):
+    """
+    Represents a PlotCache service, an on-disk store of (x, y) plots.
+    """
+
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        """
+        Parameters
+        ----------
+        directory : str
+            The cache directory, created if missing. If it can't be created,
+            the cache stays empty.
+        max_bytes : int
+            The maximum total size of the cached entries. Defaults to 256 MiB.
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.warning("Can't create the plot cache directory %s, plots "
+                           "won't be cached: %s", directory, e)
+
+    def key(self, tree, x_min, x_max, n, dtype='float64', tag=''):
+        """
+        Computes the cache key of a plot.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression tree
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        n : int
+            The number of points
+        dtype : str
+            The dtype of the values. Defaults to 'float64'.
+        tag : str
+            Distinguishes differently post-processed plots of the same grid
+
+        Returns
+        -------
+        key : str
+            A hex digest identifying the plot
+
+        Raises
+        ------
+        SerializationError
+            The tree can't be encoded, e.g. it has array constants
+        """
+
+        h = hashlib.sha256(tree.to_bytes())
+        h.update(struct.pack('<ddq', x_min, x_max, n))
+        h.update(np.dtype(dtype).str.encode())
+        h.update(tag.encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.npy')
+
+    def get(self, key):
+        """
+        Looks up a plot. The returned arrays are read-only views of a memory
+        mapped file, nothing is copied.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by key()
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The x values, or None if the plot isn't cached
+        y : numpy.ndarray
+            The y values, or None if the plot isn't cached
+        """
+
+        data = self.get_array(key)
+        if data is None or data.ndim != 2 or data.shape[0] != 2:
+            return None, None
+        return data[0], data[1]
+
+    def get_array(self, key):
+        """
+        Looks up an array stored with put_array(), memory mapped like get().
+
+        Parameters
+        ----------
+        key : str
+            The key returned by key()
+
+        Returns
+        -------
+        data : numpy.ndarray
+            The read-only array, or None if it isn't cached
+        """
+
+        path = self._path(key)
+        try:
+            data = np.load(path, mmap_mode='r')
+            # mark the entry as recently used for eviction
+            os.utime(path)
+        except (OSError, ValueError):
+            # missing, evicted by another process or corrupt
+            return None
+        return data
+
+    def put(self, key, x, y):
+        """
+        Stores a plot, then evicts old entries if the cache is too big.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by key()
+        x : numpy.ndarray
+            The x values
+        y : numpy.ndarray
+            The y values, same length as x
+        """
+
+        self.put_array(key, np.vstack((x, y)))
+
+    def put_array(self, key, data):
+        """
+        Stores an array, e.g. values computed along with a plot, then evicts
+        old entries if the cache is too big. If the array can't be written,
+        the error is logged and nothing is stored.
+
+        Parameters
+        ----------
+        key : str
+            The key returned by key()
+        data : numpy.ndarray
+            The array to store
+        """
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        except OSError as e:
+            logger.warning("Can't write to the plot cache: %s", e)
+            return
+
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, data)
+            # atomic, readers see either no entry or a complete one
+            os.replace(tmp_path, self._path(key))
+        except BaseException as e:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if not isinstance(e, OSError):
+                raise
+            logger.warning("Can't write to the plot cache: %s", e)
+            return
+
+        self.evict()
+
+    def _entries(self):
+        """
+        Returns
+        -------
+        entries : list((float, int, str))
+            The last use time, size and path of every entry
+        """
+
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith('.npy'):
+                        continue
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        except OSError:
+            # the directory is missing or unreadable, nothing is cached
+            pass
+        return entries
+
+    def size(self):
+        """
+        Returns
+        -------
+        size : int
+            The total size of the cached entries in bytes
+        """
+
+        return sum(size for mtime, size, path in self._entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in
+        max_bytes.
+        """
+
+        entries = self._entries()
+        total = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # another process evicted it first
+                pass
+            except OSError:
+                # still mapped on a platform that doesn't allow removing it
+                continue
+            total -= size
+
+    def clear(self):
+        """
+        Removes all the cached entries.
+        """
+
+        for mtime, size, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,284 @@
+## The Chebyshev service replaces an expression tree by a Chebyshev
+## interpolant on a fixed x range, for functions that are plotted over and
+## over on the same range. The function is sampled at Chebyshev points of
+## increasing degree until the coefficients decay to machine precision, after
+## which evaluating, differentiating, integrating and root finding all work on
+## the coefficients (Clenshaw recurrence) instead of the tree. Functions that
+## aren't smooth enough to converge, e.g. with poles or kinks, are left to the
+## tree.
+
+import numpy as np
+from numpy.polynomial import Chebyshev
+from ..models.serialization import SerializationError
+
+
+def chebyshev_points(x_min, x_max, n):
+    """
+    Parameters
+    ----------
+    x_min : float
+        The minimum value of x
+    x_max : float
+        The maximum value of x
+    n : int
+        The number of points, at least 2
+
+    Returns
+    -------
+    x : numpy.ndarray
+        The n Chebyshev points of the second kind on [x_min, x_max], from
+        x_max down to x_min
+    """
+
+    t = np.cos(np.pi * np.arange(n) / (n - 1))
+    return (x_max + x_min) / 2 + (x_max - x_min) / 2 * t
+
+
+def values_to_coefficients(values):
+    """
+    Computes the coefficients of the polynomial interpolating values at the
+    Chebyshev points of the second kind, with one FFT.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        The values at the points returned by chebyshev_points()
+
+    Returns
+    -------
+    coefficients : numpy.ndarray
+        The Chebyshev coefficients, lowest degree first
+    """
+
+    n = len(values)
+    if n == 1:
+        return np.array(values, dtype=np.float64)
+
+    # the even extension turns the cosine transform into an FFT
+    extended = np.concatenate((values, values[-2:0:-1]))
+    coefficients = np.fft.rfft(extended).real[:n] / (n - 1)
+    coefficients[0] /= 2
+    coefficients[-1] /= 2
+    return coefficients
+
+
+class ChebyshevProxy(object):
+    """
+    A Chebyshev interpolant standing in for an expression tree on a fixed x
+    range. It has the same evaluate() method as ExprTNode, so it can be
+    passed to the Plotter instead of the tree.
+    """
+
+    # the degree above which roots are found by bracketing on a grid instead
+    # of from the eigenvalues of the colleague matrix
+    MAX_EIGEN_DEGREE = 128
+
+    def __init__(self, series, tree=None):
+        """
+        Parameters
+        ----------
+        series : numpy.polynomial.Chebyshev
+            The interpolant, its domain is the x range
+        tree : ExprTNode
+            The function the interpolant approximates, evaluated for x
+            values outside the range. If None, those values are NaN.
+        """
+
+        self.series = series
+        self.tree = tree
+
+    @staticmethod
+    def fit(tree, x_min, x_max, tol=1e-14, max_degree=1 << 16):
+        """
+        Interpolates an expression tree on an x range, doubling the degree
+        until the trailing coefficients fall below tol.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression tree to interpolate
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        tol : float
+            The size of negligible coefficients, relative to the largest
+            value of the function. Defaults to 1e-14.
+        max_degree : int
+            The largest degree to try. Defaults to 65536.
+
+        Returns
+        -------
+        proxy : ChebyshevProxy
+            The interpolant, or None if the function isn't smooth enough to
+            converge
+        """
+
+        n = 17
+        while n - 1 <= max_degree:
+            x = chebyshev_points(x_min, x_max, n)
+            with np.errstate(all='ignore'):
+                values = np.broadcast_to(tree.evaluate(x), x.shape)
+            if not np.isfinite(values).all():
+                return None
+
+            coefficients = values_to_coefficients(values)
+            scale = np.abs(values).max()
+            if scale == 0:
+                return ChebyshevProxy(
+                    Chebyshev([0.0], domain=[x_min, x_max]), tree)
+
+            # converged once a tail of the coefficients is negligible
+            significant = np.flatnonzero(np.abs(coefficients) > tol * scale)
+            tail = max(8, n // 8)
+            if significant[-1] < n - tail:
+                series = Chebyshev(coefficients[:significant[-1] + 1],
+                                   domain=[x_min, x_max])
+                return ChebyshevProxy(series, tree)
+            n = 2 * n - 1
+        return None
+
+    @property
+    def degree(self):
+        """
+        Returns
+        -------
+        degree : int
+            The degree of the interpolant
+        """
+
+        return self.series.degree()
+
+    @property
+    def domain(self):
+        """
+        Returns
+        -------
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        """
+
+        return tuple(self.series.domain)
+
+    def to_bytes(self):
+        # plots of proxies are not cached, they are cheap to evaluate again
+        raise SerializationError("Can't encode a Chebyshev proxy")
+
+    def evaluate(self, x=0.0, params=None):
+        """
+        Evaluates the interpolant with the Clenshaw recurrence. Values of x
+        outside the range are evaluated with the tree.
+
+        Parameters
+        ----------
+        x
+            The value of x. Can be a numpy ndarray.
+            Defaults to 0.
+        params : dict(str, value)
+            Passed to the tree for values outside the range
+
+        Returns
+        -------
+        result
+            Has the same shape as x
+        """
+
+        x_min, x_max = self.domain
+        x_arr = np.asarray(x)
+        y = np.asarray(self.series(x_arr), dtype=np.float64)
+
+        outside = (x_arr < x_min) | (x_arr > x_max)
+        if outside.any():
+            y = np.array(y)
+            if self.tree is None:
+                y[outside] = np.nan
+            else:
+                x_out = x_arr[outside] if x_arr.ndim else x_arr
+                y_out = np.broadcast_to(self.tree.evaluate(x_out, params),
+                                        np.shape(x_out))
+                if x_arr.ndim:
+                    y[outside] = y_out
+                else:
+                    y = np.asarray(y_out)
+
+        if not isinstance(x, np.ndarray):
+            return float(y)
+        return y
+
+    def derivative(self):
+        """
+        Returns
+        -------
+        proxy : ChebyshevProxy
+            The derivative, differentiated from the coefficients. Values
+            outside the range are NaN.
+        """
+
+        return ChebyshevProxy(self.series.deriv())
+
+    def antiderivative(self):
+        """
+        Returns
+        -------
+        proxy : ChebyshevProxy
+            The antiderivative that is 0 at the start of the range. Values
+            outside the range are NaN.
+        """
+
+        return ChebyshevProxy(self.series.integ(lbnd=self.domain[0]))
+
+    def integrate(self, a=None, b=None):
+        """
+        Parameters
+        ----------
+        a : float
+            The lower limit, defaults to the start of the range
+        b : float
+            The upper limit, defaults to the end of the range
+
+        Returns
+        -------
+        integral : float
+            The definite integral of the function from a to b
+        """
+
+        x_min, x_max = self.domain
+        antiderivative = self.series.integ()
+        a = x_min if a is None else a
+        b = x_max if b is None else b
+        return float(antiderivative(b) - antiderivative(a))
+
+    def roots(self, tol=1e-8):
+        """
+        Finds the real roots inside the range.
+
+        Parameters
+        ----------
+        tol : float
+            How far outside the range or off the real axis a root of the
+            polynomial may be, in units of the half range width.
+            Defaults to 1e-8.
+
+        Returns
+        -------
+        roots : numpy.ndarray
+            The sorted roots
+        """
+
+        x_min, x_max = self.domain
+        if self.degree <= self.MAX_EIGEN_DEGREE:
+            # in the window [-1, 1], the roots are the eigenvalues of the
+            # colleague matrix
+            window = np.polynomial.chebyshev.chebroots(self.series.coef)
+            window = window[(np.abs(window.imag) <= tol) &
+                            (np.abs(window.real) <= 1 + tol)].real
+            roots = (x_max + x_min) / 2 + (x_max - x_min) / 2 * \
+                np.clip(window, -1, 1)
+            return np.sort(roots)
+
+        # imported here, the analysis service is only needed for high degrees
+        from .analysis import Analyzer
+        x = np.linspace(x_min, x_max, 8 * self.degree)
+        return Analyzer().find_roots(self, x)
@@ -0,0 +1,140 @@
+## The discontinuity service finds poles and jumps in evaluated plots and
+## breaks the curve there with NaN values, so matplotlib doesn't draw a false
+## vertical line across a pole such as the one of 1/(x-1). Everything is done
+## in vectorized passes over the already evaluated values.
+
+import numpy as np
+
+
+def find_jumps(y, blowup_factor=50.0):
+    """
+    Finds the intervals where the values flip sign with a jump much larger
+    than the typical step between neighbouring values, i.e. a blow up to
+    +-infinity on both sides.
+
+    Parameters
+    ----------
+    y : numpy.ndarray
+        The values of a function on a grid
+    blowup_factor : float
+        How many times larger than the median step a jump must be.
+        Defaults to 50.
+
+    Returns
+    -------
+    indices : numpy.ndarray
+        The indices i such that there is a jump between y[i] and y[i+1]
+    """
+
+    if len(y) < 2:
+        return np.empty(0, dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        dy = np.abs(np.diff(y))
+    finite = np.isfinite(dy)
+    if not finite.any():
+        return np.empty(0, dtype=np.int64)
+
+    typical = np.median(dy[finite])
+    flip = np.signbit(y[:-1]) != np.signbit(y[1:])
+
+    # the jump must also be the largest step locally, the steps next to a
+    # pole are large too but smaller than the step across it
+    padded = np.concatenate(([-np.inf], np.where(finite, dy, -np.inf),
+                             [-np.inf]))
+    local_max = (padded[1:-1] >= padded[:-2]) & (padded[1:-1] >= padded[2:])
+
+    jumps = flip & finite & local_max & (dy > blowup_factor * typical)
+    return np.flatnonzero(jumps)
+
+
+def find_poles(x, denominators, blowup_factor=50.0):
+    """
+    Locates the zeros of denominators between grid points by linear
+    interpolation. Sign changes where a denominator jumps through its own
+    pole, e.g. the 1/x in 1/(1/x), are not zeros and are ignored.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The grid
+    denominators : list(numpy.ndarray)
+        The values of every denominator of the expression on the grid
+    blowup_factor : float
+        Passed to find_jumps(). Defaults to 50.
+
+    Returns
+    -------
+    indices : numpy.ndarray
+        The indices i such that a pole lies between x[i] and x[i+1]
+    locations : numpy.ndarray
+        The x value of each pole
+    """
+
+    indices = []
+    locations = []
+    for d in denominators:
+        d = np.broadcast_to(d, x.shape)
+        with np.errstate(invalid='ignore'):
+            crossing = np.flatnonzero(d[:-1] * d[1:] < 0)
+        crossing = np.setdiff1d(crossing, find_jumps(d, blowup_factor))
+        if crossing.size == 0:
+            continue
+
+        d0 = d[crossing]
+        d1 = d[crossing + 1]
+        x0 = x[crossing]
+        x1 = x[crossing + 1]
+        indices.append(crossing)
+        locations.append(x0 - d0 * (x1 - x0) / (d1 - d0))
+
+    if not indices:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(indices), np.concatenate(locations)
+
+
+def split_discontinuities(x, y, denominators=(), blowup_factor=50.0):
+    """
+    Breaks a curve at its poles and jumps. Non-finite values are replaced by
+    NaN, and a point with a NaN y value is inserted inside every interval that
+    contains a pole or a jump. Poles located from denominators are placed at
+    the interpolated zero, other jumps at the middle of the interval.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The x values of the points
+    y : numpy.ndarray
+        The y values of the points
+    denominators : list(numpy.ndarray)
+        The values of the denominators of the expression on the same grid,
+        if known
+    blowup_factor : float
+        Passed to find_jumps(). Defaults to 50.
+
+    Returns
+    -------
+    x : numpy.ndarray
+        The x values with the break points inserted
+    y : numpy.ndarray
+        The y values with NaN at the break points
+    """
+
+    y = np.where(np.isfinite(y), y, np.nan)
+
+    pole_indices, pole_locations = find_poles(x, denominators, blowup_factor)
+    jump_indices = np.setdiff1d(find_jumps(y, blowup_factor), pole_indices)
+
+    indices = np.concatenate((pole_indices, jump_indices))
+    locations = np.concatenate((pole_locations,
+                                (x[jump_indices] + x[jump_indices + 1]) / 2))
+    if indices.size == 0:
+        return x, y
+
+    # one break per interval, in grid order
+    indices, first = np.unique(indices, return_index=True)
+    locations = locations[first]
+
+    x = np.insert(x, indices + 1, locations)
+    y = np.insert(y, indices + 1, np.nan)
+    return x, y
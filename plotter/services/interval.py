@@ -0,0 +1,167 @@
+## The interval service evaluates expression trees with interval arithmetic.
+## Instead of the value of f at points, it computes an enclosure [lo, hi] that
+## is guaranteed to contain every value f takes on each sub-interval of x,
+## for many sub-intervals at once in vectorized passes. Every operation rounds
+## its bounds outwards with numpy.nextafter, so floating point rounding can't
+## make an enclosure miss a value.
+##
+## Bounds are -inf or inf where they can't be determined, e.g. a division by
+## an interval containing zero. Both bounds are NaN where f is undefined on
+## the whole sub-interval, e.g. x^0.5 for negative x.
+
+import numpy as np
+from ..util import EvaluationError
+from ..models.expression import (
+    Operator, Operand, PowOperator, MulOperator, DivOperator, AddOperator,
+    SubOperator
+    )
+
+
+def _round_out(lo, hi, undefined, ulps=1):
+    """
+    Replaces NaN bounds coming from inf - inf or similar by infinite bounds,
+    marks undefined enclosures and widens the rest by whole ulps.
+    """
+
+    lo = np.where(np.isnan(lo), -np.inf, lo)
+    hi = np.where(np.isnan(hi), np.inf, hi)
+    for _ in range(ulps):
+        lo = np.nextafter(lo, -np.inf)
+        hi = np.nextafter(hi, np.inf)
+    lo = np.where(undefined, np.nan, lo)
+    hi = np.where(undefined, np.nan, hi)
+    return lo, hi
+
+
+def _add(al, ah, bl, bh, undefined):
+    return _round_out(al + bl, ah + bh, undefined)
+
+
+def _sub(al, ah, bl, bh, undefined):
+    return _round_out(al - bh, ah - bl, undefined)
+
+
+def _mul(al, ah, bl, bh, undefined):
+    products = np.array(np.broadcast_arrays(al * bl, al * bh, ah * bl,
+                                            ah * bh))
+    # 0 * inf is 0 in interval arithmetic
+    products[np.isnan(products)] = 0.0
+    return _round_out(products.min(axis=0), products.max(axis=0), undefined)
+
+
+def _div(al, ah, bl, bh, undefined):
+    quotients = np.array(np.broadcast_arrays(al / bl, al / bh, ah / bl,
+                                             ah / bh))
+    lo = quotients.min(axis=0)
+    hi = quotients.max(axis=0)
+    # unbounded if the divisor contains zero or for inf / inf
+    unbounded = ((bl <= 0) & (bh >= 0)) | np.isnan(quotients).any(axis=0)
+    lo = np.where(unbounded, -np.inf, lo)
+    hi = np.where(unbounded, np.inf, hi)
+    return _round_out(lo, hi, undefined)
+
+
+def _pow(al, ah, bl, bh, undefined):
+    # unbounded unless one of the cases below applies
+    lo = np.full(np.broadcast(al, bl).shape, -np.inf)
+    hi = np.full(lo.shape, np.inf)
+
+    constant = bl == bh
+    integer = constant & (np.floor(bl) == bl)
+    contains_zero = (al <= 0) & (ah >= 0)
+
+    # a constant exponent makes x^c monotonic on each side of zero, and on
+    # the non-negative domain for fractional c, so the bounds are endpoints
+    clamped = np.where(integer, al, np.maximum(al, 0))
+    ends_lo = np.minimum(clamped ** bl, ah ** bl)
+    ends_hi = np.maximum(clamped ** bl, ah ** bl)
+    lo = np.where(constant, ends_lo, lo)
+    hi = np.where(constant, ends_hi, hi)
+    # ... except for the minimum at zero of even powers
+    even = integer & (bl > 0) & (bl % 2 == 0)
+    lo = np.where(even & contains_zero, 0.0, lo)
+    # ... and the pole at zero of negative powers
+    pole = constant & (bl < 0) & contains_zero
+    lo = np.where(pole, -np.inf, lo)
+    hi = np.where(pole, np.inf, hi)
+    # fractional powers of negative numbers are undefined
+    undefined = undefined | (constant & ~integer & (ah < 0))
+
+    # a positive base makes x^y monotonic in both x and y, so the bounds are
+    # at the corners
+    corners = np.array(np.broadcast_arrays(al ** bl, al ** bh, ah ** bl,
+                                           ah ** bh))
+    positive = al > 0
+    lo = np.where(positive, corners.min(axis=0), lo)
+    hi = np.where(positive, corners.max(axis=0), hi)
+
+    # pow isn't correctly rounded, allow for an extra ulp of error
+    return _round_out(lo, hi, undefined, ulps=2)
+
+
+_OPERATIONS = {
+    PowOperator: _pow,
+    MulOperator: _mul,
+    DivOperator: _div,
+    AddOperator: _add,
+    SubOperator: _sub
+}
+
+
+def evaluate_interval(tree, x_lo, x_hi, params=None):
+    """
+    Computes enclosures of the values of an expression on sub-intervals.
+
+    Parameters
+    ----------
+    tree : ExprTNode
+        The expression tree to evaluate
+    x_lo : numpy.ndarray
+        The lower ends of the sub-intervals of x
+    x_hi : numpy.ndarray
+        The upper ends of the sub-intervals of x, same shape as x_lo
+    params : dict(str, value)
+        The values of named parameter operands, each a point value
+
+    Returns
+    -------
+    lo : numpy.ndarray
+        The lower bound of the expression on every sub-interval, NaN where
+        it's undefined
+    hi : numpy.ndarray
+        The upper bound of the expression on every sub-interval, NaN where
+        it's undefined
+
+    Raises
+    ------
+    EvaluationError
+        Tree is built incorrectly or a parameter has no value
+    """
+
+    x_lo = np.asarray(x_lo, dtype=np.float64)
+    x_hi = np.asarray(x_hi, dtype=np.float64)
+    with np.errstate(all='ignore'):
+        lo, hi = _evaluate(tree, x_lo, x_hi, params)
+    return np.broadcast_to(lo, x_lo.shape), np.broadcast_to(hi, x_lo.shape)
+
+
+def _evaluate(node, x_lo, x_hi, params):
+    op = node.key
+    if isinstance(op, Operand):
+        if op.is_x:
+            if op.is_neg:
+                return -x_hi, -x_lo
+            return x_lo, x_hi
+        value = np.asarray(op.evaluate(0.0, params), dtype=np.float64)
+        return value, value
+    elif isinstance(op, Operator):
+        if node.left is None or node.right is None:
+            raise EvaluationError(f"Expression tree has an incorrect "
+                "syntactical structure")
+
+        al, ah = _evaluate(node.left, x_lo, x_hi, params)
+        bl, bh = _evaluate(node.right, x_lo, x_hi, params)
+        undefined = np.isnan(al) | np.isnan(bl)
+        return _OPERATIONS[type(op)](al, ah, bl, bh, undefined)
+    else:
+        raise EvaluationError(f"Unexpected object '{op}' in tree node")
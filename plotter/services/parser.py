@@ -3,7 +3,8 @@
 ## architecture.
 
 from ..util import split_str
-from ..models.expression import *
+from ..instrumentation import instrumentation
+from ..models.expression import OPERATORS, OPERATORS_DICT, Operand, ExprTNode
 
 
 # list of separators to use when separating tokens
@@ -115,8 +116,13 @@ class OperandToken(Token):
 
         pass
 
-    def get_operand(self):
+    def get_operand(self, params=()):
         """
+        Parameters
+        ----------
+        params : list(str)
+            The names of the allowed parameters
+
         Returns
         -------
         operand : Operand
@@ -148,8 +154,13 @@ class FloatToken(OperandToken):
 
         self.value = -self.value
     
-    def get_operand(self):
+    def get_operand(self, params=()):
         """
+        Parameters
+        ----------
+        params : list(str)
+            The names of the allowed parameters, unused by floats
+
         Returns
         -------
         operand : Operand
@@ -191,21 +202,34 @@ class VarToken(OperandToken):
 
         self.is_neg = not self.is_neg
 
-    def get_operand(self) -> Operand:
+    def get_operand(self, params=()) -> Operand:
         """
+        Parameters
+        ----------
+        params : list(str)
+            The names of the allowed parameters
+
         Returns
         -------
         operand : Operand
             An Operand object representing this token
+
+        Raises
+        ------
+        ParserError
+            The name is neither x nor an allowed parameter
         """
 
         if self.name == 'x':
             operand = Operand(is_x=True)
             operand.is_neg = self.is_neg
             return operand
+        elif self.name in params:
+            return Operand(name=self.name, is_neg=self.is_neg)
         else:
+            symbols = ', '.join(['x'] + list(params))
             raise ParserError(f"Unknown symbol '{self.name}', use numbers, "
-                                "^, *, /, +, -, (, ), or x")
+                                f"^, *, /, +, -, (, ), or {symbols}")
 
     def __eq__(self, other):
         if not isinstance(other, VarToken):
@@ -223,7 +247,8 @@ class Parser(object):
     can be evaluated.
     """
     
-    def parse(self, string):
+    @instrumentation.timed('parser.parse')
+    def parse(self, string, params=()):
         """
         Parses a string that represents a mathematical expression into a binary
         expression tree
@@ -232,6 +257,9 @@ class Parser(object):
         ----------
         string : str
             The raw string to validate and parse
+        params : list(str)
+            The names of parameters allowed in the expression besides x, e.g.
+            ['a', 'b'] for 'a*x^2+b'. Defaults to none.
 
         Returns
         -------
@@ -246,14 +274,17 @@ class Parser(object):
         """
 
         # putting it all together
-        list_ = split_str(string, SEP_LIST)
+        with instrumentation.stage('parser.split_str') as stage:
+            list_ = split_str(string, SEP_LIST)
+            stage.count = len(list_)
         token_list = self.tokenize(list_)
         infix = self.tokens_to_infix(token_list)
-        postfix = self.infix_to_postfix(infix)
+        postfix = self.infix_to_postfix(infix, params)
         tree = self.postfix_to_expr_tree(postfix)
 
         return tree
 
+    @instrumentation.timed('parser.tokenize', count=len)
     def tokenize(self, list_):
         """
         Converts a list of strings into a list of known tokens
@@ -467,6 +498,7 @@ class Parser(object):
 
         return infix
 
+    @instrumentation.timed('parser.tokens_to_infix', count=len)
     def tokens_to_infix(self, token_list):
         """
         Converts a list of tokens into a valid infix expression taking care of
@@ -494,7 +526,8 @@ class Parser(object):
 
         return list(reversed(self._tokens_to_infix(token_list)))
 
-    def infix_to_postfix(self, infix):
+    @instrumentation.timed('parser.infix_to_postfix', count=len)
+    def infix_to_postfix(self, infix, params=()):
         """
         Converts a valid infix expression to a postfix expression.
 
@@ -502,6 +535,8 @@ class Parser(object):
         ----------
         infix : list(Token)
             A valid infix expression
+        params : list(str)
+            The names of the allowed parameters. Defaults to none.
 
         Returns
         -------
@@ -516,7 +551,7 @@ class Parser(object):
         for op in infix:
             if isinstance(op, OperandToken):
                 # operand
-                postfix.append(op.get_operand())
+                postfix.append(op.get_operand(params))
             elif isinstance(op, ParenToken):
                 if op.is_open:
                     # open parenthesis
@@ -542,6 +577,7 @@ class Parser(object):
         
         return postfix
         
+    @instrumentation.timed('parser.postfix_to_expr_tree')
     def postfix_to_expr_tree(self, postfix):
         """
         Converts a postfix expression to a binary expression tree.
@@ -3,17 +3,145 @@
 ## part of the application domain model in the MVP architecture.
 
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from ..util import EvaluationError
+from ..models.expression import Operator, Operand, DivOperator, ExprTNode
+from ..models.serialization import SerializationError
+from ..instrumentation import instrumentation
+from .discontinuity import split_discontinuities
+from .interval import evaluate_interval
+from .chebyshev import ChebyshevProxy
+from .statistics import StreamingStats
+from .backends import get_backend, default_selector
 
 
 class XRangeError(Exception):
     pass
 
 
+class ParameterError(Exception):
+    pass
+
+
+def linspace_chunk(x_min, x_max, n, start, stop):
+    """
+    Returns the slice [start:stop] of numpy.linspace(x_min, x_max, n) without
+    creating the whole array. The values are identical to linspace's.
+
+    Parameters
+    ----------
+    x_min : float
+        The minimum value of x
+    x_max : float
+        The maximum value of x
+    n : int
+        The number of points of the whole grid
+    start : int
+        The index of the first point of the slice
+    stop : int
+        The index after the last point of the slice
+
+    Returns
+    -------
+    x : numpy.ndarray
+        The x values of the slice
+    """
+
+    if n == 1:
+        return np.full(stop - start, float(x_min))
+
+    # the same formula linspace uses
+    step = (x_max - x_min) / (n - 1)
+    x = np.arange(start, stop, dtype=np.float64)
+    x *= step
+    x += x_min
+    if stop == n and stop > start:
+        x[-1] = x_max
+    return x
+
+
+def buffer_to_array(buffer, dtype='float64'):
+    """
+    Views any object supporting the buffer protocol as a flat numpy array,
+    without copying.
+
+    Parameters
+    ----------
+    buffer
+        A numpy array, memoryview, array.array, mmap, bytes, bytearray or any
+        other buffer
+    dtype : str or numpy.dtype
+        The type of the values in buffers of raw bytes, e.g. mmap or bytes,
+        which don't record one. Typed buffers keep their own type.
+        Defaults to 'float64'.
+
+    Returns
+    -------
+    array : numpy.ndarray
+        A 1-D view of the buffer, read-only if the buffer is
+
+    Raises
+    ------
+    ValueError
+        The object doesn't support the buffer protocol, e.g. a list, the
+        buffer has several dimensions and isn't contiguous, its size isn't a
+        multiple of the dtype or its values aren't numbers
+    """
+
+    if isinstance(buffer, np.ndarray):
+        array = buffer
+    else:
+        try:
+            view = memoryview(buffer)
+        except TypeError:
+            raise ValueError(f"Expected a buffer, got "
+                             f"{type(buffer).__name__}")
+        if view.format in ('B', 'b', 'c'):
+            # bytes carry no element type
+            array = np.frombuffer(view, dtype=dtype)
+        else:
+            array = np.asarray(view)
+    if array.dtype.kind not in 'iuf':
+        raise ValueError(f"Expected a buffer of numbers, got {array.dtype}")
+
+    if array.ndim != 1:
+        # flattening anything else would copy
+        if not array.flags.c_contiguous:
+            raise ValueError("The buffer must be contiguous")
+        array = array.reshape(-1)
+    return array
+
+
 class Plotter(object):
     """
     Represents a Plotter service. The Plotter validates the x range, generates
     valid x-values and evaluates the give expression to get the y-values.
     """
+
+    # float32 evaluation is only used if its error on a float64 spot sample is
+    # below this fraction of the sample's y range
+    FLOAT32_TOLERANCE = 1e-4
+    # how many points the spot sample has
+    FLOAT32_SAMPLE_SIZE = 64
+
+    def __init__(self, cache=None, backend='auto'):
+        """
+        Parameters
+        ----------
+        cache : PlotCache
+            If provided, plot() results are looked up in and stored to this
+            on-disk cache
+        backend : str
+            The name of the evaluation backend to use, see the backends
+            module, or 'auto' to pick one per call from the number of points
+            and the size of the tree. Defaults to 'auto'.
+        """
+
+        self.cache = cache
+        self.backend = backend
+        if backend != 'auto':
+            # fail early on unknown names
+            get_backend(backend)
     
     def validate_x_range(self, x_min, x_max):
         """
@@ -35,27 +163,45 @@ class Plotter(object):
         if x_max <= x_min:
             raise XRangeError("X Max must be greater than X Min")
 
-    def plot(self, tree, x_min, x_max, x_tick_frequency=1000):
+    def plot(self, tree, x_min, x_max, x_tick_frequency=1000,
+             dtype='float64', split_poles=False, backend=None):
         """
         Plots the expression on the given x range.
 
+        With dtype float32 the expression is evaluated in single precision,
+        which halves the memory traffic. A float64 spot sample is evaluated
+        first, and if float32 would visibly distort the curve (overflow, large
+        powers, catastrophic cancellation) the plot falls back to float64.
+
         Parameters
         ----------
-        tree : ExprTNode
-            The expression representing the function to plot
+        tree : ExprTNode or ChebyshevProxy
+            The expression representing the function to plot, or a proxy
+            returned by build_proxy()
         x_min : float
             The minimum value of x
         x_max : float
             The maximum value of x
         x_tick_frequency : int
             The tick frequency of the x-axis, i.e. how many points to plot
+        dtype : str or numpy.dtype
+            'float64' or 'float32'. Defaults to 'float64'.
+        split_poles : bool
+            If True, breaks the curve with NaN values at poles and jumps, see
+            the discontinuity module. The values of the denominators are kept
+            from the evaluation to locate poles, so nothing is evaluated
+            twice. Breaks are inserted as extra points. Defaults to False.
+        backend : str
+            If provided, the name of the evaluation backend to use for this
+            call instead of the Plotter's
         
         Returns
         -------
         x : numpy.ndarray
             The x values of the points
         y : numpy.ndarray
-            The y values of the points
+            The y values of the points. Read-only if served from the cache.
+            The dtype is float64 if float32 evaluation fell back.
         
         Raises
         ------
@@ -63,8 +209,795 @@ class Plotter(object):
             Invalid range
         """
 
+        with instrumentation.stage('plotter.plot', count=x_tick_frequency):
+            self.validate_x_range(x_min, x_max)
+
+            dtype = np.dtype(dtype)
+            key = self._cache_key(tree, x_min, x_max, x_tick_frequency, dtype,
+                                  'split_poles' if split_poles else '')
+            if key is not None:
+                x, y = self.cache.get(key)
+                if x is not None:
+                    return x, y
+
+            if (dtype == np.float32 and not
+                    self._float32_is_accurate(tree, x_min, x_max,
+                                              x_tick_frequency)):
+                dtype = np.dtype(np.float64)
+
+            x = np.linspace(x_min, x_max, x_tick_frequency, dtype=dtype)
+            with instrumentation.stage('plotter.evaluate',
+                                       count=x_tick_frequency):
+                denominators = []
+                if split_poles and isinstance(tree, ExprTNode):
+                    y = self._evaluate_shared(tree, x, {}, denominators)[1]
+                else:
+                    y = self._evaluate(tree, x, backend)
+
+            if split_poles:
+                with instrumentation.stage('plotter.split_poles',
+                                           count=x_tick_frequency):
+                    x, y = split_discontinuities(x, y, denominators)
+
+            if key is not None:
+                self.cache.put(key, x, y)
+        return x, y
+
+    def plot_with_stats(self, tree, x_min, x_max, x_tick_frequency=1000,
+                        dtype='float64', split_poles=False,
+                        chunk_size=1 << 16):
+        """
+        Plots the expression like plot() and computes statistics of the
+        values in the same pass. The plot is evaluated chunk by chunk and
+        every chunk is fed to a StreamingStats reducer right after it's
+        evaluated, while it's still in the CPU cache. The plot is cached like
+        the one of plot(), and the statistics are cached next to it.
+
+        Parameters
+        ----------
+        tree : ExprTNode or ChebyshevProxy
+            The expression representing the function to plot
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        x_tick_frequency : int
+            How many points to plot
+        dtype : str or numpy.dtype
+            'float64' or 'float32', see plot(). Defaults to 'float64'.
+        split_poles : bool
+            If True, breaks the curve at poles and jumps, see plot(). The
+            statistics describe the values before the breaks are inserted.
+            Defaults to False.
+        chunk_size : int
+            How many points to evaluate at once. Defaults to 2^16.
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The x values of the points
+        y : numpy.ndarray
+            The y values of the points. Read-only if served from the cache.
+        stats : StreamingStats
+            The statistics of the values
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        """
+
+        n = x_tick_frequency
+        with instrumentation.stage('plotter.plot_with_stats', count=n):
+            self.validate_x_range(x_min, x_max)
+
+            dtype = np.dtype(dtype)
+            tag = 'split_poles' if split_poles else ''
+            key = self._cache_key(tree, x_min, x_max, n, dtype, tag)
+            if key is not None:
+                stats_key = self._cache_key(tree, x_min, x_max, n, dtype,
+                                            tag + ' stats')
+                x, y = self.cache.get(key)
+                summary = self.cache.get_array(stats_key)
+                if x is not None and summary is not None:
+                    return x, y, StreamingStats.from_summary(summary)
+
+            if (dtype == np.float32 and not
+                    self._float32_is_accurate(tree, x_min, x_max, n)):
+                dtype = np.dtype(np.float64)
+
+            x = np.empty(n, dtype=dtype)
+            y = np.empty(n, dtype=dtype)
+            stats = StreamingStats()
+            shared = split_poles and isinstance(tree, ExprTNode)
+            chunk_denominators = []
+            for start in range(0, n, chunk_size):
+                stop = min(start + chunk_size, n)
+                x[start:stop] = linspace_chunk(x_min, x_max, n, start, stop)
+                x_chunk = x[start:stop]
+                if shared:
+                    denominators = []
+                    y[start:stop] = self._evaluate_shared(tree, x_chunk, {},
+                                                          denominators)[1]
+                    chunk_denominators.append(
+                        [np.broadcast_to(d, x_chunk.shape)
+                         for d in denominators])
+                else:
+                    y[start:stop] = self._evaluate(tree, x_chunk)
+                stats.update(x_chunk, y[start:stop])
+
+            if split_poles:
+                # the denominators of every division, joined across chunks
+                denominators = [np.concatenate(parts)
+                                for parts in zip(*chunk_denominators)]
+                with instrumentation.stage('plotter.split_poles', count=n):
+                    x, y = split_discontinuities(x, y, denominators)
+
+            if key is not None:
+                self.cache.put(key, x, y)
+                self.cache.put_array(stats_key, stats.summary())
+        return x, y, stats
+
+    def plot_to_memmap(self, tree, x_min, x_max, x_tick_frequency, path=None,
+                       out=None, chunk_size=1 << 20):
+        """
+        Evaluates the expression chunk by chunk directly into a memory mapped
+        array, for plots too big to fit in memory. Peak memory is bounded by
+        the chunk size, independent of the number of points.
+
+        Only the y values are stored, the x values are
+        numpy.linspace(x_min, x_max, x_tick_frequency) and can be recomputed
+        for any slice with linspace_chunk().
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression representing the function to plot
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        x_tick_frequency : int
+            How many points to evaluate
+        path : str
+            If provided, creates a .npy file at this path to write into. It
+            can be reopened later with numpy.load(path, mmap_mode='r').
+        out : numpy.ndarray
+            If provided, a writable array of x_tick_frequency floats to write
+            into, e.g. an existing numpy.memmap
+        chunk_size : int
+            How many points to evaluate at once. Defaults to 2^20.
+
+        Returns
+        -------
+        y : numpy.ndarray
+            The array the y values were written to, a numpy.memmap unless out
+            is another kind of array
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        ValueError
+            Neither path nor out given, or out has the wrong shape
+        """
+
+        self.validate_x_range(x_min, x_max)
+
+        n = x_tick_frequency
+        if out is None:
+            if path is None:
+                raise ValueError("Either path or out must be given")
+            out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64,
+                                            shape=(n,))
+        elif out.shape != (n,):
+            raise ValueError(f"out must have shape ({n},), got {out.shape}")
+
+        with instrumentation.stage('plotter.plot_to_memmap', count=n):
+            for start in range(0, n, chunk_size):
+                stop = min(start + chunk_size, n)
+                x = linspace_chunk(x_min, x_max, n, start, stop)
+                out[start:stop] = self._evaluate(tree, x)
+
+            if isinstance(out, np.memmap):
+                out.flush()
+        return out
+
+    def evaluate_at(self, tree, x, out=None, chunk_size=1 << 16,
+                    dtype='float64', backend=None):
+        """
+        Evaluates the expression at arbitrary x values, e.g. measured
+        positions coming from another system. The x values may be unsorted,
+        unevenly spaced or contain NaN, every value is evaluated on its own.
+        Neither x nor out is copied, the values are evaluated chunk by chunk
+        so the only temporaries are one chunk in size.
+
+        Parameters
+        ----------
+        tree : ExprTNode or ChebyshevProxy
+            The expression to evaluate
+        x
+            The x values, a numpy array or any object supporting the buffer
+            protocol, e.g. memoryview, array.array or mmap
+        out
+            If provided, a writable buffer of the same number of float32 or
+            float64 values to write the results into
+        chunk_size : int
+            How many points to evaluate at once. Defaults to 2^16.
+        dtype : str or numpy.dtype
+            The type of the values of x and out if they are buffers of raw
+            bytes, e.g. mmap. Defaults to 'float64'.
+        backend : str
+            If provided, the name of the evaluation backend to use for this
+            call instead of the Plotter's
+
+        Returns
+        -------
+        y : numpy.ndarray
+            A 1-D array of the values, a view of out if given. Float32 for
+            float32 x, float64 otherwise, unless out has another type.
+
+        Raises
+        ------
+        ValueError
+            x or out isn't a contiguous buffer of numbers, out is read-only,
+            doesn't hold float32 or float64 values or has the wrong number
+            of values
+        """
+
+        x = buffer_to_array(x, dtype)
+        n = len(x)
+        if out is None:
+            out = np.empty(n, dtype=np.result_type(x.dtype, np.float32))
+        else:
+            out = buffer_to_array(out, dtype)
+            if out.dtype not in (np.float32, np.float64):
+                raise ValueError(f"out must hold float32 or float64 values, "
+                                 f"got {out.dtype}")
+            if not out.flags.writeable:
+                raise ValueError("out must be writable")
+            if len(out) != n:
+                raise ValueError(f"out must have {n} values, got {len(out)}")
+
+        with instrumentation.stage('plotter.evaluate_at', count=n):
+            for start in range(0, n, chunk_size):
+                stop = min(start + chunk_size, n)
+                chunk = x[start:stop]
+                if chunk.dtype.kind != 'f':
+                    # integers are converted one chunk at a time
+                    chunk = chunk.astype(np.float64)
+                out[start:stop] = self._evaluate(tree, chunk, backend)
+        return out
+
+    def build_proxy(self, tree, x_min, x_max, tol=1e-14,
+                    max_degree=1 << 16):
+        """
+        Builds a Chebyshev interpolant of the expression on the x range, for
+        functions that are plotted many times on the same range, see the
+        chebyshev module. The result can be passed to plot() instead of the
+        tree.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression to interpolate
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        tol : float
+            The relative accuracy of the interpolant. Defaults to 1e-14.
+        max_degree : int
+            The largest degree to try. Defaults to 65536.
+
+        Returns
+        -------
+        proxy : ChebyshevProxy or ExprTNode
+            The interpolant, or the tree itself if the function isn't smooth
+            enough to interpolate
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        """
+
         self.validate_x_range(x_min, x_max)
 
-        x = np.linspace(x_min, x_max, 1000)
-        y = tree.evaluate(x)
-        return x, y
\ No newline at end of file
+        with instrumentation.stage('plotter.build_proxy') as stage:
+            proxy = ChebyshevProxy.fit(tree, x_min, x_max, tol, max_degree)
+            if proxy is None:
+                return tree
+            stage.count = proxy.degree + 1
+        return proxy
+
+    def _evaluate(self, tree, x, backend=None):
+        """
+        Evaluates an expression on a grid with a backend. Used internally by
+        the plotting methods.
+
+        Parameters
+        ----------
+        tree : ExprTNode or ChebyshevProxy
+            The expression to evaluate
+        x : numpy.ndarray
+            The x values
+        backend : str
+            The name of the backend, defaults to the Plotter's
+
+        Returns
+        -------
+        y : numpy.ndarray
+            The values of the expression
+
+        Raises
+        ------
+        BackendError
+            Unknown backend name
+        """
+
+        if not isinstance(tree, ExprTNode):
+            # proxies evaluate themselves
+            return tree.evaluate(x)
+
+        name = backend or self.backend
+        if name == 'auto':
+            return default_selector().select(tree, x.size).evaluate(tree, x)
+        return get_backend(name).evaluate(tree, x)
+
+    def _float32_is_accurate(self, tree, x_min, x_max, n):
+        """
+        Evaluates a spot sample of the grid in float32 and float64 and
+        compares them. Used internally by plot().
+
+        Returns
+        -------
+        accurate : bool
+            True if float32 evaluation is visually indistinguishable
+        """
+
+        indices = np.unique(np.linspace(0, n - 1,
+                                        min(n, self.FLOAT32_SAMPLE_SIZE),
+                                        dtype=np.int64))
+        # the grid points at these indices, the last index is always n-1
+        if n == 1:
+            x = np.array([float(x_min)])
+        else:
+            x = indices * ((x_max - x_min) / (n - 1)) + x_min
+            x[-1] = x_max
+
+        with np.errstate(all='ignore'):
+            y64 = np.asarray(tree.evaluate(x), dtype=np.float64)
+            y32 = np.asarray(tree.evaluate(x.astype(np.float32)),
+                             dtype=np.float64)
+
+        finite = np.isfinite(y64)
+        if (finite != np.isfinite(y32)).any():
+            # float32 overflowed or produced nans where float64 didn't
+            return False
+        if not finite.any():
+            return True
+
+        y64 = y64[finite]
+        y32 = y32[finite]
+        scale = np.ptp(y64) or np.abs(y64).max() or 1.0
+        return np.abs(y32 - y64).max() <= self.FLOAT32_TOLERANCE * scale
+
+    def _cache_key(self, tree, x_min, x_max, n, dtype='float64', tag=''):
+        """
+        Returns
+        -------
+        key : str
+            The cache key of the plot, or None if there is no cache or the
+            tree can't be cached
+        """
+
+        if self.cache is None:
+            return None
+        try:
+            return self.cache.key(tree, x_min, x_max, n, dtype, tag)
+        except SerializationError:
+            return None
+
+    def plot_many(self, trees, x_min, x_max, x_tick_frequency=1000):
+        """
+        Plots several expressions on the same x range. The x values are
+        generated once and subexpressions shared between the trees, e.g. the
+        x^2 in x^2+1 and 2*x^2, are only evaluated once.
+
+        Parameters
+        ----------
+        trees : list(ExprTNode)
+            The expressions representing the functions to plot
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        x_tick_frequency : int
+            The tick frequency of the x-axis, i.e. how many points to plot
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The x values of the points
+        y : numpy.ndarray
+            A (len(trees), x_tick_frequency) array, row i holds the y values
+            of trees[i]
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        EvaluationError
+            A tree is built incorrectly
+        """
+
+        with instrumentation.stage('plotter.plot_many',
+                                   count=len(trees) * x_tick_frequency):
+            self.validate_x_range(x_min, x_max)
+
+            x = np.linspace(x_min, x_max, x_tick_frequency)
+            y = np.empty((len(trees), x_tick_frequency))
+            cache = {}
+            for i, tree in enumerate(trees):
+                # broadcasting also fills rows of constant functions
+                y[i] = self._evaluate_shared(tree, x, cache)[1]
+        return x, y
+
+    def sweep(self, tree, x_min, x_max, params, x_tick_frequency=1000):
+        """
+        Plots a family of curves of an expression with named parameters. The
+        whole (parameter sets x points) grid is computed in one vectorized
+        evaluation by broadcasting a column of parameter values against a row
+        of x values.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression, may contain parameter operands
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        params : dict(str, array_like)
+            Maps each parameter name to a 1-D sequence of its values. All
+            sequences must have the same length, element i of every sequence
+            forms parameter set i.
+        x_tick_frequency : int
+            The tick frequency of the x-axis, i.e. how many points to plot
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The x values of the points
+        y : numpy.ndarray
+            A (parameter sets, x_tick_frequency) array, row i holds the curve
+            of parameter set i
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        ParameterError
+            No parameters given or sequences of different lengths
+        EvaluationError
+            The tree uses a parameter that has no values
+        """
+
+        self.validate_x_range(x_min, x_max)
+
+        columns = {name: np.asarray(values, dtype=float).reshape(-1, 1)
+                   for name, values in params.items()}
+        lengths = set(len(column) for column in columns.values())
+        if len(lengths) != 1:
+            raise ParameterError("All parameters must have the same number "
+                                 "of values")
+        n_sets = lengths.pop()
+
+        with instrumentation.stage('plotter.sweep',
+                                   count=n_sets * x_tick_frequency):
+            x = np.linspace(x_min, x_max, x_tick_frequency)
+            y = np.empty((n_sets, x_tick_frequency))
+            # broadcasting also fills curves that don't use every parameter
+            y[...] = tree.evaluate(x[np.newaxis, :], params=columns)
+        return x, y
+
+    def validate_y_range(self, y_min, y_max):
+        """
+        Validates the y range and raises an XRangeError if invalid.
+
+        Parameters
+        ----------
+        y_min : float
+            The minimum value of y
+        y_max : float
+            The maximum value of y
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        """
+
+        if y_max <= y_min:
+            raise XRangeError("Y Max must be greater than Y Min")
+
+    def plot_2d(self, tree, x_min, x_max, y_min, y_max, nx=500, ny=500,
+                tile_shape=(64, 512), workers=1):
+        """
+        Evaluates a function of x and y on a grid. The variable y is the
+        parameter named 'y', i.e. the tree is parsed with params=['y']. This
+        is API only, the GUI plots functions of x and rejects y.
+
+        The grid is computed in tiles small enough to stay in the CPU cache,
+        so the temporaries of every tree node are tile sized instead of grid
+        sized, and tiles can be computed by several threads.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression of x and y to evaluate
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        y_min : float
+            The minimum value of y
+        y_max : float
+            The maximum value of y
+        nx : int
+            The number of x values. Defaults to 500.
+        ny : int
+            The number of y values. Defaults to 500.
+        tile_shape : (int, int)
+            The (rows, columns) of a tile. Defaults to (64, 512).
+        workers : int
+            The number of threads computing tiles. Defaults to 1.
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The nx x values of the grid columns
+        y : numpy.ndarray
+            The ny y values of the grid rows
+        z : numpy.ndarray
+            A (ny, nx) array, z[i, j] is the value at (x[j], y[i])
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        EvaluationError
+            The tree uses a parameter other than y
+        """
+
+        self.validate_x_range(x_min, x_max)
+        self.validate_y_range(y_min, y_max)
+
+        with instrumentation.stage('plotter.plot_2d', count=nx * ny):
+            x = np.linspace(x_min, x_max, nx)
+            y = np.linspace(y_min, y_max, ny)
+            z = np.empty((ny, nx))
+
+            rows, cols = tile_shape
+            tiles = [(r, c) for r in range(0, ny, rows)
+                            for c in range(0, nx, cols)]
+
+            def evaluate_tile(tile):
+                r, c = tile
+                x_tile = x[np.newaxis, c:c+cols]
+                y_tile = y[r:r+rows, np.newaxis]
+                # broadcasting also fills tiles of functions missing x or y
+                z[r:r+rows, c:c+cols] = tree.evaluate(x_tile,
+                                                      params={'y': y_tile})
+
+            if workers > 1 and len(tiles) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    # consume the iterator to raise any evaluation error
+                    list(executor.map(evaluate_tile, tiles))
+            else:
+                for tile in tiles:
+                    evaluate_tile(tile)
+        return x, y, z
+
+    def bounds(self, tree, x_min, x_max, pieces=256):
+        """
+        Computes guaranteed bounds of the expression on the x range with
+        interval arithmetic, e.g. to scale the y axis. The range is split into
+        pieces whose enclosures are combined, which makes the bounds tighter.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression to bound
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        pieces : int
+            The number of sub-intervals. Defaults to 256.
+
+        Returns
+        -------
+        y_min : float
+            A lower bound of the expression, -inf if unbounded and NaN if the
+            expression is undefined on the whole range
+        y_max : float
+            An upper bound of the expression, inf if unbounded and NaN if the
+            expression is undefined on the whole range
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        """
+
+        self.validate_x_range(x_min, x_max)
+
+        edges = np.linspace(x_min, x_max, pieces + 1)
+        lo, hi = evaluate_interval(tree, edges[:-1], edges[1:])
+        defined = ~np.isnan(lo)
+        if not defined.any():
+            return np.nan, np.nan
+        return lo[defined].min(), hi[defined].max()
+
+    def plot_adaptive(self, tree, x_min, x_max, y_min, y_max, width=1000,
+                      height=1000, initial=64, max_depth=16):
+        """
+        Plots the expression with as few points as the visible window needs.
+        The x range is split into sub-intervals whose values are bounded with
+        interval arithmetic: sub-intervals whose bounds lie outside the y
+        window, or where the expression is undefined, are dropped without
+        evaluating any point, sub-intervals whose visible bounds are at most
+        a pixel high are kept as a straight segment, and the rest are halved
+        until they are a pixel wide.
+
+        Sub-intervals a pixel wide with unbounded values, i.e. poles, are
+        dropped as well, and the curve is broken with a NaN value wherever
+        kept sub-intervals don't touch.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression representing the function to plot
+        x_min : float
+            The minimum value of x
+        x_max : float
+            The maximum value of x
+        y_min : float
+            The minimum visible value of y
+        y_max : float
+            The maximum visible value of y
+        width : int
+            The width of the plot in pixels. Defaults to 1000.
+        height : int
+            The height of the plot in pixels. Defaults to 1000.
+        initial : int
+            The number of sub-intervals to start with. Defaults to 64.
+        max_depth : int
+            How many times a sub-interval can be halved. Defaults to 16.
+
+        Returns
+        -------
+        x : numpy.ndarray
+            The sorted x values of the points
+        y : numpy.ndarray
+            The y values of the points, NaN at breaks. Both are empty
+            if no part of the curve is visible
+
+        Raises
+        ------
+        XRangeError
+            Invalid range
+        """
+
+        self.validate_x_range(x_min, x_max)
+        self.validate_y_range(y_min, y_max)
+
+        with instrumentation.stage('plotter.plot_adaptive') as stage:
+            pixel_width = (x_max - x_min) / width
+            pixel_height = (y_max - y_min) / height
+
+            edges = np.linspace(x_min, x_max, initial + 1)
+            lo_x, hi_x = edges[:-1], edges[1:]
+            kept_lo, kept_hi = [], []
+            for depth in range(max_depth + 1):
+                if lo_x.size == 0:
+                    break
+                lo, hi = evaluate_interval(tree, lo_x, hi_x)
+
+                # comparisons with NaN are False, undefined ones are culled
+                visible = (hi >= y_min) & (lo <= y_max)
+                lo_x, hi_x = lo_x[visible], hi_x[visible]
+                lo, hi = lo[visible], hi[visible]
+
+                flat = np.minimum(hi, y_max) - np.maximum(lo, y_min) <= \
+                       pixel_height
+                narrow = (hi_x - lo_x <= pixel_width) | (depth == max_depth)
+                unbounded = np.isinf(lo) | np.isinf(hi)
+                keep = flat | (narrow & ~unbounded)
+                kept_lo.append(lo_x[keep])
+                kept_hi.append(hi_x[keep])
+
+                split = ~(keep | narrow)
+                mid = (lo_x[split] + hi_x[split]) / 2
+                lo_x = np.concatenate((lo_x[split], mid))
+                hi_x = np.concatenate((mid, hi_x[split]))
+
+            lo_x = np.concatenate(kept_lo)
+            hi_x = np.concatenate(kept_hi)
+            if lo_x.size == 0:
+                stage.count = 0
+                return np.empty(0), np.empty(0)
+            order = np.argsort(lo_x)
+            lo_x, hi_x = lo_x[order], hi_x[order]
+
+            # every segment contributes its start, runs of touching segments
+            # also their end, followed by a break unless it's the last run
+            gaps = lo_x[1:] != hi_x[:-1]
+            ends = np.append(gaps, True)
+            breaks = np.append(gaps, False)
+            counts = 1 + ends + breaks
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            starts = starts.astype(np.intp)
+
+            x = np.empty(counts.sum())
+            x[starts] = lo_x
+            x[starts[ends] + 1] = hi_x[ends]
+            x[starts[breaks] + 2] = hi_x[breaks]
+            with instrumentation.stage('plotter.evaluate', count=len(x)):
+                y = np.array(np.broadcast_to(tree.evaluate(x), x.shape),
+                             dtype=np.float64)
+            y[starts[breaks] + 2] = np.nan
+            stage.count = len(x)
+        return x, y
+
+    def _evaluate_shared(self, node, x, cache, denominators=None):
+        """
+        Evaluates an expression tree, reusing the values of structurally equal
+        subtrees that were already evaluated with the same cache. Used
+        internally by plot() and plot_many().
+
+        Parameters
+        ----------
+        node : ExprTNode
+            The expression tree to evaluate
+        x : numpy.ndarray
+            The x values
+        cache : dict(str, numpy.ndarray)
+            Maps the keys of evaluated subtrees to their values
+        denominators : list(numpy.ndarray)
+            If provided, the values of the right subtrees of all divisions
+            are appended to it
+
+        Returns
+        -------
+        key : str
+            A string identifying the structure of the subtree
+        value : numpy.ndarray
+            The value of the subtree
+        """
+
+        op = node.key
+        if isinstance(op, Operand):
+            key = str(op)
+            if key not in cache:
+                cache[key] = op.evaluate(x)
+            return key, cache[key]
+        elif isinstance(op, Operator):
+            if node.left is None or node.right is None:
+                raise EvaluationError(f"Expression tree has an incorrect "
+                    "syntactical structure")
+
+            left_key, a = self._evaluate_shared(node.left, x, cache,
+                                                denominators)
+            right_key, b = self._evaluate_shared(node.right, x, cache,
+                                                 denominators)
+            if denominators is not None and isinstance(op, DivOperator):
+                denominators.append(b)
+            key = f"({left_key}{op}{right_key})"
+            if key not in cache:
+                cache[key] = op.func(a, b)
+            return key, cache[key]
+        else:
+            raise EvaluationError(f"Unexpected object '{op}' in tree node")
@@ -0,0 +1,192 @@
+## The profiler service evaluates an expression tree while recording the time
+## and memory spent in every node, to find the subtree that dominates the
+## evaluation cost. The results can be printed as an annotated tree or written
+## as folded stacks for flame graph tools.
+
+import time
+from ..util import EvaluationError
+from ..models.expression import Operator, Operand
+
+
+class NodeProfile(object):
+    """
+    The profile of a single expression tree node and its subtrees.
+    """
+
+    def __init__(self, label, total_time, self_time, nbytes,
+                 left=None, right=None):
+        """
+        Parameters
+        ----------
+        label : str
+            A short name of the node, e.g. 'PowOperator' or 'x'
+        total_time : float
+            Seconds spent evaluating the node including its subtrees
+        self_time : float
+            Seconds spent in the node itself, excluding its subtrees
+        nbytes : int
+            Bytes allocated for the node's result
+        left : NodeProfile
+            The profile of the left subtree
+        right : NodeProfile
+            The profile of the right subtree
+        """
+
+        self.label = label
+        self.total_time = total_time
+        self.self_time = self_time
+        self.nbytes = nbytes
+        self.left = left
+        self.right = right
+
+    def children(self):
+        """
+        Returns
+        -------
+        children : list(NodeProfile)
+            The profiles of the subtrees
+        """
+
+        return [c for c in (self.left, self.right) if c is not None]
+
+    def hottest(self):
+        """
+        Returns
+        -------
+        profile : NodeProfile
+            The node with the largest self time in this subtree
+        """
+
+        best = self
+        stack = self.children()
+        while stack:
+            node = stack.pop()
+            if node.self_time > best.self_time:
+                best = node
+            stack.extend(node.children())
+        return best
+
+    def format_tree(self):
+        """
+        Formats the profile as an indented tree, one node per line with its
+        total and self time, its share of the root's time and its allocation.
+
+        Returns
+        -------
+        text : str
+        """
+
+        root_time = self.total_time or 1.0
+        lines = []
+        stack = [(self, 0)]
+        while stack:
+            node, depth = stack.pop()
+            lines.append(f"{'  ' * depth}{node.label}: "
+                         f"{node.total_time * 1000:.3f} ms "
+                         f"(self {node.self_time * 1000:.3f} ms, "
+                         f"{node.self_time / root_time:.0%}), "
+                         f"{node.nbytes / 1024:.1f} KiB")
+            stack.extend((c, depth + 1) for c in reversed(node.children()))
+        return '\n'.join(lines)
+
+    def to_folded_stacks(self):
+        """
+        Formats the profile in the folded stack format read by flamegraph.pl,
+        speedscope and similar tools. Every node is a frame and the value is
+        its self time in microseconds.
+
+        Returns
+        -------
+        text : str
+            One 'root;child;...;node microseconds' line per node
+        """
+
+        lines = []
+        stack = [(self, self.label)]
+        while stack:
+            node, path = stack.pop()
+            lines.append(f"{path} {int(round(node.self_time * 1e6))}")
+            stack.extend((c, f"{path};{c.label}")
+                         for c in reversed(node.children()))
+        return '\n'.join(lines)
+
+
+def _nbytes(value):
+    return getattr(value, 'nbytes', 0)
+
+
+class Profiler(object):
+    """
+    Represents a Profiler service. The Profiler evaluates an expression tree
+    the same way ExprTNode.evaluate() does, timing every node.
+    """
+
+    def profile(self, tree, x=0.0, repeat=1, params=None):
+        """
+        Evaluates the tree and profiles every node.
+
+        Parameters
+        ----------
+        tree : ExprTNode
+            The expression tree to profile
+        x
+            The value of x to substitute into 'x' operands.
+            Can be a numpy ndarray. Defaults to 0.
+        repeat : int
+            How many times to evaluate the tree, the fastest run of every node
+            is kept. Defaults to 1.
+        params : dict(str, value)
+            The values of named parameter operands
+
+        Returns
+        -------
+        result
+            The value of the expression
+        profile : NodeProfile
+            The profile of the root node
+
+        Raises
+        ------
+        EvaluationError
+            Tree is built incorrectly
+        """
+
+        result, profile = self._profile(tree, x, params)
+        for _ in range(repeat - 1):
+            _, other = self._profile(tree, x, params)
+            profile = self._fastest(profile, other)
+        return result, profile
+
+    def _profile(self, node, x, params):
+        op = node.key
+        if isinstance(op, Operand):
+            start = time.perf_counter()
+            result = op.evaluate(x, params)
+            elapsed = time.perf_counter() - start
+            return result, NodeProfile(str(op), elapsed, elapsed,
+                                       _nbytes(result))
+        elif isinstance(op, Operator):
+            if node.left is None or node.right is None:
+                raise EvaluationError(f"Expression tree has an incorrect "
+                    "syntactical structure")
+
+            a, left = self._profile(node.left, x, params)
+            b, right = self._profile(node.right, x, params)
+            start = time.perf_counter()
+            result = op.func(a, b)
+            elapsed = time.perf_counter() - start
+            total = left.total_time + right.total_time + elapsed
+            return result, NodeProfile(type(op).__name__, total, elapsed,
+                                       _nbytes(result), left, right)
+        else:
+            raise EvaluationError(f"Unexpected object '{op}' in tree node")
+
+    def _fastest(self, a, b):
+        if a is None:
+            return None
+        left = self._fastest(a.left, b.left)
+        right = self._fastest(a.right, b.right)
+        self_time = min(a.self_time, b.self_time)
+        total = self_time + sum(c.total_time for c in (left, right)
+                                if c is not None)
+        return NodeProfile(a.label, total, self_time, a.nbytes, left, right)
@@ -0,0 +1,262 @@
+## The statistics service summarizes plotted values in a single streaming
+## pass. A StreamingStats reducer is updated with consecutive chunks of a
+## plot while they are still in the CPU cache, right after they are
+## evaluated, so the minimum, maximum, mean, NaN count and integrals of a plot
+## cost no extra passes over the data.
+
+import numpy as np
+
+
+def _simpson_pairs(x, y):
+    """
+    Integrates pairs of consecutive intervals with Simpson's rule for
+    non-uniform spacing.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        2k+1 x values
+    y : numpy.ndarray
+        2k+1 y values
+
+    Returns
+    -------
+    integrals : numpy.ndarray
+        The integral over every pair of intervals
+    """
+
+    h0 = x[1:-1:2] - x[0:-2:2]
+    h1 = x[2::2] - x[1:-1:2]
+    y0, y1, y2 = y[0:-2:2], y[1:-1:2], y[2::2]
+    return (h0 + h1) / 6 * ((2 - h1 / h0) * y0 +
+                            (h0 + h1) ** 2 / (h0 * h1) * y1 +
+                            (2 - h0 / h1) * y2)
+
+
+def _last_interval(x, y):
+    """
+    Integrates the quadratic through three points over the last interval,
+    used to close Simpson's rule on an odd number of intervals.
+    """
+
+    h0 = x[1] - x[0]
+    h1 = x[2] - x[1]
+    return h1 / 6 * (-h1 ** 2 / (h0 * (h0 + h1)) * y[0] +
+                     (h1 + 3 * h0) / h0 * y[1] +
+                     (2 * h1 + 3 * h0) / (h0 + h1) * y[2])
+
+
+class StreamingStats(object):
+    """
+    Represents a streaming reducer of the (x, y) values of a plot. Call
+    update() with consecutive chunks of the points in order, then read the
+    statistics. Only finite values count for the minimum, maximum and mean,
+    while the integrals are NaN if any value is not finite.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.nan_count = 0
+        self.inf_count = 0
+        self.finite_count = 0
+        self.min = np.nan
+        self.max = np.nan
+        self.argmin = np.nan
+        self.argmax = np.nan
+        self._sum = 0.0
+        self._trapezoid = 0.0
+        self._simpson = 0.0
+        # the points after the last even index, Simpson's rule pairs
+        # intervals starting at even indices
+        self._x_tail = np.empty(0)
+        self._y_tail = np.empty(0)
+        # the point before the tail, used to close Simpson's rule
+        self._before = None
+        # the final Simpson value of a reducer restored by from_summary()
+        self._simpson_total = None
+
+    def update(self, x, y):
+        """
+        Adds the next chunk of points.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the chunk, continuing the previous chunk
+        y : numpy.ndarray
+            The y values of the chunk
+        """
+
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        if len(y) == 0:
+            return
+        self.count += len(y)
+
+        finite = np.isfinite(y)
+        n_finite = int(np.count_nonzero(finite))
+        nans = int(np.count_nonzero(np.isnan(y)))
+        self.nan_count += nans
+        self.inf_count += len(y) - n_finite - nans
+        if n_finite:
+            self.finite_count += n_finite
+            if n_finite == len(y):
+                x_finite, y_finite = x, y
+            else:
+                x_finite, y_finite = x[finite], y[finite]
+            i = np.argmin(y_finite)
+            j = np.argmax(y_finite)
+            # NaN comparisons are False, the first finite chunk always wins
+            if not y_finite[i] >= self.min:
+                self.min, self.argmin = y_finite[i], x_finite[i]
+            if not y_finite[j] <= self.max:
+                self.max, self.argmax = y_finite[j], x_finite[j]
+            self._sum += float(np.sum(y_finite))
+
+        with np.errstate(all='ignore'):
+            # the interval joining the previous chunk, then the chunk's own
+            trapezoid = np.sum(np.diff(x) * (y[:-1] + y[1:])) / 2
+            if len(self._x_tail):
+                trapezoid += ((x[0] - self._x_tail[-1]) *
+                              (y[0] + self._y_tail[-1]) / 2)
+            self._trapezoid += float(trapezoid)
+
+            # complete the pair of intervals begun in the previous chunk,
+            # without copying the chunk
+            offset = 0
+            if len(self._x_tail):
+                need = 3 - len(self._x_tail)
+                if len(x) < need:
+                    self._x_tail = np.concatenate((self._x_tail, x))
+                    self._y_tail = np.concatenate((self._y_tail, y))
+                    return
+                head_x = np.concatenate((self._x_tail, x[:need]))
+                head_y = np.concatenate((self._y_tail, y[:need]))
+                self._simpson += float(_simpson_pairs(head_x, head_y)[0])
+                self._before = (head_x[1], head_y[1])
+                offset = need - 1
+
+            # the rest starts at an even index
+            x = x[offset:]
+            y = y[offset:]
+            pairs = (len(x) - 1) // 2
+            if pairs:
+                self._simpson += float(np.sum(
+                    _simpson_pairs(x[:2 * pairs + 1], y[:2 * pairs + 1])))
+                self._before = (x[2 * pairs - 1], y[2 * pairs - 1])
+            self._x_tail = x[2 * pairs:].copy()
+            self._y_tail = y[2 * pairs:].copy()
+
+    @property
+    def mean(self):
+        """
+        Returns
+        -------
+        mean : float
+            The mean of the finite values, NaN if there are none
+        """
+
+        if not self.finite_count:
+            return np.nan
+        return self._sum / self.finite_count
+
+    @property
+    def trapezoid(self):
+        """
+        Returns
+        -------
+        integral : float
+            The integral of the points with the trapezoidal rule
+        """
+
+        if self.count < 2 or self.finite_count < self.count:
+            return np.nan
+        return self._trapezoid
+
+    @property
+    def simpson(self):
+        """
+        Returns
+        -------
+        integral : float
+            The integral of the points with Simpson's rule. An odd number of
+            intervals is closed with the quadratic through the last three
+            points.
+        """
+
+        if self.count < 2 or self.finite_count < self.count:
+            return np.nan
+        if self._simpson_total is not None:
+            return self._simpson_total
+        if len(self._x_tail) == 1:
+            return self._simpson
+        if self._before is None:
+            # a single interval
+            return self._trapezoid
+        x = np.array([self._before[0], self._x_tail[0], self._x_tail[1]])
+        y = np.array([self._before[1], self._y_tail[0], self._y_tail[1]])
+        with np.errstate(all='ignore'):
+            return self._simpson + float(_last_interval(x, y))
+
+    def summary(self):
+        """
+        Returns
+        -------
+        summary : numpy.ndarray
+            The final statistics as a float64 array, e.g. to cache them, see
+            from_summary()
+        """
+
+        return np.array([self.count, self.nan_count, self.inf_count,
+                         self.finite_count, self.min, self.max, self.argmin,
+                         self.argmax, self._sum, self._trapezoid,
+                         self.simpson], dtype=np.float64)
+
+    @classmethod
+    def from_summary(cls, summary):
+        """
+        Restores the statistics returned by summary(). The restored reducer
+        can be read but not updated.
+
+        Parameters
+        ----------
+        summary : numpy.ndarray
+            The array returned by summary()
+
+        Returns
+        -------
+        stats : StreamingStats
+        """
+
+        stats = cls()
+        (count, nan_count, inf_count, finite_count, stats.min, stats.max,
+         stats.argmin, stats.argmax, stats._sum, stats._trapezoid,
+         stats._simpson_total) = (float(value) for value in summary)
+        stats.count = int(count)
+        stats.nan_count = int(nan_count)
+        stats.inf_count = int(inf_count)
+        stats.finite_count = int(finite_count)
+        return stats
+
+    def y_limits(self, margin=0.05):
+        """
+        Computes y axis limits that show all the finite values.
+
+        Parameters
+        ----------
+        margin : float
+            The padding added above and below, as a fraction of the range.
+            Defaults to 0.05.
+
+        Returns
+        -------
+        limits : (float, float)
+            The (bottom, top) limits, or None if there are no finite values
+        """
+
+        if not self.finite_count:
+            return None
+        pad = (self.max - self.min) * margin
+        if pad == 0:
+            pad = abs(self.max) * margin or 1.0
+        return self.min - pad, self.max + pad
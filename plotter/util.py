@@ -1,5 +1,11 @@
 ## Helper classes and functions
 
+import sys
+import time
+import builtins
+from importlib.util import resolve_name
+
+
 class EvaluationError(Exception):
     pass
 
@@ -35,4 +41,98 @@ def split_str(string, sep=[',']):
     if s:
         list_.append(s)
 
-    return list_
\ No newline at end of file
+    return list_
+
+
+class ImportProfiler(object):
+    """
+    Measures how long each module takes to import while the profiler is
+    running. Only imports that load new modules are recorded, so the report is
+    a breakdown of the cold start cost.
+    """
+
+    def __init__(self):
+        # list of (depth, module name, inclusive seconds) in import order
+        self.records = []
+        self._depth = 0
+        self._original_import = None
+
+    def start(self):
+        """
+        Starts recording imports.
+        """
+
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._import
+
+    def stop(self):
+        """
+        Stops recording imports.
+        """
+
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        n_modules = len(sys.modules)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            return self._original_import(name, globals, locals, fromlist,
+                                         level)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth -= 1
+            if len(sys.modules) > n_modules:
+                if level and globals:
+                    name = resolve_name('.' * level + name,
+                                        globals.get('__package__'))
+                self.records.append((self._depth, name, elapsed))
+
+    def report(self, max_depth=2, min_time=0.001):
+        """
+        Formats the recorded imports as an indented tree.
+
+        Parameters
+        ----------
+        max_depth : int
+            Nested imports deeper than this are left out. Defaults to 2.
+        min_time : float
+            Imports faster than this many seconds are left out.
+            Defaults to 0.001.
+
+        Returns
+        -------
+        report : str
+            One line per import with its inclusive time in milliseconds
+        """
+
+        # records are appended when an import finishes, so children come
+        # before their parents; reverse the post-order to print parents first
+        lines = []
+        for depth, name, elapsed in self._preorder():
+            if depth < max_depth and elapsed >= min_time:
+                lines.append(f"{elapsed * 1000:9.1f} ms  {'  ' * depth}{name}")
+        total = sum(elapsed for depth, name, elapsed in self.records
+                    if depth == 0)
+        lines.append(f"{total * 1000:9.1f} ms  total")
+        return '\n'.join(lines)
+
+    def _preorder(self):
+        stack = [[]]
+        for depth, name, elapsed in self.records:
+            while len(stack) <= depth + 1:
+                stack.append([])
+            children = []
+            for k in range(depth + 1, len(stack)):
+                children.extend(stack[k])
+                stack[k] = []
+            stack[depth].append((depth, name, elapsed, children))
+
+        def walk(nodes):
+            for depth, name, elapsed, children in nodes:
+                yield depth, name, elapsed
+                yield from walk(children)
+
+        return list(walk(stack[0]))
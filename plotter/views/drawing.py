@@ -0,0 +1,206 @@
+## Drawing functions shared by the plot widgets. Each one draws on a matplotlib
+## Axes without touching Qt, so the same code draws on the Qt canvas in the GUI
+## thread and on the offscreen Agg figure of the render worker thread.
+##
+## draw_plot, draw_plots, draw_heatmap and draw_image clear the axes and
+## replace the plot. draw_markers and draw_area draw on top of it.
+
+import numpy as np
+
+
+def set_labels(axes):
+    """
+    Sets the x and y axis labels
+    """
+
+    axes.set_xlabel("x")
+    axes.set_ylabel("f(x)")
+
+
+def draw_plot(axes, x, y, y_limits=None):
+    """
+    Draws the plot provided by the x and y values
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        The axes to draw on
+    x : numpy.ndarray
+        The x values of the points to plot
+    y : numpy.ndarray
+        The y values of the points to plot
+    y_limits : (float, float)
+        If provided, the y axis limits, e.g. from already computed
+        statistics, so matplotlib doesn't scan y again to autoscale
+    """
+
+    axes.cla()
+    axes.set_xlim(x[0], x[-1])
+    if y_limits is not None:
+        axes.set_ylim(*y_limits)
+    set_labels(axes)
+    axes.plot(x, y, scalex=False, scaley=y_limits is None)
+
+
+def draw_plots(axes, x, y):
+    """
+    Draws several functions sharing the same x values as a single
+    LineCollection instead of one Line2D per function
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        The axes to draw on
+    x : numpy.ndarray
+        The x values of the points to plot
+    y : numpy.ndarray
+        A 2-D array with the y values of one function per row
+    """
+
+    import matplotlib
+    from matplotlib.collections import LineCollection
+
+    # (functions, points, 2) array of line vertices
+    segments = np.empty(y.shape + (2,))
+    segments[:, :, 0] = x
+    segments[:, :, 1] = y
+
+    cycle = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+    colors = [cycle[i % len(cycle)] for i in range(len(y))]
+
+    axes.cla()
+    axes.set_xlim(x[0], x[-1])
+    set_labels(axes)
+    axes.add_collection(LineCollection(segments, colors=colors))
+    axes.autoscale_view(scalex=False)
+
+
+def draw_heatmap(axes, x, values, y, label="parameter"):
+    """
+    Draws a family of curves as a heatmap, one row per parameter value
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        The axes to draw on
+    x : numpy.ndarray
+        The x values of the points
+    values : numpy.ndarray
+        The parameter value of each row of y
+    y : numpy.ndarray
+        A (len(values), len(x)) array of y values
+    label : str
+        The name of the parameter, used as the vertical axis label
+    """
+
+    axes.cla()
+    axes.pcolormesh(x, values, y, shading='nearest')
+    axes.set_xlabel("x")
+    axes.set_ylabel(label)
+
+
+def draw_image(axes, x, y, z, contour=False, levels=10):
+    """
+    Draws a function of x and y as an image, optionally with contour lines
+    on top
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        The axes to draw on
+    x : numpy.ndarray
+        The x values of the grid columns
+    y : numpy.ndarray
+        The y values of the grid rows
+    z : numpy.ndarray
+        A (len(y), len(x)) array of function values
+    contour : bool
+        If True, draws contour lines. Defaults to False.
+    levels : int
+        The number of contour levels. Defaults to 10.
+    """
+
+    axes.cla()
+    axes.imshow(z, extent=(x[0], x[-1], y[0], y[-1]), origin='lower',
+                aspect='auto')
+    if contour:
+        axes.contour(x, y, z, levels, colors='k', linewidths=0.5)
+    axes.set_xlabel("x")
+    axes.set_ylabel("y")
+
+
+def draw_markers(axes, x, y, marker='o', color='k', label=None):
+    """
+    Marks points on top of the current plot, e.g. roots or extrema
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        The axes to draw on
+    x : numpy.ndarray
+        The x values of the points to mark
+    y : numpy.ndarray
+        The y values of the points to mark
+    marker : str
+        The matplotlib marker style. Defaults to 'o'.
+    color : str
+        The marker color. Defaults to 'k'.
+    label : str
+        The legend label of the markers
+    """
+
+    axes.plot(x, y, linestyle='none', marker=marker, color=color,
+              markersize=5, label=label)
+
+
+def draw_area(axes, x, y, alpha=0.3):
+    """
+    Shades the area between a curve and the x axis on top of the current
+    plot
+
+    Parameters
+    ----------
+    axes : matplotlib.axes.Axes
+        The axes to draw on
+    x : numpy.ndarray
+        The x values of the curve
+    y : numpy.ndarray
+        The y values of the curve, NaN values leave gaps
+    alpha : float
+        The opacity of the shading. Defaults to 0.3.
+    """
+
+    axes.fill_between(x, y, where=np.isfinite(y), alpha=alpha,
+                      interpolate=True)
+
+
+def save_scene(scene, file, width=640, height=480, dpi=100):
+    """
+    Draws a scene on a new figure on the Agg canvas and saves it, so a plot
+    shown by a widget that doesn't draw with matplotlib can still be
+    exported at matplotlib quality.
+
+    Parameters
+    ----------
+    scene : list(callable)
+        The drawing calls, each called with the matplotlib Axes in order
+    file : str or file-like object
+        The output file, its extension selects the format, e.g. png or svg
+    width : int
+        The width of the figure in pixels. Defaults to 640.
+    height : int
+        The height of the figure in pixels. Defaults to 480.
+    dpi : int
+        The resolution of the figure. Defaults to 100.
+    """
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    FigureCanvasAgg(fig)
+    axes = fig.add_subplot(1, 1, 1)
+    set_labels(axes)
+    for draw in scene:
+        draw(axes)
+    fig.savefig(file)
@@ -0,0 +1,153 @@
+## Geometry helpers for drawing plots natively, without matplotlib: splitting
+## a curve at undefined values, decimating it to what a given number of pixel
+## columns can show, and choosing round axis tick values. Nothing in this
+## module imports Qt.
+
+import numpy as np
+
+
+def finite_runs(y):
+    """
+    Finds the runs of consecutive finite values, which are drawn as separate
+    polylines.
+
+    Parameters
+    ----------
+    y : numpy.ndarray
+        The y values of a curve
+
+    Returns
+    -------
+    runs : list((int, int))
+        The start and stop index of every run
+    """
+
+    finite = np.isfinite(y)
+    # +1 where a run starts, -1 right after it ends
+    edges = np.diff(finite.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    return list(zip(starts.tolist(), stops.tolist()))
+
+
+def decimate(x, y, x_min, x_max, columns):
+    """
+    Reduces a curve with finite, sorted x values to at most 4 points per
+    pixel column: the first, minimum, maximum and last point of the column.
+    Drawn as a polyline, the result lights the same pixels as the full
+    curve, because every line segment of the curve inside a column lies
+    between its minimum and maximum, and the segments joining columns are
+    kept.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        The x values of the curve, in increasing order
+    y : numpy.ndarray
+        The y values of the curve, all finite
+    x_min : float
+        The x value at the left edge of the first column
+    x_max : float
+        The x value at the right edge of the last column
+    columns : int
+        The number of pixel columns
+
+    Returns
+    -------
+    x : numpy.ndarray
+        The x values of the decimated curve
+    y : numpy.ndarray
+        The y values of the decimated curve, the inputs if there are
+        already few enough points
+    """
+
+    if len(x) <= 4 * columns:
+        return x, y
+
+    column = ((x - x_min) * (columns / (x_max - x_min))).astype(np.intp)
+    np.clip(column, 0, columns - 1, out=column)
+    starts = np.flatnonzero(np.diff(column, prepend=-1))
+    lasts = np.append(starts[1:], len(x)) - 1
+
+    # the minimum and maximum are drawn at the x of the first and last point
+    # of the column, the difference is inside one pixel
+    points = np.empty((len(starts), 4, 2))
+    points[:, 0, 0] = points[:, 1, 0] = x[starts]
+    points[:, 2, 0] = points[:, 3, 0] = x[lasts]
+    points[:, 0, 1] = y[starts]
+    points[:, 1, 1] = np.minimum.reduceat(y, starts)
+    points[:, 2, 1] = np.maximum.reduceat(y, starts)
+    points[:, 3, 1] = y[lasts]
+    points = points.reshape(-1, 2)
+    return points[:, 0], points[:, 1]
+
+
+def nice_ticks(lo, hi, count=6):
+    """
+    Chooses round tick values, steps of 1, 2 or 5 times a power of ten.
+
+    Parameters
+    ----------
+    lo : float
+        The lower limit of the axis
+    hi : float
+        The upper limit of the axis
+    count : int
+        The approximate number of ticks wanted. Defaults to 6.
+
+    Returns
+    -------
+    ticks : numpy.ndarray
+        The tick values in [lo, hi]
+    """
+
+    if not (np.isfinite(lo) and np.isfinite(hi)) or hi <= lo:
+        return np.empty(0)
+
+    raw = (hi - lo) / max(count, 1)
+    magnitude = 10.0 ** np.floor(np.log10(raw))
+    for factor in (1, 2, 5, 10):
+        step = factor * magnitude
+        if step >= raw:
+            break
+    first = np.ceil(lo / step)
+    last = np.floor(hi / step)
+    ticks = np.arange(first, last + 1) * step
+    # no -0 labels
+    ticks[ticks == 0] = 0.0
+    return ticks
+
+
+def data_limits(ys, margin=0.05):
+    """
+    Computes y axis limits showing all the finite values of several curves.
+
+    Parameters
+    ----------
+    ys : list(numpy.ndarray)
+        The y values of the curves
+    margin : float
+        The padding added above and below, as a fraction of the range.
+        Defaults to 0.05.
+
+    Returns
+    -------
+    limits : (float, float)
+        The (bottom, top) limits, (-1, 1) if there are no finite values
+    """
+
+    lows = []
+    highs = []
+    for y in ys:
+        finite = y[np.isfinite(y)]
+        if len(finite):
+            lows.append(finite.min())
+            highs.append(finite.max())
+    if not lows:
+        return -1.0, 1.0
+
+    lo, hi = float(min(lows)), float(max(highs))
+    pad = (hi - lo) * margin
+    if pad == 0:
+        pad = abs(hi) * margin or 1.0
+    return lo - pad, hi + pad
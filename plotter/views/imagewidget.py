@@ -0,0 +1,185 @@
+## The image canvas widget shows plots rasterized by a RenderWorker in a
+## background thread. It has the same rendering methods as MplCanvasWidget,
+## but instead of drawing they record the drawing calls in a scene and submit
+## it to the worker, so the GUI thread never runs Agg. When the worker is done,
+## the finished RGBA buffer is wrapped in a QImage without copying and blitted
+## in paintEvent().
+
+from functools import partial
+from PySide2.QtCore import Qt, Signal, Slot
+from PySide2.QtGui import QImage, QPainter
+from PySide2.QtWidgets import QWidget, QLabel
+from ..instrumentation import instrumentation
+from . import drawing
+from .renderworker import RenderWorker
+
+
+class ImageCanvasWidget(QWidget):
+    """
+    Plot widget rendering off the GUI thread
+    """
+
+    # emitted from the worker thread, delivered to the GUI thread by a
+    # queued connection
+    rendered = Signal(int, object)
+
+    def __init__(self, parent=None, dpi=100):
+        super().__init__(parent)
+
+        self.worker = RenderWorker(dpi)
+        self._scene = []
+        self._image = None
+        # the pixels the image points to, kept alive as long as the image
+        self._pixels = None
+        self._shown_generation = 0
+
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.rendered.connect(self._on_rendered)
+
+        # text drawn on top of the plot, e.g. stage timings
+        self.overlay_label = QLabel(self)
+        self.overlay_label.setStyleSheet("background-color: rgba(255, 255, "
+            "255, 200); color: black; font-family: monospace; padding: 4px")
+        self.overlay_label.move(8, 8)
+        self.overlay_label.setVisible(False)
+
+    def _submit(self):
+        """
+        Submits the scene for rendering at the current size of the widget
+        """
+
+        ratio = self.devicePixelRatioF()
+        self.worker.submit(self._scene, round(self.width() * ratio),
+                           round(self.height() * ratio), self.rendered.emit)
+
+    @Slot(int, object)
+    def _on_rendered(self, generation, pixels):
+        # a superseded image may still be in the event queue
+        if generation < self._shown_generation:
+            return
+        self._shown_generation = generation
+
+        height, width = pixels.shape[:2]
+        self._pixels = pixels
+        self._image = QImage(pixels.data, width, height, pixels.strides[0],
+                             QImage.Format_RGBA8888)
+        self._image.setDevicePixelRatio(self.devicePixelRatioF())
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self._image is None:
+            painter.fillRect(self.rect(), Qt.white)
+        else:
+            # stretched until the image at the new size arrives
+            painter.drawImage(self.rect(), self._image)
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._submit()
+
+    def _replace(self, draw):
+        self._scene = [draw]
+        self._submit()
+
+    def _add(self, draw):
+        self._scene.append(draw)
+        self._submit()
+
+    def render_plot(self, x, y, y_limits=None):
+        """
+        Renders the plot provided by the x and y values, see
+        drawing.draw_plot()
+        """
+
+        with instrumentation.stage('view.render_plot', count=len(x)):
+            self._replace(partial(drawing.draw_plot, x=x, y=y,
+                                  y_limits=y_limits))
+
+    def render_plots(self, x, y):
+        """
+        Renders several functions sharing the same x values, see
+        drawing.draw_plots()
+        """
+
+        with instrumentation.stage('view.render_plots', count=y.size):
+            self._replace(partial(drawing.draw_plots, x=x, y=y))
+
+    def render_heatmap(self, x, values, y, label="parameter"):
+        """
+        Renders a family of curves as a heatmap, see drawing.draw_heatmap()
+        """
+
+        with instrumentation.stage('view.render_heatmap', count=y.size):
+            self._replace(partial(drawing.draw_heatmap, x=x, values=values,
+                                  y=y, label=label))
+
+    def render_image(self, x, y, z, contour=False, levels=10):
+        """
+        Renders a function of x and y as an image, see drawing.draw_image()
+        """
+
+        with instrumentation.stage('view.render_image', count=z.size):
+            self._replace(partial(drawing.draw_image, x=x, y=y, z=z,
+                                  contour=contour, levels=levels))
+
+    def render_markers(self, x, y, marker='o', color='k', label=None):
+        """
+        Marks points on top of the current plot, see drawing.draw_markers()
+        """
+
+        self.render_marker_sets([(x, y, marker, color, label)])
+
+    def render_marker_sets(self, marker_sets):
+        """
+        Marks several sets of points on top of the current plot with a
+        single render, see render_markers()
+        """
+
+        count = sum(len(marker_set[0]) for marker_set in marker_sets)
+        with instrumentation.stage('view.render_markers', count=count):
+            self._scene.extend(
+                partial(drawing.draw_markers, x=x, y=y, marker=marker,
+                        color=color, label=label)
+                for x, y, marker, color, label in marker_sets)
+            self._submit()
+
+    def render_area(self, x, y, alpha=0.3):
+        """
+        Shades the area under a curve on top of the current plot, see
+        drawing.draw_area()
+        """
+
+        with instrumentation.stage('view.render_area', count=len(x)):
+            self._add(partial(drawing.draw_area, x=x, y=y, alpha=alpha))
+
+    def export(self, file):
+        """
+        Saves the plot at the size of the widget, drawn in the calling
+        thread.
+
+        Parameters
+        ----------
+        file : str or file-like object
+            The output file, its extension selects the format, e.g. png or
+            svg
+        """
+
+        drawing.save_scene(self._scene, file, self.width(), self.height(),
+                           self.worker.dpi)
+
+    def set_overlay_text(self, string=""):
+        """
+        Shows text on top of the plot. If the string is empty, hides it.
+
+        Parameters
+        ----------
+        string : str
+            Defaults to ""
+        """
+
+        self.overlay_label.setText(string)
+        self.overlay_label.adjustSize()
+        self.overlay_label.setVisible(True if string else False)
+        self.overlay_label.raise_()
@@ -5,12 +5,22 @@
 from PySide2 import QtCore
 from PySide2.QtCore import Slot, Signal, QLocale
 from PySide2.QtWidgets import (
-    QWidget, QLabel, QTextEdit, QLineEdit, QPushButton,
+    QWidget, QLabel, QTextEdit, QLineEdit, QPushButton, QCheckBox,
     QLayout, QVBoxLayout, QHBoxLayout,
     QSizePolicy
     )
 from PySide2.QtGui import QDoubleValidator
 from .mplwidget import MplCanvasWidget
+from .imagewidget import ImageCanvasWidget
+from .painterwidget import QPainterPlotWidget
+
+
+# the plot widgets MainWidget can use, all have the same rendering methods
+RENDERERS = {
+    'matplotlib': MplCanvasWidget,
+    'threaded': ImageCanvasWidget,
+    'native': QPainterPlotWidget,
+}
 
 
 class CustomWidget(QWidget):
@@ -65,6 +75,12 @@ class CustomWidget(QWidget):
         self.layout.addWidget(button)
         return button
 
+    def _add_check_box(self, text, checked=False):
+        check_box = QCheckBox(text)
+        check_box.setChecked(checked)
+        self.layout.addWidget(check_box)
+        return check_box
+
 
 class AxisRangeWidget(CustomWidget):
     """
@@ -121,25 +137,114 @@ class FunctionWidget(CustomWidget):
         self.func_label = self._add_label("f(x) = ")
 
         self.func_input = self._add_line_edit()
-        self.func_input.setPlaceholderText("e.g. x^2")
+        self.func_input.setPlaceholderText("e.g. x^2, or x^2; 2*x to plot "
+                                           "several functions")
+
+        self.points_check_box = self._add_check_box("Points")
+        self.points_check_box.setToolTip("Mark roots, extrema and "
+                                          "intersections")
+
+        self.area_check_box = self._add_check_box("Area")
+        self.area_check_box.setToolTip("Shade and integrate the area under "
+                                       "the function")
 
         self.plot_button = self._add_button("Plot")
 
 
+class SweepWidget(CustomWidget):
+    """
+    The widget containing the optional parameter to sweep: its name, the
+    range of its values and how to render the family of curves
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(QHBoxLayout(), *args, **kwargs)
+
+        self.name_label = self._add_label("Sweep:")
+        self.name_input = self._add_line_edit()
+        self.name_input.setPlaceholderText("e.g. a in a*x^2")
+        self.name_input.setToolTip("A parameter of the function, plotted "
+                                   "for values in the range")
+
+        self.from_label = self._add_label("From:")
+        self.from_input = self._add_float_line_edit("0")
+
+        self.to_label = self._add_label("To:")
+        self.to_input = self._add_float_line_edit("1")
+
+        self.heatmap_check_box = self._add_check_box("Heatmap")
+        self.heatmap_check_box.setToolTip("Show the curves as a heatmap, "
+                                          "one row per parameter value")
+
+    def get_sweep_values(self):
+        """
+        Reads the parameter name and the range of its values
+
+        Returns
+        -------
+        name : str
+            The parameter name, empty if no parameter is swept
+        first : float
+            The value of the from input
+        last : float
+            The value of the to input
+
+        Raises
+        ------
+        ValueError
+            User entered an invalid name, a string that doesn't represent a
+            float or an empty range
+        """
+
+        name = self.name_input.text().strip()
+        if not name:
+            return name, None, None
+        if not name.isalpha() or name in ('x', 'y'):
+            raise ValueError("Sweep must be the name of a parameter other "
+                             "than x or y")
+
+        try:
+            first = float(self.from_input.text())
+        except ValueError:
+            raise ValueError("Sweep From must be a number")
+
+        try:
+            last = float(self.to_input.text())
+        except ValueError:
+            raise ValueError("Sweep To must be a number")
+
+        if last <= first:
+            raise ValueError("Sweep To must be greater than From")
+        return name, first, last
+
+
 class MainWidget(QWidget):
     """
     The main widget rendered directly by the application. It contains:
     - Axis range widget
     - Range error label
-    - Matplotlib widget
+    - Plot widget
+    - Statistics label
     - Function widget
+    - Sweep widget
     - Syntax error label
     """
 
     # define signals
     on_plot = Signal()
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, renderer='matplotlib', **kwargs):
+        """
+        Parameters
+        ----------
+        renderer : str
+            The plot widget to use, a key of RENDERERS. 'matplotlib' draws
+            on a Matplotlib canvas in the GUI thread, 'threaded' rasterizes
+            in a background thread and only blits the image and 'native'
+            draws decimated curves with QPainter, the fastest for
+            interactive use. Defaults to 'matplotlib'.
+        """
+
         super().__init__(*args, **kwargs)
 
         # create the main layout (vertical)
@@ -159,18 +264,30 @@ class MainWidget(QWidget):
         self.range_error_label.setStyleSheet("color: red")
         self.layout.addWidget(self.range_error_label)
 
-        # matplotlib canvas widget
-        self.plot_widget = MplCanvasWidget()
+        # plot widget
+        self.plot_widget = RENDERERS[renderer]()
         self.plot_widget.setSizePolicy(QSizePolicy.Expanding,
                                        QSizePolicy.Expanding)
         self.layout.addWidget(self.plot_widget)
 
+        # statistics of the plotted function
+        self.stats_label = QLabel()
+        self.stats_label.setAlignment(QtCore.Qt.AlignCenter)
+        self.stats_label.setVisible(False)
+        self.layout.addWidget(self.stats_label)
+
         # function input widget
         self.func_widget = FunctionWidget()
         self.func_widget.setMaximumWidth(640)
         self.layout.addWidget(self.func_widget,
             alignment=QtCore.Qt.AlignHCenter)
 
+        # parameter sweep widget
+        self.sweep_widget = SweepWidget()
+        self.sweep_widget.setMaximumWidth(640)
+        self.layout.addWidget(self.sweep_widget,
+            alignment=QtCore.Qt.AlignHCenter)
+
         # syntax error message widget
         self.syntax_error_label = QLabel()
         self.syntax_error_label.setAlignment(QtCore.Qt.AlignCenter)
@@ -194,6 +311,37 @@ class MainWidget(QWidget):
         """
 
         return self.func_widget.func_input.text()
+
+    def get_input_strings(self):
+        """
+        Returns
+        -------
+        func_texts : list(str)
+            The non-empty functions in the input text, separated by ';'
+        """
+
+        return [s for s in self.get_input_string().split(';') if s.strip()]
+
+    def get_show_points(self):
+        """
+        Returns
+        -------
+        show_points : bool
+            True if roots, extrema and intersections should be marked
+        """
+
+        return self.func_widget.points_check_box.isChecked()
+
+    def get_show_area(self):
+        """
+        Returns
+        -------
+        show_area : bool
+            True if the area under the function should be integrated and
+            shaded
+        """
+
+        return self.func_widget.area_check_box.isChecked()
     
     def get_x_range(self):
         """
@@ -209,6 +357,39 @@ class MainWidget(QWidget):
 
         return self.axis_range_widget.get_x_values()
 
+    def get_sweep(self):
+        """
+        Reads the parameter to sweep
+
+        Returns
+        -------
+        sweep : (str, float, float)
+            The parameter name and its first and last value, or None if no
+            parameter is entered
+
+        Raises
+        ------
+        ValueError
+            User entered an invalid name, a value that isn't a float or an
+            empty range
+        """
+
+        name, first, last = self.sweep_widget.get_sweep_values()
+        if not name:
+            return None
+        return name, first, last
+
+    def get_show_heatmap(self):
+        """
+        Returns
+        -------
+        show_heatmap : bool
+            True if a parameter sweep should be rendered as a heatmap
+            instead of a family of curves
+        """
+
+        return self.sweep_widget.heatmap_check_box.isChecked()
+
     def update_range_error_message(self, string=""):
         """
         Updates the range error message label. If the string is empty, makes the
@@ -237,7 +418,21 @@ class MainWidget(QWidget):
         self.syntax_error_label.setText(string)
         self.syntax_error_label.setVisible(True if string else False)
     
-    def render_plot(self, x, y):
+    def update_stats_message(self, string=""):
+        """
+        Updates the statistics label. If the string is empty, makes the label
+        invisible.
+
+        Parameters
+        ----------
+        string : str
+            Defaults to ""
+        """
+
+        self.stats_label.setText(string)
+        self.stats_label.setVisible(True if string else False)
+
+    def render_plot(self, x, y, y_limits=None):
         """
         Renders the plot provided by the x and y values
 
@@ -247,6 +442,134 @@ class MainWidget(QWidget):
             The x values of the points to plot
         y : numpy.ndarray
             The y values of the points to plot
+        y_limits : (float, float)
+            If provided, the y axis limits
+        """
+
+        self.plot_widget.render_plot(x, y, y_limits)
+
+    def render_plots(self, x, y):
+        """
+        Renders several functions sharing the same x values
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to plot
+        y : numpy.ndarray
+            A 2-D array with the y values of one function per row
+        """
+
+        self.plot_widget.render_plots(x, y)
+
+    def render_heatmap(self, x, values, y, label="parameter"):
+        """
+        Renders a family of curves as a heatmap, one row per parameter value
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points
+        values : numpy.ndarray
+            The parameter value of each row of y
+        y : numpy.ndarray
+            A (len(values), len(x)) array of y values
+        label : str
+            The name of the parameter
+        """
+
+        self.plot_widget.render_heatmap(x, values, y, label)
+
+    def render_image(self, x, y, z, contour=False):
+        """
+        Renders a function of x and y as an image, e.g. computed with
+        Plotter.plot_2d(). Not used by the presenter, the function input
+        only takes functions of x.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the grid columns
+        y : numpy.ndarray
+            The y values of the grid rows
+        z : numpy.ndarray
+            A (len(y), len(x)) array of function values
+        contour : bool
+            If True, draws contour lines. Defaults to False.
+        """
+
+        self.plot_widget.render_image(x, y, z, contour)
+
+    def render_markers(self, x, y, marker='o', color='k', label=None):
+        """
+        Marks points on top of the current plot
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to mark
+        y : numpy.ndarray
+            The y values of the points to mark
+        marker : str
+            The matplotlib marker style. Defaults to 'o'.
+        color : str
+            The marker color. Defaults to 'k'.
+        label : str
+            The legend label of the markers
+        """
+
+        self.plot_widget.render_markers(x, y, marker, color, label)
+
+    def render_marker_sets(self, marker_sets):
+        """
+        Marks several sets of points on top of the current plot, drawn
+        together instead of once per set
+
+        Parameters
+        ----------
+        marker_sets : list(tuple)
+            The (x, y, marker, color, label) of every set, see
+            render_markers()
+        """
+
+        self.plot_widget.render_marker_sets(marker_sets)
+
+    def render_area(self, x, y):
+        """
+        Shades the area between a curve and the x axis
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the curve
+        y : numpy.ndarray
+            The y values of the curve
+        """
+
+        self.plot_widget.render_area(x, y)
+
+    def export_plot(self, file):
+        """
+        Saves the plot, drawn by Matplotlib whatever the renderer
+
+        Parameters
+        ----------
+        file : str or file-like object
+            The output file, its extension selects the format, e.g. png or
+            svg
+        """
+
+        self.plot_widget.export(file)
+
+    def update_timing_overlay(self, string=""):
+        """
+        Updates the timing text shown on top of the plot. If the string is
+        empty, hides it.
+
+        Parameters
+        ----------
+        string : str
+            Defaults to ""
         """
 
-        self.plot_widget.render_plot(x, y)
+        self.plot_widget.set_overlay_text(string)
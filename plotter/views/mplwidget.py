@@ -1,29 +1,91 @@
 ## The Matplotlib canvas widget responsible for rendering the plot.
 
-import numpy as np
-import matplotlib
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
+from PySide2.QtCore import QTimer
+from PySide2.QtWidgets import QWidget, QLabel, QVBoxLayout, QSizePolicy
+from ..instrumentation import instrumentation
+from . import drawing
 
 
-class MplCanvasWidget(FigureCanvas):
+class MplCanvasWidget(QWidget):
     """
     Matplotlib Canvas Widget
+
+    Importing matplotlib and creating the figure is the slowest part of
+    starting the application, so the canvas is created lazily: right after the
+    widget is first shown, or earlier if the canvas or axes are accessed.
     """
 
-    # FigureCanvas inherits from QtWidget
     def __init__(self, parent=None, width=5, height=4, dpi=100):
+        super().__init__(parent)
+
+        self.figsize = (width, height)
+        self.dpi = dpi
+        self._canvas = None
+        self._axes = None
+
+        self.layout = QVBoxLayout()
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(self.layout)
+
+        # text drawn on top of the plot, e.g. stage timings
+        self.overlay_label = QLabel(self)
+        self.overlay_label.setStyleSheet("background-color: rgba(255, 255, "
+            "255, 200); color: black; font-family: monospace; padding: 4px")
+        self.overlay_label.move(8, 8)
+        self.overlay_label.setVisible(False)
+
+    @property
+    def canvas(self):
+        """
+        The matplotlib FigureCanvas, created on first access
+        """
+
+        self._create_canvas()
+        return self._canvas
+
+    @property
+    def axes(self):
+        """
+        The matplotlib Axes used for plotting, created on first access
+        """
+
+        self._create_canvas()
+        return self._axes
+
+    def showEvent(self, event):
+        super().showEvent(event)
+
+        if self._canvas is None:
+            # create the figure once the window had a chance to appear
+            QTimer.singleShot(0, self._create_canvas)
+
+    def _create_canvas(self):
+        if self._axes is not None:
+            return
+
+        from matplotlib.backends.backend_qt5agg import (
+            FigureCanvasQTAgg as FigureCanvas)
+        from matplotlib.figure import Figure
+
         # create the figure and axes used for plotting
-        fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = fig.add_subplot(1, 1, 1)
+        fig = Figure(figsize=self.figsize, dpi=self.dpi)
+        self._axes = fig.add_subplot(1, 1, 1)
         self.set_labels()
 
-        FigureCanvas.__init__(self, fig)
-        self.setParent(parent)
+        self._canvas = FigureCanvas(fig)
+        self._canvas.setSizePolicy(QSizePolicy.Expanding,
+                                   QSizePolicy.Expanding)
+        self._canvas.updateGeometry()
+        self.layout.addWidget(self._canvas)
 
-        FigureCanvas.updateGeometry(self)
-    
-    def render_plot(self, x, y):
+    def draw(self):
+        """
+        Redraws the canvas
+        """
+
+        self.canvas.draw()
+
+    def render_plot(self, x, y, y_limits=None):
         """
         Renders the plot provided by the x and y values
 
@@ -33,19 +95,163 @@ class MplCanvasWidget(FigureCanvas):
             The x values of the points to plot
         y : numpy.ndarray
             The y values of the points to plot
+        y_limits : (float, float)
+            If provided, the y axis limits, e.g. from already computed
+            statistics, so matplotlib doesn't scan y again to autoscale
         """
-        
-        x_min, x_max = x[0], x[-1]
-        self.axes.cla()
-        self.axes.set_xlim(x_min, x_max)
-        self.set_labels()
-        self.axes.plot(x, y)
-        self.draw()
-    
+
+        with instrumentation.stage('view.render_plot', count=len(x)):
+            drawing.draw_plot(self.axes, x, y, y_limits)
+            self.draw()
+
+    def render_plots(self, x, y):
+        """
+        Renders several functions sharing the same x values as a single
+        LineCollection instead of one Line2D per function
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to plot
+        y : numpy.ndarray
+            A 2-D array with the y values of one function per row
+        """
+
+        with instrumentation.stage('view.render_plots', count=y.size):
+            drawing.draw_plots(self.axes, x, y)
+            self.draw()
+
+    def render_heatmap(self, x, values, y, label="parameter"):
+        """
+        Renders a family of curves as a heatmap, one row per parameter value
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points
+        values : numpy.ndarray
+            The parameter value of each row of y
+        y : numpy.ndarray
+            A (len(values), len(x)) array of y values
+        label : str
+            The name of the parameter, used as the vertical axis label
+        """
+
+        with instrumentation.stage('view.render_heatmap', count=y.size):
+            drawing.draw_heatmap(self.axes, x, values, y, label)
+            self.draw()
+
+    def render_image(self, x, y, z, contour=False, levels=10):
+        """
+        Renders a function of x and y as an image, optionally with contour
+        lines on top
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the grid columns
+        y : numpy.ndarray
+            The y values of the grid rows
+        z : numpy.ndarray
+            A (len(y), len(x)) array of function values
+        contour : bool
+            If True, draws contour lines. Defaults to False.
+        levels : int
+            The number of contour levels. Defaults to 10.
+        """
+
+        with instrumentation.stage('view.render_image', count=z.size):
+            drawing.draw_image(self.axes, x, y, z, contour, levels)
+            self.draw()
+
+    def render_markers(self, x, y, marker='o', color='k', label=None):
+        """
+        Marks points on top of the current plot, e.g. roots or extrema
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to mark
+        y : numpy.ndarray
+            The y values of the points to mark
+        marker : str
+            The matplotlib marker style. Defaults to 'o'.
+        color : str
+            The marker color. Defaults to 'k'.
+        label : str
+            The legend label of the markers
+        """
+
+        self.render_marker_sets([(x, y, marker, color, label)])
+
+    def render_marker_sets(self, marker_sets):
+        """
+        Marks several sets of points on top of the current plot, then
+        redraws the canvas once
+
+        Parameters
+        ----------
+        marker_sets : list(tuple)
+            The (x, y, marker, color, label) of every set, see
+            render_markers()
+        """
+
+        count = sum(len(marker_set[0]) for marker_set in marker_sets)
+        with instrumentation.stage('view.render_markers', count=count):
+            for x, y, marker, color, label in marker_sets:
+                drawing.draw_markers(self.axes, x, y, marker, color, label)
+            self.draw()
+
+    def render_area(self, x, y, alpha=0.3):
+        """
+        Shades the area between a curve and the x axis on top of the current
+        plot
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the curve
+        y : numpy.ndarray
+            The y values of the curve, NaN values leave gaps
+        alpha : float
+            The opacity of the shading. Defaults to 0.3.
+        """
+
+        with instrumentation.stage('view.render_area', count=len(x)):
+            drawing.draw_area(self.axes, x, y, alpha)
+            self.draw()
+
+    def export(self, file):
+        """
+        Saves the plot.
+
+        Parameters
+        ----------
+        file : str or file-like object
+            The output file, its extension selects the format, e.g. png or
+            svg
+        """
+
+        self.canvas.figure.savefig(file)
+
+    def set_overlay_text(self, string=""):
+        """
+        Shows text on top of the plot. If the string is empty, hides it.
+
+        Parameters
+        ----------
+        string : str
+            Defaults to ""
+        """
+
+        self.overlay_label.setText(string)
+        self.overlay_label.adjustSize()
+        self.overlay_label.setVisible(True if string else False)
+        self.overlay_label.raise_()
+
     def set_labels(self):
         """
         Sets the x and y axis labels
         """
 
-        self.axes.set_xlabel("x")
-        self.axes.set_ylabel("f(x)")
+        drawing.set_labels(self.axes)
@@ -0,0 +1,462 @@
+## The QPainter plot widget draws plots natively for fast interactive use. It
+## has the same rendering methods as MplCanvasWidget, but creates no
+## matplotlib figure and goes through no Axes or Line2D objects. Curves are
+## split at undefined values, decimated to at most 4 points per pixel column
+## and drawn as QPolygonF polylines whose point storage is filled in place
+## through a numpy view, so no Python object is created per point. The axes
+## are a frame with round ticks.
+##
+## The drawing calls are also recorded in a scene, so export() can still save
+## the plot at matplotlib quality.
+
+from functools import partial
+import numpy as np
+import shiboken2
+from PySide2.QtCore import Qt, QPointF, QRectF
+from PySide2.QtGui import QPainter, QPen, QBrush, QColor, QPolygonF, QImage
+from PySide2.QtWidgets import QWidget, QLabel
+from ..instrumentation import instrumentation
+from . import drawing
+from .geometry import finite_runs, decimate, nice_ticks, data_limits
+
+
+# matplotlib's default color cycle, so exports look the same
+COLORS = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b',
+          '#e377c2', '#7f7f7f', '#bcbd22', '#17becf']
+
+# matplotlib's single letter colors
+_COLOR_NAMES = {'k': 'black', 'r': 'red', 'g': 'green', 'b': 'blue',
+                'c': 'cyan', 'm': 'magenta', 'y': 'yellow', 'w': 'white'}
+
+# pixel coordinates are clipped to this range, QPainter can't draw lines to
+# points far outside the widget, e.g. near poles
+_CLIP = float(1 << 15)
+
+
+def new_polygon(n):
+    """
+    Creates a polygon of n points and a numpy view of its point storage.
+
+    Parameters
+    ----------
+    n : int
+        The number of points
+
+    Returns
+    -------
+    polygon : QPolygonF
+        The polygon, must be kept alive while the view is used
+    points : numpy.ndarray
+        A writable (n, 2) float64 view of the x and y coordinates of the
+        points
+
+    Raises
+    ------
+    RuntimeError
+        The binding gives no address for the point storage
+    """
+
+    polygon = QPolygonF()
+    polygon.resize(n)
+    if n == 0:
+        return polygon, np.empty((0, 2))
+    address = polygon.data()
+    if address is None:
+        # writing through a null pointer would crash the process
+        raise RuntimeError("QPolygonF.data() returned no address")
+    # a QPointF is two qreal values, which are doubles
+    buffer = shiboken2.VoidPtr(address, 16 * n, True)
+    return polygon, np.frombuffer(buffer, dtype=np.float64).reshape(n, 2)
+
+
+def _color(name, alpha=1.0):
+    color = QColor(_COLOR_NAMES.get(name, name))
+    color.setAlphaF(alpha)
+    return color
+
+
+class QPainterPlotWidget(QWidget):
+    """
+    Plot widget drawing with QPainter
+    """
+
+    # the space around the plot area for ticks and labels: left, top,
+    # right, bottom
+    MARGINS = (64, 12, 16, 44)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+        # (x, y, color) of every curve
+        self._curves = []
+        # (x, y, alpha) of every shaded area
+        self._areas = []
+        # (x, y, marker, color) of every set of markers
+        self._markers = []
+        # the image of render_image() and render_heatmap() and its pixels
+        self._image = None
+        self._pixels = None
+        self._x_limits = (0.0, 1.0)
+        self._y_limits = (0.0, 1.0)
+        self._labels = ("x", "f(x)")
+        # the drawing calls, replayed with matplotlib by export()
+        self._scene = []
+        # the polylines of the curves at the current size
+        self._polylines = None
+
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+
+        # text drawn on top of the plot, e.g. stage timings
+        self.overlay_label = QLabel(self)
+        self.overlay_label.setStyleSheet("background-color: rgba(255, 255, "
+            "255, 200); color: black; font-family: monospace; padding: 4px")
+        self.overlay_label.move(8, 8)
+        self.overlay_label.setVisible(False)
+
+    def _clear(self, draw, x_limits, y_limits, labels=("x", "f(x)")):
+        self._curves = []
+        self._areas = []
+        self._markers = []
+        self._image = None
+        self._pixels = None
+        self._polylines = None
+        self._x_limits = (float(x_limits[0]), float(x_limits[1]))
+        self._y_limits = (float(y_limits[0]), float(y_limits[1]))
+        self._labels = labels
+        self._scene = [draw]
+
+    def render_plot(self, x, y, y_limits=None):
+        """
+        Renders the plot provided by the x and y values
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to plot, in increasing order
+        y : numpy.ndarray
+            The y values of the points to plot
+        y_limits : (float, float)
+            If provided, the y axis limits, otherwise computed from y
+        """
+
+        with instrumentation.stage('view.render_plot', count=len(x)):
+            self._clear(partial(drawing.draw_plot, x=x, y=y,
+                                y_limits=y_limits),
+                        (x[0], x[-1]), y_limits or data_limits([y]))
+            self._curves = [(x, y, COLORS[0])]
+            self.update()
+
+    def render_plots(self, x, y):
+        """
+        Renders several functions sharing the same x values
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to plot, in increasing order
+        y : numpy.ndarray
+            A 2-D array with the y values of one function per row
+        """
+
+        with instrumentation.stage('view.render_plots', count=y.size):
+            self._clear(partial(drawing.draw_plots, x=x, y=y),
+                        (x[0], x[-1]), data_limits(list(y)))
+            self._curves = [(x, row, COLORS[i % len(COLORS)])
+                            for i, row in enumerate(y)]
+            self.update()
+
+    def render_heatmap(self, x, values, y, label="parameter"):
+        """
+        Renders a family of curves as a heatmap, one row per parameter value
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points
+        values : numpy.ndarray
+            The parameter value of each row of y
+        y : numpy.ndarray
+            A (len(values), len(x)) array of y values
+        label : str
+            The name of the parameter, used as the vertical axis label
+        """
+
+        with instrumentation.stage('view.render_heatmap', count=y.size):
+            self._clear(partial(drawing.draw_heatmap, x=x, values=values,
+                                y=y, label=label),
+                        (x[0], x[-1]), (values[0], values[-1]), ("x", label))
+            self._set_image(y)
+            self.update()
+
+    def render_image(self, x, y, z, contour=False, levels=10):
+        """
+        Renders a function of x and y as an image. Contour lines are only
+        drawn in exports.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the grid columns
+        y : numpy.ndarray
+            The y values of the grid rows
+        z : numpy.ndarray
+            A (len(y), len(x)) array of function values
+        contour : bool
+            If True, exports draw contour lines. Defaults to False.
+        levels : int
+            The number of contour levels. Defaults to 10.
+        """
+
+        with instrumentation.stage('view.render_image', count=z.size):
+            self._clear(partial(drawing.draw_image, x=x, y=y, z=z,
+                                contour=contour, levels=levels),
+                        (x[0], x[-1]), (y[0], y[-1]), ("x", "y"))
+            self._set_image(z)
+            self.update()
+
+    def render_markers(self, x, y, marker='o', color='k', label=None):
+        """
+        Marks points on top of the current plot, e.g. roots or extrema
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the points to mark
+        y : numpy.ndarray
+            The y values of the points to mark
+        marker : str
+            'o', 's' or 'D' for circles, squares or diamonds.
+            Defaults to 'o'.
+        color : str
+            The marker color. Defaults to 'k'.
+        label : str
+            The legend label of the markers, only used in exports
+        """
+
+        self.render_marker_sets([(x, y, marker, color, label)])
+
+    def render_marker_sets(self, marker_sets):
+        """
+        Marks several sets of points on top of the current plot, see
+        render_markers()
+
+        Parameters
+        ----------
+        marker_sets : list(tuple)
+            The (x, y, marker, color, label) of every set
+        """
+
+        count = sum(len(marker_set[0]) for marker_set in marker_sets)
+        with instrumentation.stage('view.render_markers', count=count):
+            for x, y, marker, color, label in marker_sets:
+                self._scene.append(partial(drawing.draw_markers, x=x, y=y,
+                                           marker=marker, color=color,
+                                           label=label))
+                self._markers.append((x, y, marker, color))
+            self.update()
+
+    def render_area(self, x, y, alpha=0.3):
+        """
+        Shades the area between a curve and the x axis on top of the current
+        plot
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            The x values of the curve, in increasing order
+        y : numpy.ndarray
+            The y values of the curve, NaN values leave gaps
+        alpha : float
+            The opacity of the shading. Defaults to 0.3.
+        """
+
+        with instrumentation.stage('view.render_area', count=len(x)):
+            self._scene.append(partial(drawing.draw_area, x=x, y=y,
+                                       alpha=alpha))
+            self._areas.append((x, y, alpha))
+            self.update()
+
+    def export(self, file):
+        """
+        Saves the plot drawn by matplotlib at the size of the widget.
+
+        Parameters
+        ----------
+        file : str or file-like object
+            The output file, its extension selects the format, e.g. png or
+            svg
+        """
+
+        drawing.save_scene(self._scene, file, self.width(), self.height())
+
+    def set_overlay_text(self, string=""):
+        """
+        Shows text on top of the plot. If the string is empty, hides it.
+
+        Parameters
+        ----------
+        string : str
+            Defaults to ""
+        """
+
+        self.overlay_label.setText(string)
+        self.overlay_label.adjustSize()
+        self.overlay_label.setVisible(True if string else False)
+        self.overlay_label.raise_()
+
+    def _set_image(self, z):
+        # imported here, only images need a colormap
+        from matplotlib import cm
+
+        finite = z[np.isfinite(z)]
+        lo, hi = (finite.min(), finite.max()) if len(finite) else (0, 1)
+        with np.errstate(all='ignore'):
+            normalized = (z - lo) / ((hi - lo) or 1)
+        # row 0 of the image is the top, the largest y
+        self._pixels = np.ascontiguousarray(
+            cm.viridis(normalized, bytes=True)[::-1])
+        height, width = self._pixels.shape[:2]
+        self._image = QImage(self._pixels.data, width, height,
+                             self._pixels.strides[0], QImage.Format_RGBA8888)
+
+    def _plot_rect(self):
+        left, top, right, bottom = self.MARGINS
+        return QRectF(left, top, max(self.width() - left - right, 1),
+                      max(self.height() - top - bottom, 1))
+
+    def _to_pixels(self, x, y, points, rect):
+        """
+        Writes the pixel coordinates of data points into points, an (n, 2)
+        array, e.g. the view returned by new_polygon().
+        """
+
+        (x0, x1), (y0, y1) = self._x_limits, self._y_limits
+        sx = rect.width() / ((x1 - x0) or 1)
+        sy = rect.height() / ((y1 - y0) or 1)
+        px = points[:, 0]
+        py = points[:, 1]
+        np.subtract(x, x0, out=px)
+        np.multiply(px, sx, out=px)
+        np.add(px, rect.left(), out=px)
+        # y grows downwards on screen
+        np.subtract(y, y0, out=py)
+        np.multiply(py, -sy, out=py)
+        np.add(py, rect.bottom(), out=py)
+        np.clip(points, -_CLIP, _CLIP, out=points)
+
+    def _curve_runs(self, x, y, rect):
+        """
+        Yields the decimated finite runs of a curve
+        """
+
+        x0, x1 = self._x_limits
+        columns = max(int(rect.width()), 1)
+        for start, stop in finite_runs(y):
+            yield decimate(x[start:stop], y[start:stop], x0, x1, columns)
+
+    def _get_polylines(self, rect):
+        if self._polylines is None:
+            self._polylines = []
+            for x, y, color in self._curves:
+                for run_x, run_y in self._curve_runs(x, y, rect):
+                    polygon, points = new_polygon(len(run_x))
+                    self._to_pixels(run_x, run_y, points, rect)
+                    self._polylines.append((color, polygon))
+        return self._polylines
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._polylines = None
+
+    def paintEvent(self, event):
+        with instrumentation.stage('view.paint') as stage:
+            painter = QPainter(self)
+            painter.fillRect(self.rect(), Qt.white)
+            rect = self._plot_rect()
+
+            if self._image is not None:
+                painter.drawImage(rect, self._image)
+
+            painter.setClipRect(rect)
+            painter.setRenderHint(QPainter.Antialiasing)
+            self._paint_areas(painter, rect)
+            polylines = self._get_polylines(rect)
+            for color, polygon in polylines:
+                painter.setPen(QPen(_color(color), 1.5))
+                painter.drawPolyline(polygon)
+            self._paint_markers(painter, rect)
+            painter.setClipping(False)
+            painter.setRenderHint(QPainter.Antialiasing, False)
+
+            self._paint_axes(painter, rect)
+            painter.end()
+            stage.count = sum(polygon.size() for color, polygon in polylines)
+
+    def _paint_areas(self, painter, rect):
+        painter.setPen(Qt.NoPen)
+        for x, y, alpha in self._areas:
+            painter.setBrush(QBrush(_color(COLORS[0], alpha)))
+            for run_x, run_y in self._curve_runs(x, y, rect):
+                # the run closed along the x axis
+                polygon, points = new_polygon(len(run_x) + 2)
+                self._to_pixels(np.concatenate(([run_x[0]], run_x,
+                                                [run_x[-1]])),
+                                np.concatenate(([0.0], run_y, [0.0])),
+                                points, rect)
+                painter.drawPolygon(polygon)
+
+    def _paint_markers(self, painter, rect):
+        radius = 3.5
+        painter.setPen(Qt.NoPen)
+        for x, y, marker, color in self._markers:
+            painter.setBrush(QBrush(_color(color)))
+            points = np.empty((len(x), 2))
+            self._to_pixels(x, y, points, rect)
+            for px, py in points.tolist():
+                if marker == 's':
+                    painter.drawRect(QRectF(px - radius, py - radius,
+                                            2 * radius, 2 * radius))
+                elif marker == 'D':
+                    painter.drawPolygon(QPolygonF([
+                        QPointF(px, py - radius), QPointF(px + radius, py),
+                        QPointF(px, py + radius), QPointF(px - radius, py)]))
+                else:
+                    painter.drawEllipse(QPointF(px, py), radius, radius)
+
+    def _paint_axes(self, painter, rect):
+        painter.setPen(QPen(Qt.black, 1))
+        painter.setBrush(Qt.NoBrush)
+        painter.drawRect(rect)
+
+        (x0, x1), (y0, y1) = self._x_limits, self._y_limits
+        x_ticks = nice_ticks(min(x0, x1), max(x0, x1),
+                             max(int(rect.width() // 80), 2))
+        y_ticks = nice_ticks(min(y0, y1), max(y0, y1),
+                             max(int(rect.height() // 50), 2))
+        points = np.empty((max(len(x_ticks), len(y_ticks)), 2))
+
+        self._to_pixels(x_ticks, np.full(len(x_ticks), y0),
+                        points[:len(x_ticks)], rect)
+        for tick, (px, py) in zip(x_ticks, points.tolist()):
+            painter.drawLine(QPointF(px, rect.bottom()),
+                             QPointF(px, rect.bottom() + 4))
+            painter.drawText(QRectF(px - 40, rect.bottom() + 6, 80, 16),
+                             Qt.AlignHCenter | Qt.AlignTop, f"{tick:g}")
+
+        self._to_pixels(np.full(len(y_ticks), x0), y_ticks,
+                        points[:len(y_ticks)], rect)
+        for tick, (px, py) in zip(y_ticks, points.tolist()):
+            painter.drawLine(QPointF(rect.left() - 4, py),
+                             QPointF(rect.left(), py))
+            painter.drawText(QRectF(rect.left() - 60, py - 8, 54, 16),
+                             Qt.AlignRight | Qt.AlignVCenter, f"{tick:g}")
+
+        x_label, y_label = self._labels
+        painter.drawText(QRectF(rect.left(), rect.bottom() + 22,
+                                rect.width(), 16), Qt.AlignCenter, x_label)
+        painter.save()
+        painter.translate(12, rect.center().y())
+        painter.rotate(-90)
+        painter.drawText(QRectF(-rect.height() / 2, -8, rect.height(), 16),
+                         Qt.AlignCenter, y_label)
+        painter.restore()
@@ -0,0 +1,105 @@
+## The render worker rasterizes plots off the GUI thread. It owns an offscreen
+## matplotlib figure on the Agg canvas that is only ever touched from its own
+## thread, draws a scene (a list of drawing calls, see the drawing module) on
+## it and hands back the finished RGBA pixels, which the GUI thread only has
+## to blit. Nothing in this module imports Qt.
+##
+## Scenes submitted while another one is waiting supersede it, so a burst of
+## updates, e.g. a plot followed by its markers or a window being resized,
+## only rasterizes the last one.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from . import drawing
+
+
+class RenderWorker(object):
+    """
+    Represents a background thread rendering scenes to RGBA buffers.
+    """
+
+    def __init__(self, dpi=100):
+        """
+        Parameters
+        ----------
+        dpi : int
+            The resolution of the figure. Defaults to 100.
+        """
+
+        self.dpi = dpi
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._lock = threading.Lock()
+        self._generation = 0
+        # created in the worker thread on the first render
+        self._figure = None
+        self._axes = None
+
+    def submit(self, scene, width, height, callback=None):
+        """
+        Queues a scene for rendering, superseding any scene still waiting.
+
+        Parameters
+        ----------
+        scene : list(callable)
+            The drawing calls, each called with the matplotlib Axes in order
+        width : int
+            The width of the image in pixels
+        height : int
+            The height of the image in pixels
+        callback : (int, numpy.ndarray) -> None
+            If provided, called from the worker thread with the generation
+            and the pixels of the image, unless a newer scene was submitted
+            in the meantime
+
+        Returns
+        -------
+        generation : int
+            Increases with every submitted scene
+        future : concurrent.futures.Future
+            Resolves to the (height, width, 4) uint8 RGBA pixels, or None if
+            the scene was superseded before it was rendered
+        """
+
+        with self._lock:
+            self._generation += 1
+            generation = self._generation
+        future = self._executor.submit(self._render, generation, list(scene),
+                                       width, height, callback)
+        return generation, future
+
+    def _render(self, generation, scene, width, height, callback):
+        if generation != self._generation:
+            return None
+
+        if self._figure is None:
+            from matplotlib.figure import Figure
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+            self._figure = Figure(dpi=self.dpi)
+            FigureCanvasAgg(self._figure)
+            self._axes = self._figure.add_subplot(1, 1, 1)
+
+        self._figure.set_size_inches(max(width, 1) / self.dpi,
+                                     max(height, 1) / self.dpi)
+        self._axes.cla()
+        drawing.set_labels(self._axes)
+        for draw in scene:
+            draw(self._axes)
+        self._figure.canvas.draw()
+        # the canvas reuses its buffer for the next render
+        pixels = np.array(self._figure.canvas.buffer_rgba())
+
+        if callback is not None and generation == self._generation:
+            callback(generation, pixels)
+        return pixels
+
+    def close(self):
+        """
+        Stops the worker thread after the scene being rendered, if any.
+        """
+
+        with self._lock:
+            # supersede every waiting scene
+            self._generation += 1
+        self._executor.shutdown(wait=False)
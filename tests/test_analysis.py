@@ -0,0 +1,98 @@
+import pytest
+import numpy as np
+from plotter.services.analysis import *
+from plotter.services.parser import Parser
+
+
+@pytest.fixture
+def parser():
+    return Parser()
+
+
+@pytest.fixture
+def analyzer():
+    return Analyzer()
+
+
+@pytest.mark.unit
+class TestFindRoots(object):
+    def test_quadratic(self, parser, analyzer):
+        tree = parser.parse("x^2 - 2")
+        x = np.linspace(-5, 5, 1000)
+        roots = analyzer.find_roots(tree, x)
+        assert np.allclose(roots, [-np.sqrt(2), np.sqrt(2)], rtol=0,
+                           atol=1e-12)
+
+    def test_cubic(self, parser, analyzer):
+        tree = parser.parse("x^3 - 2*x - 5")
+        roots = analyzer.find_roots(tree, np.linspace(-5, 5, 1000))
+        assert len(roots) == 1
+        assert abs(roots[0] ** 3 - 2 * roots[0] - 5) < 1e-10
+
+    def test_many_roots(self, analyzer):
+        # product of (x - k) for k = 1..9, one bracket per root
+        tree = Parser().parse("*".join(f"(x-{k})" for k in range(1, 10)))
+        roots = analyzer.find_roots(tree, np.linspace(0.5, 9.5, 2000))
+        assert np.allclose(roots, np.arange(1, 10), rtol=0, atol=1e-9)
+
+    def test_exact_grid_root(self, parser, analyzer):
+        tree = parser.parse("x - 1")
+        roots = analyzer.find_roots(tree, np.linspace(0, 2, 11))
+        assert list(roots) == [1.0]
+
+    def test_pole_is_not_a_root(self, parser, analyzer):
+        tree = parser.parse("1/(x-1.005)")
+        assert analyzer.find_roots(tree, np.linspace(0, 2, 100)).size == 0
+
+    def test_given_values(self, parser, analyzer):
+        tree = parser.parse("x - 0.25")
+        x = np.linspace(0, 1, 10)
+        roots = analyzer.find_roots(tree, x, x - 0.25)
+        assert np.allclose(roots, [0.25])
+
+    def test_params(self, analyzer):
+        tree = Parser().parse("x - a", params=('a',))
+        roots = analyzer.find_roots(tree, np.linspace(0, 1, 10),
+                                    params={'a': 0.3})
+        assert np.allclose(roots, [0.3])
+
+    def test_no_roots(self, parser, analyzer):
+        tree = parser.parse("x^2 + 1")
+        assert analyzer.find_roots(tree, np.linspace(-1, 1, 50)).size == 0
+
+
+@pytest.mark.unit
+class TestFindExtrema(object):
+    def test_cubic(self, parser, analyzer):
+        tree = parser.parse("x^3 - 2*x")
+        x, y, is_max = analyzer.find_extrema(tree, np.linspace(-2, 2, 100))
+        expected = np.sqrt(2 / 3)
+        assert np.allclose(x, [-expected, expected], atol=1e-6)
+        assert list(is_max) == [True, False]
+        assert np.allclose(y, x ** 3 - 2 * x)
+
+    def test_monotonic(self, parser, analyzer):
+        tree = parser.parse("2*x + 1")
+        x, y, is_max = analyzer.find_extrema(tree, np.linspace(-2, 2, 100))
+        assert x.size == y.size == is_max.size == 0
+
+    def test_pole_is_not_an_extremum(self, parser, analyzer):
+        tree = parser.parse("1/(x-1.005)^2")
+        x, y, is_max = analyzer.find_extrema(tree, np.linspace(0, 2, 100))
+        assert x.size == 0
+
+
+@pytest.mark.unit
+class TestFindIntersections(object):
+    def test_line_and_parabola(self, parser, analyzer):
+        a = parser.parse("x^2")
+        b = parser.parse("x + 2")
+        x, y = analyzer.find_intersections(a, b, np.linspace(-5, 5, 1000))
+        assert np.allclose(x, [-1, 2])
+        assert np.allclose(y, [1, 4])
+
+    def test_parallel(self, parser, analyzer):
+        a = parser.parse("x")
+        b = parser.parse("x + 1")
+        x, y = analyzer.find_intersections(a, b, np.linspace(-5, 5, 100))
+        assert x.size == 0
@@ -0,0 +1,203 @@
+import time
+import pytest
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from plotter.services import backends
+from plotter.services.backends import *
+from plotter.services.plotter import Plotter
+from plotter.services.parser import Parser
+from plotter.models.expression import *
+
+
+EXPRESSIONS = ["x", "-x", "5", "x^2", "3*x^3 - 2*x^2 + x/(x^2 + 1) - 7",
+               "2^x - (x - 1)^3"]
+
+
+@pytest.mark.unit
+class TestBackends(object):
+    @pytest.mark.parametrize("name", ['tree', 'compiled', 'threaded',
+                                      'fused'])
+    @pytest.mark.parametrize("string", EXPRESSIONS)
+    def test_matches_tree(self, name, string):
+        tree = Parser().parse(string)
+        x = np.linspace(-3, 3, 1001)
+        y = get_backend(name).evaluate(tree, x)
+        assert y.shape == x.shape
+        assert np.allclose(y, np.broadcast_to(tree.evaluate(x), x.shape))
+
+    @pytest.mark.parametrize("name", ['tree', 'compiled', 'threaded',
+                                      'fused'])
+    def test_writable_result(self, name):
+        tree = Parser().parse("x")
+        x = np.linspace(0, 1, 10)
+        y = get_backend(name).evaluate(tree, x)
+        y[0] = 5
+        assert x[0] == 0
+
+    @pytest.mark.parametrize("name", ['compiled', 'threaded', 'fused'])
+    def test_float32(self, name):
+        tree = Parser().parse("3*x^2 + 1")
+        x = np.linspace(0, 1, 100, dtype=np.float32)
+        assert get_backend(name).evaluate(tree, x).dtype == np.float32
+
+    def test_sharded(self):
+        backend = ShardedBackend(workers=4)
+        tree = Parser().parse("x^3 - x")
+        x = np.linspace(-1, 1, 1001)
+        assert np.allclose(backend.evaluate(tree, x), x ** 3 - x)
+
+    def test_sharded_one_executor(self, monkeypatch):
+        created = []
+
+        class SlowExecutor(ThreadPoolExecutor):
+            def __init__(self, *args, **kwargs):
+                created.append(self)
+                time.sleep(0.01)
+                super().__init__(*args, **kwargs)
+
+        monkeypatch.setattr(backends, 'ThreadPoolExecutor', SlowExecutor)
+        backend = ShardedBackend(workers=2)
+        tree = Parser().parse("x + 1")
+        x = np.linspace(0, 1, 100)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: backend.evaluate(tree, x), range(4)))
+        assert len(created) == 1
+        created[0].shutdown()
+
+    def test_fused_blocks(self):
+        # a partial last block and intermediates in several slots
+        backend = FusedBackend(block_size=64)
+        tree = Parser().parse("(x + 1)*(x - 2)/(x^2 + 1) - -x")
+        x = np.linspace(-3, 3, 1000)
+        expected = (x + 1) * (x - 2) / (x ** 2 + 1) + x
+        assert np.allclose(backend.evaluate(tree, x), expected)
+
+    def test_fused_shape(self):
+        tree = Parser().parse("2*x + 1")
+        x = np.linspace(0, 1, 12).reshape(3, 4)
+        assert np.allclose(FusedBackend().evaluate(tree, x), 2 * x + 1)
+
+    def test_fused_folds_constants(self):
+        program = FusedProgram(Parser().parse("x*(2^3 - 1)"))
+        assert len(program.instructions) == 1
+
+    @pytest.mark.parametrize("string", ["x + 1/0", "x*10^400",
+                                        "x + (0 - 1)^0.5"])
+    def test_constant_semantics(self, string):
+        # constants folded with numpy semantics, not Python float ones
+        tree = Parser().parse(string)
+        x = np.linspace(-1, 1, 5)
+        with np.errstate(all='ignore'):
+            expected = tree.evaluate(x)
+        for name in ['tree', 'compiled', 'threaded', 'fused']:
+            y = get_backend(name).evaluate(tree, x)
+            assert y.dtype == np.float64
+            assert np.array_equal(y, expected, equal_nan=True)
+
+    def test_compiled_cache(self):
+        backend = CompiledBackend()
+        tree = Parser().parse("x^2 + 1")
+        assert backend.compile(tree) is backend.compile(Parser().parse(
+            "x^2 + 1"))
+
+    def test_compiled_cache_threads(self):
+        # concurrent lookups and evictions of a full cache
+        backend = CompiledBackend()
+        backend.MAX_COMPILED = 4
+        trees = [Parser().parse(f"x + {i}") for i in range(32)]
+        x = np.linspace(0, 1, 10)
+
+        def evaluate(i):
+            tree = trees[i % len(trees)]
+            return np.allclose(backend.evaluate(tree, x), x + i % len(trees))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            assert all(executor.map(evaluate, range(2000)))
+        assert len(backend._compiled) <= 4
+
+    def test_compile_errors(self):
+        with pytest.raises(EvaluationError):
+            compile_tree(ExprTNode(AddOperator()))
+        with pytest.raises(EvaluationError):
+            compile_tree(Parser().parse("a*x", params=['a']))
+        with pytest.raises(EvaluationError):
+            FusedProgram(Parser().parse("a*x", params=['a']))
+
+    def test_unknown(self):
+        with pytest.raises(BackendError):
+            get_backend('gpu')
+        with pytest.raises(BackendError):
+            Plotter(backend='gpu')
+
+    def test_count_nodes(self):
+        assert count_nodes(Parser().parse("x")) == 1
+        assert count_nodes(Parser().parse("x^2 + 1")) == 5
+
+
+@pytest.mark.unit
+class TestBackendSelector(object):
+    def test_calibrate(self):
+        selector = BackendSelector()
+        table = selector.calibrate(repeat=1)
+        assert set(table) == {(size, shape) for size in selector.SIZES
+                              for shape in selector.SHAPES}
+        assert set(table.values()) <= set(available_backends())
+
+    def test_calibrates_large_grids(self):
+        assert max(BackendSelector.SIZES) >= 1 << 20
+
+    def test_calibrates_once(self):
+        class CountingSelector(BackendSelector):
+            SIZES = (1 << 6,)
+            calls = 0
+
+            def calibrate(self, repeat=3):
+                CountingSelector.calls += 1
+                return super().calibrate(repeat=1)
+
+        selector = CountingSelector()
+        tree = Parser().parse("x^2")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda _: selector.select(tree, 100),
+                              range(8)))
+        assert CountingSelector.calls == 1
+
+    def test_select(self):
+        selector = BackendSelector()
+        selector.table = {(size, shape): 'tree' for size in selector.SIZES
+                          for shape in selector.SHAPES}
+        selector.table[selector.SIZES[-1], 'large'] = 'compiled'
+        small = Parser().parse("x^2")
+        large = Parser().parse("3*x^3 - 2*x^2 + x/(x^2 + 1) - 7")
+
+        assert selector.select(small, 10 ** 7).name == 'tree'
+        assert selector.select(large, 10 ** 7).name == 'compiled'
+        assert selector.select(large, 10).name == 'tree'
+
+    def test_register(self):
+        class DoublingBackend(TreeWalkBackend):
+            name = 'doubling'
+
+            def evaluate(self, tree, x):
+                return 2 * super().evaluate(tree, x)
+
+        register_backend(DoublingBackend())
+        try:
+            assert 'doubling' in available_backends()
+            x, y = Plotter(backend='doubling').plot(Parser().parse("x"),
+                                                     0, 1, 10)
+            assert np.allclose(y, 2 * x)
+        finally:
+            from plotter.services import backends
+            del backends._BACKENDS['doubling']
+            default_selector().table = None
+
+
+@pytest.mark.unit
+class TestPlotterBackend(object):
+    def test_force_per_call(self):
+        plotter = Plotter(backend='tree')
+        tree = Parser().parse("x^2 - 1")
+        x, y_tree = plotter.plot(tree, -1, 1, 100)
+        x, y_compiled = plotter.plot(tree, -1, 1, 100, backend='compiled')
+        assert np.allclose(y_tree, y_compiled)
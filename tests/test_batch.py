@@ -0,0 +1,78 @@
+import io
+import pytest
+import numpy as np
+from plotter.batch import *
+
+
+@pytest.mark.unit
+class TestReadJobs(object):
+    def test_empty(self):
+        assert read_jobs(io.StringIO("")) == []
+
+    def test_jobs(self):
+        stream = io.StringIO("x^2, -1, 1\n\n# comment\n2*x+1,0,10\n")
+        expected = [PlotJob(0, "x^2", -1.0, 1.0),
+                    PlotJob(1, "2*x+1", 0.0, 10.0)]
+        assert read_jobs(stream) == expected
+
+    def test_missing_range(self):
+        with pytest.raises(BatchError):
+            read_jobs(io.StringIO("x^2, 1\n"))
+
+    def test_range_not_a_number(self):
+        with pytest.raises(BatchError):
+            read_jobs(io.StringIO("x^2, a, 1\n"))
+
+
+@pytest.mark.unit
+class TestRunJobs(object):
+    def test_csv(self, tmp_path):
+        jobs = [PlotJob(0, "x^2", -1, 1)]
+        errors = run_jobs(jobs, str(tmp_path), fmt='csv', points=11, workers=1)
+        data = np.loadtxt(tmp_path / "plot_00000.csv", delimiter=',',
+                          skiprows=1)
+
+        assert errors == {}
+        assert data.shape == (11, 2)
+        assert np.allclose(data[:, 1], data[:, 0] ** 2)
+
+    def test_npy(self, tmp_path):
+        jobs = [PlotJob(0, "2*x", 0, 1), PlotJob(1, "x+1", 0, 1)]
+        errors = run_jobs(jobs, str(tmp_path), fmt='npy', points=5, workers=1)
+        data = np.load(tmp_path / "plot_00001.npy")
+
+        assert errors == {}
+        assert data.shape == (2, 5)
+        assert np.allclose(data[1], data[0] + 1)
+
+    def test_errors(self, tmp_path):
+        jobs = [PlotJob(0, "x^", 0, 1), PlotJob(1, "x", 1, 0),
+                PlotJob(2, "x", 0, 1)]
+        errors = run_jobs(jobs, str(tmp_path), fmt='npy', workers=1)
+
+        assert sorted(errors) == [0, 1]
+        assert errors[0].startswith("Unexpected operator")
+        assert (tmp_path / "plot_00002.npy").exists()
+
+    def test_unexpected_error(self, tmp_path, monkeypatch):
+        def plot(self, tree, *args, **kwargs):
+            if tree.evaluate(0.0) == 1.0:
+                raise ZeroDivisionError("division by zero")
+            return original(self, tree, *args, **kwargs)
+
+        original = Plotter.plot
+        monkeypatch.setattr(Plotter, 'plot', plot)
+        jobs = [PlotJob(0, "x+1", 0, 1), PlotJob(1, "x", 0, 1)]
+        errors = run_jobs(jobs, str(tmp_path), fmt='npy', workers=1)
+
+        assert errors == {0: "ZeroDivisionError: division by zero"}
+        assert (tmp_path / "plot_00001.npy").exists()
+
+    def test_parallel(self, tmp_path):
+        jobs = [PlotJob(i, f"x*{i}", 0, 1) for i in range(8)]
+        errors = run_jobs(jobs, str(tmp_path), fmt='npy', points=3, workers=2)
+
+        assert errors == {}
+        for i in range(8):
+            data = np.load(tmp_path / f"plot_{i:05d}.npy")
+            assert np.allclose(data[1], data[0] * i)
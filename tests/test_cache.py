@@ -0,0 +1,121 @@
+import os
+import pytest
+import numpy as np
+from plotter.services.cache import *
+from plotter.services.plotter import Plotter
+from plotter.services.parser import Parser
+
+
+@pytest.mark.unit
+class TestPlotCache(object):
+    def test_key(self, tmp_path):
+        cache = PlotCache(str(tmp_path))
+        tree = Parser().parse("x^2")
+        key = cache.key(tree, 0, 1, 100)
+
+        assert key == cache.key(Parser().parse("x ^ 2"), 0, 1, 100)
+        assert key != cache.key(Parser().parse("x^3"), 0, 1, 100)
+        assert key != cache.key(tree, 0, 2, 100)
+        assert key != cache.key(tree, 0, 1, 101)
+        assert key != cache.key(tree, 0, 1, 100, dtype='float32')
+
+    def test_miss(self, tmp_path):
+        cache = PlotCache(str(tmp_path))
+        assert cache.get('0' * 64) == (None, None)
+
+    def test_put_get(self, tmp_path):
+        cache = PlotCache(str(tmp_path))
+        x = np.linspace(0, 1, 10)
+        cache.put('a', x, x ** 2)
+        cached_x, cached_y = cache.get('a')
+
+        assert (cached_x == x).all()
+        assert (cached_y == x ** 2).all()
+        assert not cached_y.flags.writeable
+
+    def test_eviction(self, tmp_path):
+        x = np.linspace(0, 1, 1000)
+        entry_size = 2 * x.nbytes + 128
+        cache = PlotCache(str(tmp_path), max_bytes=int(2.5 * entry_size))
+        for i, key in enumerate(['a', 'b', 'c']):
+            cache.put(key, x, x)
+            os.utime(tmp_path / f"{key}.npy", (i, i))
+        cache.evict()
+
+        assert cache.get('a') == (None, None)
+        assert cache.get('c')[0] is not None
+        assert cache.size() <= cache.max_bytes
+
+    def test_corrupt(self, tmp_path):
+        cache = PlotCache(str(tmp_path))
+        (tmp_path / 'a.npy').write_bytes(b'garbage')
+        assert cache.get('a') == (None, None)
+
+    def test_unwritable(self, tmp_path, caplog):
+        # a file where the directory should be, creating it fails
+        (tmp_path / 'file').write_bytes(b'')
+        cache = PlotCache(str(tmp_path / 'file' / 'cache'))
+        x = np.zeros(3)
+        cache.put('a', x, x)
+
+        assert cache.get('a') == (None, None)
+        assert cache.size() == 0
+        assert "plot cache" in caplog.text
+
+    def test_put_fails(self, tmp_path, monkeypatch, caplog):
+        def replace(src, dst):
+            raise OSError(28, "No space left on device")
+
+        cache = PlotCache(str(tmp_path))
+        monkeypatch.setattr(os, 'replace', replace)
+        x = np.zeros(3)
+        cache.put('a', x, x)
+
+        assert cache.get('a') == (None, None)
+        assert os.listdir(tmp_path) == []
+        assert "No space left" in caplog.text
+
+    def test_clear(self, tmp_path):
+        cache = PlotCache(str(tmp_path))
+        x = np.zeros(3)
+        cache.put('a', x, x)
+        cache.clear()
+        assert cache.size() == 0
+
+
+@pytest.mark.unit
+class TestPlotterCache(object):
+    def test_hit(self, tmp_path):
+        tree = Parser().parse("x^2 + 1")
+        x, y = Plotter(PlotCache(str(tmp_path))).plot(tree, -1, 1, 50)
+
+        # a new plotter, e.g. after a restart
+        cached_x, cached_y = Plotter(PlotCache(str(tmp_path))).plot(
+            tree, -1, 1, 50)
+        assert isinstance(cached_y, np.memmap)
+        assert (cached_x == x).all()
+        assert (cached_y == y).all()
+
+    def test_unwritable(self, tmp_path):
+        (tmp_path / 'file').write_bytes(b'')
+        plotter = Plotter(PlotCache(str(tmp_path / 'file' / 'cache')))
+        x, y = plotter.plot(Parser().parse("x^2"), -1, 1, 5)
+        assert np.allclose(y, x ** 2)
+
+    def test_stats_hit(self, tmp_path):
+        tree = Parser().parse("1/(x-0.5)")
+        x, y, stats = Plotter(PlotCache(str(tmp_path))).plot_with_stats(
+            tree, -1, 1, 1000, split_poles=True)
+
+        # shared with plot() and the statistics cached next to it
+        plotter = Plotter(PlotCache(str(tmp_path)))
+        cached_x, cached_y = plotter.plot(tree, -1, 1, 1000,
+                                          split_poles=True)
+        assert isinstance(cached_y, np.memmap)
+        cached_x, cached_y, cached_stats = plotter.plot_with_stats(
+            tree, -1, 1, 1000, split_poles=True)
+        assert isinstance(cached_y, np.memmap)
+        assert np.array_equal(cached_y, y, equal_nan=True)
+        assert cached_stats.nan_count == stats.nan_count == 0
+        assert cached_stats.min == stats.min
+        assert cached_stats.simpson == stats.simpson
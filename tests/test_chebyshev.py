@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+from plotter.services.chebyshev import *
+from plotter.services.parser import Parser
+
+
+def parse(string):
+    return Parser().parse(string)
+
+
+@pytest.mark.unit
+class TestValuesToCoefficients(object):
+    def test_matches_numpy(self):
+        x = chebyshev_points(-1, 1, 9)
+        values = 3 * x ** 4 - x + 2
+        coefficients = values_to_coefficients(values)
+        expected = np.polynomial.chebyshev.poly2cheb([2, -1, 0, 0, 3])
+        assert np.allclose(coefficients[:5], expected)
+        assert np.allclose(coefficients[5:], 0)
+
+    def test_points(self):
+        x = chebyshev_points(2, 4, 5)
+        assert x[0] == 4 and x[-1] == 2
+        assert np.isclose(x[2], 3)
+
+
+@pytest.mark.unit
+class TestChebyshevProxy(object):
+    def test_polynomial_is_exact(self):
+        proxy = ChebyshevProxy.fit(parse("x^3 - 2*x + 1"), -2, 2)
+        assert proxy.degree == 3
+        x = np.linspace(-2, 2, 101)
+        assert np.allclose(proxy.evaluate(x), x ** 3 - 2 * x + 1,
+                           rtol=0, atol=1e-13)
+
+    def test_machine_precision(self):
+        tree = parse("1/(x^2 + 0.01)")
+        proxy = ChebyshevProxy.fit(tree, -1, 1)
+        x = np.linspace(-1, 1, 10001)
+        error = np.abs(proxy.evaluate(x) - tree.evaluate(x)).max()
+        assert error <= 1e-12 * np.abs(tree.evaluate(x)).max()
+
+    def test_not_smooth(self):
+        assert ChebyshevProxy.fit(parse("1/(x-0.3)"), -1, 1) is None
+        assert ChebyshevProxy.fit(parse("x^0.5"), -1, 1) is None
+        assert ChebyshevProxy.fit(parse("(x^2)^0.5"), -1, 1,
+                                  max_degree=1024) is None
+
+    def test_outside_domain_uses_tree(self):
+        tree = parse("2^x")
+        proxy = ChebyshevProxy.fit(tree, 0, 1)
+        x = np.array([-1.0, 0.5, 3.0])
+        assert np.allclose(proxy.evaluate(x), 2 ** x)
+        assert np.isclose(proxy.evaluate(3.0), 8)
+
+    def test_scalar(self):
+        proxy = ChebyshevProxy.fit(parse("x^2"), -1, 1)
+        assert isinstance(proxy.evaluate(0.5), float)
+        assert np.isclose(proxy.evaluate(0.5), 0.25)
+
+    def test_constant(self):
+        proxy = ChebyshevProxy.fit(parse("0"), -1, 1)
+        assert proxy.degree == 0
+        assert (proxy.evaluate(np.linspace(-1, 1, 5)) == 0).all()
+
+    def test_derivative(self):
+        proxy = ChebyshevProxy.fit(parse("2^x"), 0, 2)
+        x = np.linspace(0, 2, 50)
+        assert np.allclose(proxy.derivative().evaluate(x),
+                           np.log(2) * 2 ** x)
+        assert np.isnan(proxy.derivative().evaluate(np.array([3.0]))).all()
+
+    def test_integrals(self):
+        proxy = ChebyshevProxy.fit(parse("x^2"), 0, 3)
+        assert np.isclose(proxy.integrate(), 9)
+        assert np.isclose(proxy.integrate(1, 2), 7 / 3)
+        x = np.linspace(0, 3, 20)
+        assert np.allclose(proxy.antiderivative().evaluate(x), x ** 3 / 3)
+
+    def test_roots(self):
+        proxy = ChebyshevProxy.fit(parse("x^3 - 2*x"), -1, 2)
+        assert np.allclose(proxy.roots(), [0, np.sqrt(2)])
+
+    def test_roots_high_degree(self):
+        proxy = ChebyshevProxy.fit(parse("(x-0.5)/(x^2 + 0.0001)"), -1, 1)
+        assert proxy.degree > ChebyshevProxy.MAX_EIGEN_DEGREE
+        assert np.allclose(proxy.roots(), [0.5])
+
+    def test_plot(self):
+        from plotter.services.plotter import Plotter
+        plotter = Plotter()
+        tree = parse("x^3 - x")
+        proxy = plotter.build_proxy(tree, -1, 1)
+        assert isinstance(proxy, ChebyshevProxy)
+        x, y = plotter.plot(proxy, -1, 1, 200, split_poles=True)
+        assert np.allclose(y, x ** 3 - x)
+
+    def test_build_proxy_falls_back(self):
+        from plotter.services.plotter import Plotter
+        tree = parse("1/x")
+        assert Plotter().build_proxy(tree, -1, 1) is tree
@@ -0,0 +1,99 @@
+import pytest
+import numpy as np
+from plotter.models.derivative import *
+from plotter.models.expression import *
+from plotter.services.parser import Parser
+
+
+def parse(string, params=()):
+    return Parser().parse(string, params=params)
+
+
+def count_nodes(tree):
+    if tree is None:
+        return 0
+    return 1 + count_nodes(tree.left) + count_nodes(tree.right)
+
+
+@pytest.mark.unit
+class TestDifferentiate(object):
+    @pytest.mark.parametrize("string,expected", [
+        ("x^3", lambda x: 3 * x ** 2),
+        ("3*x^2 + 2*x + 1", lambda x: 6 * x + 2),
+        ("1/x", lambda x: -1 / x ** 2),
+        ("x*x - x", lambda x: 2 * x - 1),
+        ("(x+1)/(x-1)", lambda x: -2 / (x - 1) ** 2),
+        ("x^0.5", lambda x: 0.5 / np.sqrt(x)),
+        ("-x", lambda x: -np.ones_like(x)),
+        ("2^x", lambda x: np.log(2) * 2 ** x),
+        ("(x^2 + 1)^3", lambda x: 6 * x * (x ** 2 + 1) ** 2),
+        ("2^(x^2)", lambda x: 2 * x * np.log(2) * 2 ** (x ** 2)),
+    ])
+    def test_matches_analytic(self, string, expected):
+        x = np.linspace(0.5, 2, 20)
+        d = parse(string).derivative()
+        assert np.allclose(d.evaluate(x), expected(x))
+
+    def test_matches_finite_differences(self):
+        tree = parse("x^3 / (x^2 + 1) - 4*x")
+        x = np.linspace(-3, 3, 50)
+        h = 1e-6
+        numeric = (tree.evaluate(x + h) - tree.evaluate(x - h)) / (2 * h)
+        assert np.allclose(tree.derivative().evaluate(x), numeric, atol=1e-6)
+
+    def test_constant(self):
+        d = parse("5").derivative()
+        assert d == ExprTNode(Operand(value=0.0))
+
+    def test_simplified(self):
+        assert parse("x").derivative() == ExprTNode(Operand(value=1.0))
+        assert parse("3*x").derivative() == ExprTNode(Operand(value=3.0))
+        assert parse("x^2").derivative() == parse("2*x")
+        assert parse("x^3 + 2").derivative() == parse("3*x^2")
+
+    def test_size(self):
+        tree = parse("3*x^4 - 2*x^3 + x^2 - 7*x + 1")
+        assert count_nodes(tree.derivative()) <= count_nodes(tree)
+
+    def test_parameters_are_constants(self):
+        tree = parse("a*x^2", params=['a'])
+        d = tree.derivative()
+        x = np.linspace(-1, 1, 5)
+        assert np.allclose(d.evaluate(x, {'a': 3.0}), 6 * x)
+
+    def test_by_parameter(self):
+        tree = parse("a*x^2 - a", params=['a'])
+        d = tree.derivative('a')
+        x = np.linspace(-1, 1, 5)
+        assert np.allclose(d.evaluate(x, {'a': 3.0}), x ** 2 - 1)
+
+    def test_variable_base_and_exponent(self):
+        with pytest.raises(DifferentiationError):
+            parse("x^x").derivative()
+
+    def test_non_numeric_base(self):
+        with pytest.raises(DifferentiationError):
+            parse("a^x", params=['a']).derivative()
+        with pytest.raises(DifferentiationError):
+            parse("(0-2)^x").derivative()
+
+    def test_incorrect_structure(self):
+        with pytest.raises(DifferentiationError):
+            ExprTNode(AddOperator(), ExprTNode(Operand(is_x=True))).derivative()
+
+    def test_does_not_modify_tree(self):
+        tree = parse("x^2 + 3*x")
+        copy = parse("x^2 + 3*x")
+        tree.derivative()
+        assert tree == copy
+
+
+@pytest.mark.unit
+class TestSimplify(object):
+    def test_folds_constants(self):
+        assert simplify(parse("2*3 + 4")) == ExprTNode(Operand(value=10.0))
+        assert simplify(parse("x*(2^3)")) == parse("8*x")
+
+    def test_keeps_division_by_zero(self):
+        tree = parse("1/0")
+        assert simplify(tree) == tree
@@ -0,0 +1,67 @@
+import pytest
+import numpy as np
+from plotter.services.discontinuity import *
+from plotter.services.plotter import Plotter
+from plotter.services.parser import Parser
+
+
+@pytest.mark.unit
+class TestFindJumps(object):
+    def test_pole(self):
+        x = np.linspace(0, 2, 100)
+        y = 1 / (x - 1.005)
+        indices = find_jumps(y)
+        assert list(indices) == [np.searchsorted(x, 1.005) - 1]
+
+    def test_continuous_crossing(self):
+        x = np.linspace(-1, 1, 101)
+        assert find_jumps(1000 * x).size == 0
+        assert find_jumps(x ** 3).size == 0
+
+    def test_short(self):
+        assert find_jumps(np.array([1.0])).size == 0
+
+
+@pytest.mark.unit
+class TestSplitDiscontinuities(object):
+    def test_no_breaks(self):
+        x = np.linspace(0, 1, 10)
+        new_x, new_y = split_discontinuities(x, x ** 2)
+        assert (new_x == x).all()
+        assert (new_y == x ** 2).all()
+
+    def test_analytic_pole(self):
+        x = np.linspace(0, 2, 100)
+        d = x - 1.005
+        new_x, new_y = split_discontinuities(x, 1 / d, [d])
+
+        assert len(new_x) == 101
+        i = np.flatnonzero(np.isnan(new_y))
+        assert len(i) == 1
+        assert new_x[i[0]] == pytest.approx(1.005)
+
+    def test_not_a_zero(self):
+        # 1/(1/x) == x, the inner 1/x changes sign through its pole
+        x = np.linspace(-1, 1, 100)
+        d = 1 / x
+        new_x, new_y = split_discontinuities(x, 1 / d, [d])
+        assert len(new_x) == 100
+
+    def test_infinite(self):
+        x = np.array([0.0, 1.0, 2.0])
+        y = np.array([1.0, np.inf, 1.0])
+        new_x, new_y = split_discontinuities(x, y)
+        assert np.isnan(new_y[1])
+
+
+@pytest.mark.unit
+class TestPlotSplitPoles(object):
+    def test_plot(self):
+        tree = Parser().parse("1/(x-1)")
+        with np.errstate(divide='ignore'):
+            x, y = Plotter().plot(tree, 0, 2.1, 100, split_poles=True)
+
+        i = np.flatnonzero(np.isnan(y))
+        assert len(i) == 1
+        assert x[i[0]] == pytest.approx(1.0)
+        assert (np.diff(x) > 0).all()
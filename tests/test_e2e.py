@@ -131,3 +131,105 @@ def test_invalid_range_and_unexpected_operator(qtbot):
     assert range_error_label.isVisible()
     assert range_error_label.text().startswith("X Max must be greater")
     assert not plot_widget.axes.lines   # check if there's no plot
+
+@pytest.mark.e2e
+def test_plot_render_thread(qtbot):
+    # create the MVP components with the background renderer
+    services, views, presenter = create_mvp(renderer='threaded')
+    main_widget = views['main_widget']
+    main_widget.show()
+    qtbot.addWidget(main_widget)
+
+    func_input = main_widget.func_widget.func_input
+    plot_button = main_widget.func_widget.plot_button
+    plot_widget = main_widget.plot_widget
+
+    func_input.setText("x^2")
+    qtbot.mouseClick(plot_button, QtCore.Qt.LeftButton)
+
+    # the image of the last scene arrives from the render thread
+    qtbot.waitUntil(lambda: plot_widget._shown_generation ==
+                    plot_widget.worker._generation)
+    assert not main_widget.syntax_error_label.isVisible()
+    assert len(plot_widget._scene) == 1
+    assert plot_widget._image is not None
+
+@pytest.mark.e2e
+def test_plot_native(qtbot, tmp_path):
+    # create the MVP components with the QPainter renderer
+    services, views, presenter = create_mvp(renderer='native')
+    main_widget = views['main_widget']
+    main_widget.show()
+    qtbot.addWidget(main_widget)
+
+    func_input = main_widget.func_widget.func_input
+    plot_button = main_widget.func_widget.plot_button
+    plot_widget = main_widget.plot_widget
+
+    func_input.setText("1/x")
+    qtbot.mouseClick(plot_button, QtCore.Qt.LeftButton)
+    plot_widget.repaint()
+
+    assert not main_widget.syntax_error_label.isVisible()
+    # one polyline on each side of the pole
+    assert len(plot_widget._polylines) == 2
+
+    # exports are drawn by matplotlib
+    main_widget.export_plot(str(tmp_path / "plot.png"))
+    assert (tmp_path / "plot.png").exists()
+
+@pytest.mark.e2e
+def test_mark_points_draws_once(qtbot, monkeypatch):
+    # create the MVP components
+    services, views, presenter = create_mvp()
+    main_widget = views['main_widget']
+    main_widget.show()
+    qtbot.addWidget(main_widget)
+
+    plot_widget = main_widget.plot_widget
+    draws = []
+    monkeypatch.setattr(plot_widget, 'draw', lambda: draws.append(1))
+
+    main_widget.func_widget.func_input.setText("x^2 - 1; x; 2 - x")
+    main_widget.func_widget.points_check_box.setChecked(True)
+    qtbot.mouseClick(main_widget.func_widget.plot_button,
+                     QtCore.Qt.LeftButton)
+
+    # the plot, then every set of markers at once
+    assert len(draws) == 2
+    assert len(plot_widget.axes.lines) == 9
+
+@pytest.mark.e2e
+def test_sweep(qtbot):
+    # create the MVP components
+    services, views, presenter = create_mvp()
+    main_widget = views['main_widget']
+    main_widget.show()
+    qtbot.addWidget(main_widget)
+
+    func_input = main_widget.func_widget.func_input
+    plot_button = main_widget.func_widget.plot_button
+    sweep_widget = main_widget.sweep_widget
+    plot_widget = main_widget.plot_widget
+
+    # a family of curves, one per value of a
+    func_input.setText("a*x^2")
+    sweep_widget.name_input.setText("a")
+    sweep_widget.to_input.setText("2")
+    qtbot.mouseClick(plot_button, QtCore.Qt.LeftButton)
+
+    assert not main_widget.syntax_error_label.isVisible()
+    assert not main_widget.range_error_label.isVisible()
+    assert len(plot_widget.axes.collections) == 1
+    assert len(plot_widget.axes.collections[0].get_segments()) == \
+        presenter.sweep_curves
+
+    # the same sweep as a heatmap
+    sweep_widget.heatmap_check_box.setChecked(True)
+    qtbot.mouseClick(plot_button, QtCore.Qt.LeftButton)
+    assert plot_widget.axes.get_ylabel() == "a"
+
+    # the parameter is only known while it's swept
+    sweep_widget.name_input.setText("")
+    qtbot.mouseClick(plot_button, QtCore.Qt.LeftButton)
+    assert main_widget.syntax_error_label.text().startswith("Unknown symbol")
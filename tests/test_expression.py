@@ -180,4 +180,42 @@ class TestExprTreeEvaluate(object):
 
         assert (tree.evaluate(x=2.0) == (np.array([1, 2, 3]) - 2.0)).all()
         assert (tree.evaluate(x=-2.0) == (np.array([1, 2, 3]) - (-2.0))).all()
-        assert (tree.evaluate(x=100.0) == (np.array([1, 2, 3]) - (100.0))).all()
\ No newline at end of file
+        assert (tree.evaluate(x=100.0) == (np.array([1, 2, 3]) - (100.0))).all()
+
+
+@pytest.mark.unit
+class TestParameterOperand(object):
+    def test_equality(self):
+        assert Operand(name='a') == Operand(name='a')
+        assert Operand(name='a') != Operand(name='b')
+        assert Operand(name='a') != Operand(name='a', is_neg=True)
+        assert Operand(name='a') != Operand(is_x=True)
+        assert Operand(value=1.0) != Operand(name='a')
+
+    def test_str(self):
+        assert str(Operand(name='a', is_neg=True)) == '-a'
+
+    def test_evaluate(self):
+        tree = ExprTNode(MulOperator(),
+                left=ExprTNode(Operand(name='a')),
+                right=ExprTNode(Operand(is_x=True)))
+
+        assert tree.evaluate(x=2.0, params={'a': 3.0}) == 6.0
+
+    def test_evaluate_neg(self):
+        operand = Operand(name='a', is_neg=True)
+        assert operand.evaluate(params={'a': 3.0}) == -3.0
+
+    def test_broadcast(self):
+        tree = ExprTNode(AddOperator(),
+                left=ExprTNode(Operand(name='a')),
+                right=ExprTNode(Operand(is_x=True)))
+        x = np.array([[0.0, 1.0, 2.0]])
+        a = np.array([[10.0], [20.0]])
+
+        result = tree.evaluate(x, params={'a': a})
+        assert (result == np.array([[10, 11, 12], [20, 21, 22]])).all()
+
+    def test_missing(self):
+        with pytest.raises(EvaluationError):
+            Operand(name='a').evaluate(x=1.0)
@@ -0,0 +1,82 @@
+import pytest
+import numpy as np
+from plotter.views.geometry import *
+
+
+@pytest.mark.unit
+class TestFiniteRuns(object):
+    def test_all_finite(self):
+        assert finite_runs(np.arange(5.0)) == [(0, 5)]
+
+    def test_gaps(self):
+        y = np.array([np.nan, 1, 2, np.inf, np.nan, 3, 4, 5, np.nan, 6])
+        assert finite_runs(y) == [(1, 3), (5, 8), (9, 10)]
+
+    def test_none(self):
+        assert finite_runs(np.full(3, np.nan)) == []
+
+
+@pytest.mark.unit
+class TestDecimate(object):
+    def test_few_points(self):
+        x = np.linspace(0, 1, 10)
+        dx, dy = decimate(x, x, 0, 1, 100)
+        assert dx is x and dy is x
+
+    def test_size(self):
+        x = np.linspace(0, 1, 100000)
+        dx, dy = decimate(x, np.sin(50 * x), 0, 1, 200)
+        assert len(dx) == len(dy) == 4 * 200
+        assert np.all(np.diff(dx) >= 0)
+
+    def test_keeps_extremes(self):
+        # a spike inside one column must survive decimation
+        x = np.linspace(0, 1, 10001)
+        y = np.zeros_like(x)
+        y[5003] = 7
+        y[1234] = -3
+        dx, dy = decimate(x, y, 0, 1, 100)
+        assert dy.max() == 7
+        assert dy.min() == -3
+        # the ends are kept
+        assert (dx[0], dx[-1]) == (0, 1)
+
+    def test_column_ranges(self):
+        # points away from the column edges
+        x = (np.arange(4000) + 0.5) / 4000
+        y = np.sin(40 * x)
+        dx, dy = decimate(x, y, 0, 1, 50)
+        # every column's minimum and maximum are kept
+        columns = y.reshape(50, 80)
+        assert np.allclose(dy[1::4], columns.min(axis=1))
+        assert np.allclose(dy[2::4], columns.max(axis=1))
+
+
+@pytest.mark.unit
+class TestNiceTicks(object):
+    def test_round_steps(self):
+        assert np.allclose(nice_ticks(0, 10, 5), [0, 2, 4, 6, 8, 10])
+        assert np.allclose(nice_ticks(-1, 1, 4), [-1, -0.5, 0, 0.5, 1])
+
+    def test_inside(self):
+        ticks = nice_ticks(0.13, 0.87, 6)
+        assert ticks[0] >= 0.13 and ticks[-1] <= 0.87
+        assert len(ticks) >= 3
+
+    def test_invalid(self):
+        assert len(nice_ticks(1, 1)) == 0
+        assert len(nice_ticks(0, np.inf)) == 0
+
+
+@pytest.mark.unit
+class TestDataLimits(object):
+    def test_limits(self):
+        lo, hi = data_limits([np.array([0.0, np.nan, 1.0]),
+                              np.array([-1.0, np.inf])], margin=0.5)
+        assert (lo, hi) == (-2.0, 2.0)
+
+    def test_constant(self):
+        assert data_limits([np.full(3, 2.0)], margin=0.5) == (1.0, 3.0)
+
+    def test_empty(self):
+        assert data_limits([np.full(3, np.nan)]) == (-1.0, 1.0)
@@ -0,0 +1,55 @@
+import sys
+import subprocess
+import pytest
+from plotter.util import ImportProfiler
+
+
+def loaded_modules(module):
+    """
+    Imports a module in a fresh interpreter and returns every loaded module
+    """
+
+    code = f"import sys, {module}; print(' '.join(sys.modules))"
+    output = subprocess.check_output([sys.executable, '-c', code])
+    return output.decode().split()
+
+
+@pytest.mark.unit
+class TestLazyImports(object):
+    def test_parser_is_light(self):
+        modules = loaded_modules('plotter.services.parser')
+        assert 'numpy' not in modules
+        assert 'matplotlib' not in modules
+        assert 'PySide2' not in modules
+
+    def test_plotter_has_no_gui(self):
+        modules = loaded_modules('plotter.services.plotter')
+        assert 'matplotlib' not in modules
+        assert 'PySide2' not in modules
+
+
+@pytest.mark.unit
+class TestImportProfiler(object):
+    def test_records_new_modules(self):
+        sys.modules.pop('plotter.batch', None)
+        profiler = ImportProfiler()
+        profiler.start()
+        try:
+            import plotter.batch
+        finally:
+            profiler.stop()
+
+        names = [name for depth, name, elapsed in profiler.records]
+        assert 'plotter.batch' in names
+        assert profiler.report(min_time=0).splitlines()[-1].endswith("total")
+
+    def test_ignores_loaded_modules(self):
+        import plotter.util
+        profiler = ImportProfiler()
+        profiler.start()
+        try:
+            import plotter.util
+        finally:
+            profiler.stop()
+
+        assert profiler.records == []
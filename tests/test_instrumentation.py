@@ -0,0 +1,130 @@
+import threading
+import pytest
+import numpy as np
+from plotter.instrumentation import *
+from plotter.instrumentation import instrumentation as global_instrumentation
+from plotter.services.parser import Parser
+from plotter.services.plotter import Plotter
+
+
+@pytest.mark.unit
+class TestInstrumentation(object):
+    def test_disabled(self):
+        instr = Instrumentation()
+        with instr.stage('a', count=3):
+            pass
+        assert instr.get_records() == []
+
+    def test_stage(self):
+        instr = Instrumentation()
+        instr.enable()
+        with instr.stage('a') as stage:
+            stage.count = 3
+
+        records = instr.get_records()
+        assert len(records) == 1
+        assert records[0].name == 'a'
+        assert records[0].count == 3
+        assert records[0].wall_time >= 0
+        assert records[0].allocated is None
+
+    def test_nested(self):
+        instr = Instrumentation()
+        instr.enable()
+        with instr.stage('outer'):
+            with instr.stage('inner'):
+                pass
+
+        depths = {r.name: r.depth for r in instr.get_records()}
+        assert depths == {'outer': 0, 'inner': 1}
+        assert instr.format_records().splitlines()[0].startswith('outer')
+
+    def test_threads(self):
+        # stages entered and exited interleaved by two threads
+        instr = Instrumentation()
+        instr.enable()
+        barrier = threading.Barrier(2)
+
+        def work(name):
+            with instr.stage(name):
+                barrier.wait()
+                with instr.stage(name + '.inner'):
+                    barrier.wait()
+                barrier.wait()
+
+        threads = [threading.Thread(target=work, args=(name,))
+                   for name in ('a', 'b')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        depths = {r.name: r.depth for r in instr.get_records()}
+        assert depths == {'a': 0, 'a.inner': 1, 'b': 0, 'b.inner': 1}
+
+    def test_timed(self):
+        instr = Instrumentation()
+
+        @instr.timed('f', count=len)
+        def f(n):
+            return [0] * n
+
+        f(2)
+        instr.enable()
+        f(5)
+
+        records = instr.get_records('f')
+        assert len(records) == 1
+        assert records[0].count == 5
+
+    def test_ring_buffer(self):
+        instr = Instrumentation(capacity=2)
+        instr.enable()
+        for name in ['a', 'b', 'c']:
+            with instr.stage(name):
+                pass
+        assert [r.name for r in instr.get_records()] == ['b', 'c']
+
+    def test_allocations(self):
+        instr = Instrumentation()
+        instr.enable(track_allocations=True)
+        try:
+            with instr.stage('alloc'):
+                a = np.ones(100000)
+                del a
+        finally:
+            instr.disable()
+
+        assert instr.get_records()[0].allocated >= 100000 * 8
+
+    def test_summary(self):
+        instr = Instrumentation()
+        instr.enable()
+        for _ in range(3):
+            with instr.stage('a'):
+                pass
+
+        summary = instr.summary()
+        assert summary['a']['calls'] == 3
+        assert summary['a']['max'] <= summary['a']['total']
+
+
+@pytest.mark.unit
+class TestPipelineStages(object):
+    def test_parse_and_plot(self):
+        global_instrumentation.clear()
+        global_instrumentation.enable()
+        try:
+            tree = Parser().parse("x^2 + 1")
+            Plotter().plot(tree, 0, 1, x_tick_frequency=10)
+        finally:
+            global_instrumentation.disable()
+
+        names = [r.name for r in global_instrumentation.get_records()]
+        for name in ['parser.parse', 'parser.split_str', 'parser.tokenize',
+                     'parser.tokens_to_infix', 'parser.infix_to_postfix',
+                     'parser.postfix_to_expr_tree', 'plotter.plot',
+                     'plotter.evaluate']:
+            assert name in names
+        assert global_instrumentation.get_records('plotter.plot')[0].count == 10
+        global_instrumentation.clear()
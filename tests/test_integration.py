@@ -0,0 +1,85 @@
+import pytest
+import numpy as np
+from plotter.services.integration import *
+from plotter.services.parser import Parser
+
+
+def parse(string, params=()):
+    return Parser().parse(string, params=params)
+
+
+class CountingTree(object):
+    """
+    Wraps a tree and counts the evaluate() calls
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.calls = 0
+
+    def evaluate(self, x=0.0, params=None):
+        self.calls += 1
+        return self.tree.evaluate(x, params)
+
+
+@pytest.mark.unit
+class TestIntegrator(object):
+    @pytest.mark.parametrize("string,a,b,expected", [
+        ("x^2", 0, 3, 9),
+        ("3*x^5 - x + 1", -1, 2, 33),
+        ("2^x", 0, 1, 1 / np.log(2)),
+        ("1/(x^2 + 0.0001)", -1, 1, 200 * np.arctan(100)),
+        ("x^0.5", 0, 1, 2 / 3),
+        ("(x^2)^0.5", -1, 2, 2.5),
+    ])
+    def test_values(self, string, a, b, expected):
+        value, error = Integrator().integrate(parse(string), a, b)
+        assert abs(value - expected) <= max(1e-9, 1e-9 * abs(expected))
+        assert error <= 1e-9 * max(1, abs(expected))
+
+    def test_error_estimate_is_honest(self):
+        integrator = Integrator(abs_tol=1e-4, rel_tol=0)
+        value, error = integrator.integrate(parse("x^0.5"), 0, 1)
+        assert abs(value - 2 / 3) <= error <= 1e-4
+
+    def test_reversed_limits(self):
+        value, error = Integrator().integrate(parse("x^2"), 3, 0)
+        assert np.isclose(value, -9)
+
+    def test_empty_range(self):
+        assert Integrator().integrate(parse("x"), 1, 1) == (0.0, 0.0)
+
+    def test_constant(self):
+        value, error = Integrator().integrate(parse("4"), -1, 1)
+        assert np.isclose(value, 8)
+
+    def test_params(self):
+        tree = parse("a*x", params=['a'])
+        value, error = Integrator().integrate(tree, 0, 1, {'a': 4.0})
+        assert np.isclose(value, 2)
+
+    def test_pole_is_not_finite(self):
+        value, error = Integrator().integrate(parse("1/(x-0.5)^2"), 0, 1)
+        assert not np.isfinite(value) or error > 1
+
+    def test_infinite_node_is_refined(self):
+        # the middle node hits the singularity, which is integrable
+        value, error = Integrator().integrate(parse("1/(x^2)^0.25"), -1, 1)
+        assert np.isclose(value, 4, atol=1e-6)
+
+    def test_not_finite_is_not_converged(self):
+        value, error = Integrator(max_rounds=1).integrate(parse("1/x^2"),
+                                                          -1, 1)
+        assert not np.isfinite(value)
+        assert error == np.inf
+
+    def test_infinite_limits(self):
+        with pytest.raises(IntegrationError):
+            Integrator().integrate(parse("x"), 0, np.inf)
+
+    def test_one_evaluation_per_round(self):
+        tree = CountingTree(parse("1/(x^2 + 0.0001)"))
+        integrator = Integrator()
+        integrator.integrate(tree, -1, 1)
+        assert tree.calls <= integrator.max_rounds
+        assert tree.calls < 20
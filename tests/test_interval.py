@@ -0,0 +1,72 @@
+import pytest
+import numpy as np
+from plotter.services.interval import *
+from plotter.util import EvaluationError
+from plotter.services.parser import Parser
+
+
+def encloses(string, x_lo, x_hi, samples=50, params=None):
+    tree = Parser().parse(string, params=params or ())
+    lo, hi = evaluate_interval(tree, x_lo, x_hi, params)
+    rng = np.random.default_rng(0)
+    for _ in range(samples):
+        x = x_lo + (x_hi - x_lo) * rng.uniform(0, 1, len(x_lo))
+        with np.errstate(all='ignore'):
+            y = np.broadcast_to(tree.evaluate(x, params), x.shape)
+        # undefined points don't need to be enclosed
+        if not (np.isnan(y) | ((lo <= y) & (y <= hi))).all():
+            return False
+    return True
+
+
+@pytest.mark.unit
+class TestEvaluateInterval(object):
+    @pytest.mark.parametrize("string", [
+        "x", "-x", "3", "x^2", "x^3 - 2*x", "1/(x-1)", "(x+1)/(x^2+1)",
+        "x^-2", "x^0.5", "2^x", "x*x - x", "(x - 0.1)^-3", "x^x",
+    ])
+    def test_encloses(self, string):
+        rng = np.random.default_rng(1)
+        x_lo = rng.uniform(-3, 3, 500)
+        x_hi = x_lo + rng.uniform(0, 1, 500)
+        assert encloses(string, x_lo, x_hi)
+
+    def test_point_intervals(self):
+        x = np.linspace(-2, 2, 50)
+        tree = Parser().parse("x^3 - x/3")
+        lo, hi = evaluate_interval(tree, x, x)
+        y = tree.evaluate(x)
+        assert ((lo <= y) & (y <= hi)).all()
+        # outward rounding only widens by a few ulps
+        assert np.allclose(lo, y) and np.allclose(hi, y)
+
+    def test_exact_bounds(self):
+        tree = Parser().parse("x^2")
+        lo, hi = evaluate_interval(tree, np.array([-1.0, 2.0]),
+                                   np.array([2.0, 3.0]))
+        assert np.allclose(lo, [0, 4]) and np.allclose(hi, [4, 9])
+
+    def test_division_by_zero_is_unbounded(self):
+        tree = Parser().parse("1/x")
+        lo, hi = evaluate_interval(tree, np.array([-1.0, 1.0]),
+                                   np.array([1.0, 2.0]))
+        assert lo[0] == -np.inf and hi[0] == np.inf
+        assert np.isclose(lo[1], 0.5) and np.isclose(hi[1], 1)
+
+    def test_undefined(self):
+        tree = Parser().parse("x^0.5")
+        lo, hi = evaluate_interval(tree, np.array([-2.0, -1.0]),
+                                   np.array([-1.0, 4.0]))
+        assert np.isnan(lo[0]) and np.isnan(hi[0])
+        assert lo[1] <= 0 and np.isclose(hi[1], 2)
+
+    def test_params(self):
+        x_lo = np.linspace(-2, 1, 10)
+        assert encloses("a*x^2 - b", x_lo, x_lo + 0.5,
+                        params={'a': -2.0, 'b': 0.5})
+
+    def test_incorrect_structure(self):
+        from plotter.models.expression import ExprTNode, AddOperator
+        with pytest.raises(EvaluationError):
+            evaluate_interval(ExprTNode(AddOperator()), np.zeros(1),
+                              np.ones(1))
@@ -0,0 +1,33 @@
+import pytest
+import numpy as np
+
+pytest.importorskip('PySide2')
+from PySide2.QtGui import QPolygonF
+from plotter.views import painterwidget
+from plotter.views.painterwidget import new_polygon
+
+
+@pytest.mark.unit
+class TestNewPolygon(object):
+    def test_writes_points(self):
+        polygon, points = new_polygon(3)
+        points[:, 0] = [0, 1, 2]
+        points[:, 1] = [5, 6, 7]
+
+        assert polygon.size() == 3
+        assert (polygon.at(1).x(), polygon.at(1).y()) == (1, 6)
+        assert (polygon.at(2).x(), polygon.at(2).y()) == (2, 7)
+
+    def test_empty(self):
+        polygon, points = new_polygon(0)
+        assert polygon.size() == 0
+        assert points.shape == (0, 2)
+
+    def test_no_address(self, monkeypatch):
+        class NullPolygon(QPolygonF):
+            def data(self):
+                return None
+
+        monkeypatch.setattr(painterwidget, 'QPolygonF', NullPolygon)
+        with pytest.raises(RuntimeError):
+            new_polygon(3)
@@ -647,3 +647,28 @@ class TestParse(object):
                     right=ExprTNode(Operand(value=2.0)))
 
         assert parser.parse(string) == expected
+
+
+@pytest.mark.unit
+class TestParseParameters(object):
+    def test_unknown_by_default(self):
+        parser = Parser()
+        with pytest.raises(ParserError):
+            parser.parse("a*x")
+
+    def test_params(self):
+        parser = Parser()
+        tree = parser.parse("a*x^2 + -b", params=['a', 'b'])
+        expected = ExprTNode(AddOperator(),
+                    left=ExprTNode(MulOperator(),
+                        left=ExprTNode(Operand(name='a')),
+                        right=ExprTNode(PowOperator(),
+                            left=ExprTNode(Operand(is_x=True)),
+                            right=ExprTNode(Operand(value=2.0)))),
+                    right=ExprTNode(Operand(name='b', is_neg=True)))
+        assert tree == expected
+
+    def test_unknown_param(self):
+        parser = Parser()
+        with pytest.raises(ParserError):
+            parser.parse("a*x + c", params=['a', 'b'])
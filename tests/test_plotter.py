@@ -2,6 +2,7 @@ import pytest
 import numpy as np
 from plotter.services.plotter import *
 from plotter.models.expression import *
+from plotter.services.parser import Parser
 
 
 @pytest.mark.unit
@@ -33,3 +34,410 @@ class TestPlot(object):
 
         with pytest.raises(XRangeError):
             plotter.plot(tree, x_min, x_max, x_tick_frequency=freq)
+
+
+@pytest.mark.unit
+class TestPlotMany(object):
+    def test_shared_grid(self):
+        plotter = Plotter()
+        x_squared = ExprTNode(PowOperator(),
+                              left=ExprTNode(Operand(is_x=True)),
+                              right=ExprTNode(Operand(value=2)))
+        trees = [x_squared,
+                 ExprTNode(MulOperator(),
+                           left=ExprTNode(Operand(value=2)),
+                           right=ExprTNode(PowOperator(),
+                               left=ExprTNode(Operand(is_x=True)),
+                               right=ExprTNode(Operand(value=2)))),
+                 ExprTNode(Operand(value=3))]
+
+        x, y = plotter.plot_many(trees, -1, 1, x_tick_frequency=11)
+
+        assert y.shape == (3, 11)
+        assert (x == np.linspace(-1, 1, 11)).all()
+        assert np.allclose(y[0], x ** 2)
+        assert np.allclose(y[1], 2 * x ** 2)
+        assert (y[2] == 3).all()
+
+    def test_invalid_range(self):
+        plotter = Plotter()
+        with pytest.raises(XRangeError):
+            plotter.plot_many([ExprTNode(Operand(is_x=True))], 1, -1)
+
+    def test_incorrect_tree(self):
+        plotter = Plotter()
+        tree = ExprTNode(AddOperator(), left=ExprTNode(Operand(value=4.0)))
+        with pytest.raises(EvaluationError):
+            plotter.plot_many([tree], -1, 1)
+
+
+@pytest.mark.unit
+class TestSweep(object):
+    def tree(self):
+        # a*x^2 + b
+        return ExprTNode(AddOperator(),
+                    left=ExprTNode(MulOperator(),
+                        left=ExprTNode(Operand(name='a')),
+                        right=ExprTNode(PowOperator(),
+                            left=ExprTNode(Operand(is_x=True)),
+                            right=ExprTNode(Operand(value=2.0)))),
+                    right=ExprTNode(Operand(name='b')))
+
+    def test_family(self):
+        plotter = Plotter()
+        a = [1, 2, 3]
+        b = [0, 1, 2]
+        x, y = plotter.sweep(self.tree(), -1, 1, {'a': a, 'b': b},
+                             x_tick_frequency=5)
+
+        assert y.shape == (3, 5)
+        for i in range(3):
+            assert np.allclose(y[i], a[i] * x ** 2 + b[i])
+
+    def test_unused_param(self):
+        plotter = Plotter()
+        tree = ExprTNode(Operand(is_x=True))
+        x, y = plotter.sweep(tree, 0, 1, {'a': [1, 2]}, x_tick_frequency=3)
+        assert (y == np.vstack([x, x])).all()
+
+    def test_different_lengths(self):
+        plotter = Plotter()
+        with pytest.raises(ParameterError):
+            plotter.sweep(self.tree(), -1, 1, {'a': [1, 2], 'b': [1]})
+
+    def test_missing_param(self):
+        plotter = Plotter()
+        with pytest.raises(EvaluationError):
+            plotter.sweep(self.tree(), -1, 1, {'a': [1, 2]})
+
+
+@pytest.mark.unit
+class TestPlot2D(object):
+    def tree(self):
+        # x^2 + y
+        return ExprTNode(AddOperator(),
+                    left=ExprTNode(PowOperator(),
+                        left=ExprTNode(Operand(is_x=True)),
+                        right=ExprTNode(Operand(value=2.0))),
+                    right=ExprTNode(Operand(name='y')))
+
+    def test_grid(self):
+        plotter = Plotter()
+        x, y, z = plotter.plot_2d(self.tree(), -1, 1, 0, 2, nx=7, ny=5,
+                                  tile_shape=(2, 3))
+
+        assert z.shape == (5, 7)
+        assert np.allclose(z, x[np.newaxis, :] ** 2 + y[:, np.newaxis])
+
+    def test_threads(self):
+        plotter = Plotter()
+        x, y, z = plotter.plot_2d(self.tree(), -1, 1, 0, 2, nx=50, ny=40,
+                                  tile_shape=(8, 16), workers=4)
+        assert np.allclose(z, x[np.newaxis, :] ** 2 + y[:, np.newaxis])
+
+    def test_constant(self):
+        plotter = Plotter()
+        tree = ExprTNode(Operand(value=3.0))
+        x, y, z = plotter.plot_2d(tree, 0, 1, 0, 1, nx=4, ny=3)
+        assert (z == 3).all()
+
+    def test_invalid_y_range(self):
+        plotter = Plotter()
+        with pytest.raises(XRangeError):
+            plotter.plot_2d(self.tree(), 0, 1, 1, 0)
+
+
+@pytest.mark.unit
+class TestLinspaceChunk(object):
+    @pytest.mark.parametrize("x_min, x_max, n", [
+        (-1, 1, 1000), (0.1, 0.7, 7), (-3.3, 1e6, 12345), (2, 5, 1),
+    ])
+    def test_same_as_linspace(self, x_min, x_max, n):
+        expected = np.linspace(x_min, x_max, n)
+        chunks = [linspace_chunk(x_min, x_max, n, start, min(start + 100, n))
+                  for start in range(0, n, 100)]
+        assert (np.concatenate(chunks) == expected).all()
+
+
+@pytest.mark.unit
+class TestPlotToMemmap(object):
+    def tree(self):
+        return ExprTNode(PowOperator(),
+                         left=ExprTNode(Operand(is_x=True)),
+                         right=ExprTNode(Operand(value=2)))
+
+    def test_path(self, tmp_path):
+        plotter = Plotter()
+        path = str(tmp_path / "y.npy")
+        y = plotter.plot_to_memmap(self.tree(), -1, 1, 1001, path=path,
+                                   chunk_size=100)
+        del y
+
+        y = np.load(path, mmap_mode='r')
+        x = np.linspace(-1, 1, 1001)
+        assert not y.flags.writeable
+        assert np.allclose(y, x ** 2)
+
+    def test_out(self, tmp_path):
+        plotter = Plotter()
+        out = np.memmap(str(tmp_path / "y.bin"), dtype=np.float64,
+                        mode='w+', shape=(50,))
+        y = plotter.plot_to_memmap(self.tree(), 0, 1, 50, out=out,
+                                   chunk_size=7)
+        assert y is out
+        assert np.allclose(out, np.linspace(0, 1, 50) ** 2)
+
+    def test_no_output(self):
+        plotter = Plotter()
+        with pytest.raises(ValueError):
+            plotter.plot_to_memmap(self.tree(), 0, 1, 50)
+
+    def test_wrong_shape(self):
+        plotter = Plotter()
+        with pytest.raises(ValueError):
+            plotter.plot_to_memmap(self.tree(), 0, 1, 50, out=np.empty(10))
+
+
+@pytest.mark.unit
+class TestFloat32(object):
+    def test_float32(self):
+        plotter = Plotter()
+        tree = ExprTNode(MulOperator(),
+                         left=ExprTNode(Operand(value=3)),
+                         right=ExprTNode(Operand(is_x=True)))
+        x, y = plotter.plot(tree, -1, 1, 100, dtype='float32')
+
+        assert y.dtype == np.float32
+        assert np.allclose(y, 3 * np.linspace(-1, 1, 100), atol=1e-6)
+
+    def test_overflow_falls_back(self):
+        plotter = Plotter()
+        # x^40 overflows float32 for x > ~9
+        tree = ExprTNode(PowOperator(),
+                         left=ExprTNode(Operand(is_x=True)),
+                         right=ExprTNode(Operand(value=40.0)))
+        x, y = plotter.plot(tree, 0, 10, 100, dtype='float32')
+
+        assert y.dtype == np.float64
+        assert np.isfinite(y).all()
+
+    def test_cancellation_falls_back(self):
+        plotter = Plotter()
+        # (x + 10000) - 10000 loses most float32 digits of x
+        tree = ExprTNode(SubOperator(),
+                         left=ExprTNode(AddOperator(),
+                             left=ExprTNode(Operand(is_x=True)),
+                             right=ExprTNode(Operand(value=10000.0))),
+                         right=ExprTNode(Operand(value=10000.0)))
+        x, y = plotter.plot(tree, 0, 1, 100, dtype='float32')
+
+        assert y.dtype == np.float64
+        assert np.allclose(y, x)
+
+
+@pytest.mark.unit
+class TestBounds(object):
+    def test_encloses_values(self):
+        plotter = Plotter()
+        tree = Parser().parse("x^3 - 2*x")
+        y_min, y_max = plotter.bounds(tree, -2, 2)
+        y = tree.evaluate(np.linspace(-2, 2, 1000))
+        assert y_min <= y.min() and y.max() <= y_max
+        # and is reasonably tight
+        assert y_max - y_min < 1.1 * (y.max() - y.min())
+
+    def test_pole(self):
+        tree = Parser().parse("1/x")
+        assert Plotter().bounds(tree, -1, 1) == (-np.inf, np.inf)
+
+    def test_undefined(self):
+        tree = Parser().parse("x^0.5")
+        assert np.isnan(Plotter().bounds(tree, -2, -1)).all()
+
+
+@pytest.mark.unit
+class TestPlotAdaptive(object):
+    def test_matches_function(self):
+        tree = Parser().parse("x^3 - 2*x")
+        x, y = Plotter().plot_adaptive(tree, -2, 2, -5, 5)
+        assert (np.diff(x) >= 0).all()
+        assert x[0] == -2 and x[-1] == 2
+        assert np.allclose(y, x ** 3 - 2 * x)
+
+    def test_culls_off_screen(self):
+        # a narrow spike, only the area around it is off screen
+        tree = Parser().parse("1/(x^2 + 0.0001)")
+        x, y = Plotter().plot_adaptive(tree, -3, 3, 0, 10, width=1000)
+        visible = y[~np.isnan(y)]
+        assert len(x) < 1000
+        assert np.isnan(y).sum() == 1
+        assert visible.max() < 11
+
+    def test_flat_is_not_refined(self):
+        tree = Parser().parse("0.001*x + 1")
+        x, y = Plotter().plot_adaptive(tree, -1, 1, -3, 3, initial=64)
+        assert len(x) == 65
+        assert np.allclose(y, 0.001 * x + 1)
+
+    def test_steep_line_mostly_off_screen(self):
+        tree = Parser().parse("100*x")
+        x, y = Plotter().plot_adaptive(tree, -1, 1, -3, 3, width=1000)
+        assert len(x) < 100
+        assert np.allclose(y, 100 * x)
+
+    def test_breaks_at_poles(self):
+        tree = Parser().parse("1/(x-0.3)")
+        x, y = Plotter().plot_adaptive(tree, -1, 1, -10, 10)
+        assert np.isnan(y).sum() == 1
+        # no segment connects the two sides of the pole
+        left = (x[:-1] < 0.3) & (x[1:] > 0.3)
+        assert np.isnan(y[:-1][left] + y[1:][left]).all()
+
+    def test_entirely_off_screen(self):
+        tree = Parser().parse("x")
+        x, y = Plotter().plot_adaptive(tree, -1, 1, 10, 20)
+        assert x.shape == y.shape == (0,)
+
+    def test_undefined_everywhere(self):
+        tree = Parser().parse("(0 - 1 - x^2)^0.5")
+        x, y = Plotter().plot_adaptive(tree, -1, 1, -5, 5)
+        assert x.shape == y.shape == (0,)
+
+    def test_invalid_range(self):
+        tree = Parser().parse("x")
+        with pytest.raises(XRangeError):
+            Plotter().plot_adaptive(tree, 1, 0, 0, 1)
+        with pytest.raises(XRangeError):
+            Plotter().plot_adaptive(tree, 0, 1, 1, 0)
+
+
+@pytest.mark.unit
+class TestPlotWithStats(object):
+    def test_matches_plot(self):
+        plotter = Plotter()
+        tree = Parser().parse("x^3 - 2*x")
+        x, y, stats = plotter.plot_with_stats(tree, -2, 2, 1001, chunk_size=64)
+        expected_x, expected_y = plotter.plot(tree, -2, 2, 1001)
+
+        assert (x == expected_x).all() and (y == expected_y).all()
+        assert stats.count == 1001
+        assert stats.min == y.min() and stats.max == y.max()
+        assert np.isclose(stats.simpson, 0, atol=1e-12)
+
+    def test_split_poles(self):
+        plotter = Plotter()
+        tree = Parser().parse("1/(x-0.5)")
+        x, y, stats = plotter.plot_with_stats(tree, -1, 1, 1000,
+                                              split_poles=True, chunk_size=100)
+        expected_x, expected_y = plotter.plot(tree, -1, 1, 1000,
+                                              split_poles=True)
+
+        assert (x == expected_x).all()
+        assert np.array_equal(y, expected_y, equal_nan=True)
+        # statistics of the values before the break is inserted
+        assert stats.count == 1000 and stats.nan_count == 0
+
+    def test_float32(self):
+        tree = Parser().parse("3*x")
+        x, y, stats = Plotter().plot_with_stats(tree, 0, 1, 100,
+                                                dtype='float32')
+        assert y.dtype == np.float32
+        assert np.isclose(stats.max, 3)
+
+    def test_invalid_range(self):
+        with pytest.raises(XRangeError):
+            Plotter().plot_with_stats(Parser().parse("x"), 1, 0)
+
+
+@pytest.mark.unit
+class TestEvaluateAt(object):
+    def test_unsorted(self):
+        tree = Parser().parse("x^2 - 1")
+        x = np.array([3.0, -1.0, 0.5, np.nan, 100.0, 0.5])
+        y = Plotter().evaluate_at(tree, x)
+        assert np.allclose(y, x ** 2 - 1, equal_nan=True)
+
+    def test_chunks(self):
+        tree = Parser().parse("1/x")
+        x = np.random.default_rng(0).uniform(-5, 5, 1001)
+        y = Plotter().evaluate_at(tree, x, chunk_size=64)
+        assert np.allclose(y, 1 / x)
+
+    def test_buffers(self):
+        import array
+        tree = Parser().parse("2*x + 1")
+        values = [0.0, 1.5, -2.0]
+        expected = [1.0, 4.0, -3.0]
+        plotter = Plotter()
+
+        assert np.allclose(plotter.evaluate_at(tree, array.array('d', values)),
+                           expected)
+        assert np.allclose(plotter.evaluate_at(
+            tree, memoryview(array.array('f', values))), expected)
+        raw = np.array(values).tobytes()
+        assert np.allclose(plotter.evaluate_at(tree, raw), expected)
+        assert np.allclose(plotter.evaluate_at(
+            tree, np.array(values, dtype=np.float32).tobytes(),
+            dtype='float32'), expected)
+
+    def test_mmap(self, tmp_path):
+        import mmap
+        path = tmp_path / "x.bin"
+        np.linspace(0, 1, 1000).tofile(path)
+        tree = Parser().parse("x^3")
+        with open(path, 'rb') as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as x:
+                y = Plotter().evaluate_at(tree, x, chunk_size=100)
+        assert np.allclose(y, np.linspace(0, 1, 1000) ** 3)
+
+    def test_no_copy(self):
+        tree = Parser().parse("x + 1")
+        x = np.arange(10.0)
+        view = Plotter().evaluate_at(tree, x[::2])
+        assert np.allclose(view, x[::2] + 1)
+
+        # results are written into the caller's buffer
+        out = bytearray(5 * 8)
+        y = Plotter().evaluate_at(tree, x[:5], out=out)
+        assert np.shares_memory(y, np.frombuffer(out))
+        assert np.allclose(np.frombuffer(out), x[:5] + 1)
+
+    def test_dtypes(self):
+        tree = Parser().parse("x / 2")
+        plotter = Plotter()
+        assert plotter.evaluate_at(
+            tree, np.ones(4, dtype=np.float32)).dtype == np.float32
+        y = plotter.evaluate_at(tree, np.arange(4))
+        assert y.dtype == np.float64
+        assert np.allclose(y, [0, 0.5, 1, 1.5])
+
+    def test_constant(self):
+        out = np.zeros(5)
+        Plotter().evaluate_at(Parser().parse("3"), np.arange(5.0), out=out)
+        assert np.all(out == 3)
+
+    def test_2d(self):
+        x = np.arange(6.0).reshape(2, 3)
+        y = Plotter().evaluate_at(Parser().parse("x"), x)
+        assert y.shape == (6,)
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(Parser().parse("x"), x.T)
+
+    def test_bad_out(self):
+        tree = Parser().parse("x")
+        x = np.arange(4.0)
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(tree, x, out=np.empty(3))
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(tree, x, out=np.empty(4, dtype=int))
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(tree, x, out=bytes(32))
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(tree, memoryview(b"abcd").cast('B'),
+                                  dtype='S1')
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(tree, x, out=np.empty(4, dtype=np.float16))
+
+    def test_not_a_buffer(self):
+        with pytest.raises(ValueError):
+            Plotter().evaluate_at(Parser().parse("x"), [1.0, 2.0])
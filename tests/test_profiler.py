@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+from plotter.services.profiler import *
+from plotter.models.expression import *
+
+
+def x_pow_2_plus_1():
+    """
+       +
+    ^     1
+  x   2
+    """
+
+    return ExprTNode(AddOperator(),
+                     left=ExprTNode(PowOperator(),
+                         left=ExprTNode(Operand(is_x=True)),
+                         right=ExprTNode(Operand(value=2.0))),
+                     right=ExprTNode(Operand(value=1.0)))
+
+
+@pytest.mark.unit
+class TestProfile(object):
+    def test_result(self):
+        tree = x_pow_2_plus_1()
+        x = np.linspace(-1, 1, 100)
+        result, profile = Profiler().profile(tree, x)
+        assert (result == tree.evaluate(x)).all()
+
+    def test_structure(self):
+        x = np.linspace(-1, 1, 100)
+        result, profile = Profiler().profile(x_pow_2_plus_1(), x, repeat=3)
+
+        assert profile.label == 'AddOperator'
+        assert profile.left.label == 'PowOperator'
+        assert profile.left.left.label == 'x'
+        assert profile.right.label == '1.0'
+        assert profile.nbytes == x.nbytes
+        assert profile.total_time >= profile.left.total_time
+
+    def test_scalar(self):
+        result, profile = Profiler().profile(x_pow_2_plus_1(), 3.0)
+        assert result == 10.0
+        assert profile.nbytes == 0
+
+    def test_incorrect_tree(self):
+        tree = ExprTNode(AddOperator(), left=ExprTNode(Operand(value=4.0)))
+        with pytest.raises(EvaluationError):
+            Profiler().profile(tree)
+
+    def test_folded_stacks(self):
+        result, profile = Profiler().profile(x_pow_2_plus_1(), 1.0)
+        stacks = [line.rsplit(' ', 1)[0]
+                  for line in profile.to_folded_stacks().splitlines()]
+        assert stacks == ['AddOperator', 'AddOperator;PowOperator',
+                          'AddOperator;PowOperator;x',
+                          'AddOperator;PowOperator;2.0', 'AddOperator;1.0']
+
+    def test_format_tree(self):
+        result, profile = Profiler().profile(x_pow_2_plus_1(), 1.0)
+        lines = profile.format_tree().splitlines()
+        assert len(lines) == 5
+        assert lines[1].startswith('  PowOperator')
+        assert profile.hottest() is not None
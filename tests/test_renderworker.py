@@ -0,0 +1,96 @@
+import threading
+import pytest
+import numpy as np
+from functools import partial
+from plotter.views import drawing
+from plotter.views.renderworker import RenderWorker
+
+
+def agg_axes():
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    return fig.add_subplot(1, 1, 1)
+
+
+@pytest.mark.unit
+class TestDrawing(object):
+    def test_plot(self):
+        axes = agg_axes()
+        x = np.linspace(-1, 2, 50)
+        drawing.draw_plot(axes, x, x ** 2, y_limits=(0, 4))
+        assert axes.get_xlim() == (-1, 2)
+        assert axes.get_ylim() == (0, 4)
+        assert len(axes.lines) == 1
+
+    def test_overlays_keep_plot(self):
+        axes = agg_axes()
+        x = np.linspace(-1, 1, 50)
+        drawing.draw_plot(axes, x, x)
+        drawing.draw_markers(axes, np.array([0.0]), np.array([0.0]))
+        drawing.draw_area(axes, x, x)
+        assert len(axes.lines) == 2
+        assert len(axes.collections) == 1
+
+    def test_replace(self):
+        axes = agg_axes()
+        x = np.linspace(-1, 1, 50)
+        drawing.draw_plot(axes, x, x)
+        drawing.draw_plots(axes, x, np.vstack((x, 2 * x)))
+        assert not axes.lines
+        assert len(axes.collections) == 1
+
+
+@pytest.mark.unit
+class TestRenderWorker(object):
+    def test_render(self):
+        worker = RenderWorker()
+        x = np.linspace(-1, 1, 100)
+        generation, future = worker.submit(
+            [partial(drawing.draw_plot, x=x, y=x ** 2)], 200, 150)
+        pixels = future.result()
+        worker.close()
+
+        assert pixels.shape == (150, 200, 4)
+        assert pixels.dtype == np.uint8
+        # not a blank image
+        assert (pixels[:, :, :3] < 128).any()
+
+    def test_off_thread(self):
+        worker = RenderWorker()
+        threads = []
+
+        def draw(axes):
+            threads.append(threading.current_thread())
+
+        worker.submit([draw], 50, 50)[1].result()
+        worker.close()
+        assert threads[0] is not threading.current_thread()
+
+    def test_superseded(self):
+        worker = RenderWorker()
+        started = threading.Event()
+        release = threading.Event()
+
+        def block(axes):
+            started.set()
+            release.wait(5)
+
+        calls = []
+        first = worker.submit([block], 50, 50)[1]
+        started.wait(5)
+        # both queued while the first scene renders, only the last is drawn
+        second = worker.submit([], 50, 50, lambda *args: calls.append(args))[1]
+        generation, third = worker.submit(
+            [], 60, 40, lambda *args: calls.append(args))
+        release.set()
+
+        assert second.result() is None
+        assert third.result().shape == (40, 60, 4)
+        assert [c[0] for c in calls] == [generation]
+        # the first scene was superseded while it rendered, it has no
+        # callback either way but still returns its pixels
+        assert first.result() is not None
+        worker.close()
@@ -0,0 +1,87 @@
+import copy
+import pickle
+import pytest
+import numpy as np
+from plotter.models.serialization import *
+from plotter.models.expression import *
+from plotter.services.parser import Parser
+
+
+@pytest.mark.unit
+class TestRoundTrip(object):
+    @pytest.mark.parametrize("string", [
+        "x", "-x", "4.5", "x^2", "-x^2 + 3*x - 1/(x+2)",
+        "(-(x-1))^3 / -(2.25 - x)", "a*x^2 + -b*x + a",
+    ])
+    def test_parsed(self, string):
+        tree = Parser().parse(string, params=['a', 'b'])
+        assert ExprTNode.from_bytes(tree.to_bytes()) == tree
+
+    def test_evaluates_the_same(self):
+        tree = Parser().parse("3*x^3 - x/(x^2+1)")
+        decoded = ExprTNode.from_bytes(tree.to_bytes())
+        x = np.linspace(-2, 2, 50)
+        assert (decoded.evaluate(x) == tree.evaluate(x)).all()
+
+    def test_deep_tree(self):
+        tree = ExprTNode(Operand(is_x=True))
+        for i in range(5000):
+            tree = ExprTNode(AddOperator(), left=tree,
+                             right=ExprTNode(Operand(value=1.0)))
+        decoded = ExprTNode.from_bytes(tree.to_bytes())
+        assert decoded.to_bytes() == tree.to_bytes()
+
+    def test_compact(self):
+        tree = Parser().parse("x^2 + 1")
+        # header, two float constants and five opcodes
+        assert len(tree.to_bytes()) == 17 + 2 * 8 + 5
+
+    def test_pickle(self):
+        tree = Parser().parse("a*x + 2", params=['a'])
+        assert pickle.loads(pickle.dumps(tree)) == tree
+
+    def test_pickle_array_constant(self):
+        tree = ExprTNode(MulOperator(), ExprTNode(Operand(is_x=True)),
+                         ExprTNode(Operand(value=np.arange(3.0))))
+        copy = pickle.loads(pickle.dumps(tree))
+        assert np.array_equal(copy.right.key.value, np.arange(3.0))
+
+    def test_copy(self):
+        tree = Parser().parse("x^2 + 1")
+        shallow = copy.copy(tree)
+        assert shallow is not tree
+        assert shallow.left is tree.left and shallow.key is tree.key
+
+        deep = copy.deepcopy(tree)
+        assert deep == tree and deep.left is not tree.left
+
+
+@pytest.mark.unit
+class TestErrors(object):
+    def test_bad_magic(self):
+        data = bytearray(Parser().parse("x+1").to_bytes())
+        data[0:4] = b'XXXX'
+        with pytest.raises(SerializationError):
+            ExprTNode.from_bytes(bytes(data))
+
+    def test_truncated(self):
+        data = Parser().parse("x+1").to_bytes()
+        for n in [0, 5, len(data) - 1]:
+            with pytest.raises(SerializationError):
+                ExprTNode.from_bytes(data[:n])
+
+    def test_unknown_opcode(self):
+        data = bytearray(Parser().parse("x").to_bytes())
+        data[-1] = 200
+        with pytest.raises(SerializationError):
+            ExprTNode.from_bytes(bytes(data))
+
+    def test_incorrect_tree(self):
+        tree = ExprTNode(AddOperator(), left=ExprTNode(Operand(value=4.0)))
+        with pytest.raises(SerializationError):
+            tree.to_bytes()
+
+    def test_array_constant(self):
+        tree = ExprTNode(Operand(value=np.array([1.0, 2.0])))
+        with pytest.raises(SerializationError):
+            tree.to_bytes()
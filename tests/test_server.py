@@ -0,0 +1,296 @@
+import json
+import asyncio
+import pytest
+import numpy as np
+from plotter.server import *
+from plotter.services.parser import Parser
+from plotter.services.plotter import Plotter
+
+
+def body(**fields):
+    return json.dumps(fields).encode('utf-8')
+
+
+async def post(port, path, data, keep_alive=False):
+    """
+    Sends one request on a new connection and returns its status, headers
+    and body.
+    """
+
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f"POST {path} HTTP/1.1\r\nHost: localhost\r\n"
+                 f"Content-Length: {len(data)}\r\n"
+                 f"Connection: {'keep-alive' if keep_alive else 'close'}"
+                 f"\r\n\r\n".encode('latin-1') + data)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, content = response.partition(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    headers = dict(line.split(': ', 1) for line in lines[1:])
+    return int(lines[0].split()[1]), headers, content
+
+
+def serve(coroutine_function, **kwargs):
+    """
+    Runs a coroutine function with the port of a running server.
+    """
+
+    async def run():
+        server = PlotServer(**kwargs)
+        port = await server.start()
+        try:
+            return await coroutine_function(port)
+        finally:
+            await server.stop()
+
+    return asyncio.run(run())
+
+
+class CountingPlotter(Plotter):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def plot(self, tree, *args, **kwargs):
+        self.calls.append('plot')
+        return super().plot(tree, *args, **kwargs)
+
+    def plot_many(self, trees, *args, **kwargs):
+        self.calls.append(('plot_many', len(trees)))
+        return super().plot_many(trees, *args, **kwargs)
+
+
+@pytest.mark.unit
+class TestMakeJob(object):
+    def test_plot(self):
+        job = make_job('/plot', body(expression="x^2", x_min=-1, x_max=1))
+        assert job.kind == 'plot'
+        assert job.grid == (-1.0, 1.0, 1000)
+
+    def test_render_defaults(self):
+        job = make_job('/render', body(expression="x", x_min=0, x_max=1))
+        assert (job.width, job.height) == (640, 480)
+
+    def test_same_key(self):
+        a = make_job('/plot', body(expression="x", x_min=0, x_max=1))
+        b = make_job('/plot', body(x_max=1.0, x_min=0.0, expression="x"))
+        assert a.key == b.key
+
+    @pytest.mark.parametrize("path, data", [
+        ('/plot', b'not json'),
+        ('/plot', b'[1, 2]'),
+        ('/parse', body(expression=3)),
+        ('/plot', body(expression="x", x_min=0)),
+        ('/plot', body(expression="x", x_min=0, x_max=True)),
+        ('/plot', body(expression="x", x_min=0, x_max=1, points=1)),
+        ('/plot', body(expression="x", x_min=0, x_max=1, points=2.5)),
+        ('/render', body(expression="x", x_min=0, x_max=1, width=10 ** 6)),
+        ('/plot', body(expression="x", x_min=0, x_max=1, points=1e300)),
+        ('/plot', body(expression="x", x_min=10 ** 400, x_max=1)),
+    ])
+    def test_invalid(self, path, data):
+        with pytest.raises(ServerError) as info:
+            make_job(path, data)
+        assert info.value.status == 400
+
+    def test_unknown_path(self):
+        with pytest.raises(ServerError) as info:
+            make_job('/eval', body(expression="x"))
+        assert info.value.status == 404
+
+
+@pytest.mark.unit
+class TestRunBatch(object):
+    def test_parse(self):
+        jobs = [make_job('/parse', body(expression="x^2"))]
+        status, content_type, content = run_batch(jobs, Parser(),
+                                                  Plotter())[0]
+        assert status == 200
+        assert json.loads(content) == {'postfix': ['x', '2.0', '^'],
+                                       'nodes': 3}
+
+    def test_plot(self):
+        jobs = [make_job('/plot', body(expression="1/x", x_min=-1, x_max=1,
+                                       points=3))]
+        status, content_type, content = run_batch(jobs, Parser(),
+                                                  Plotter())[0]
+        assert status == 200
+        assert content_type == JSON_TYPE
+        assert json.loads(content) == {'x': [-1.0, 0.0, 1.0],
+                                       'y': [-1.0, None, 1.0]}
+
+    def test_render(self):
+        jobs = [make_job('/render', body(expression="x^2", x_min=-1, x_max=1,
+                                         width=100, height=80))]
+        status, content_type, content = run_batch(jobs, Parser(),
+                                                  Plotter())[0]
+        assert status == 200
+        assert content_type == PNG_TYPE
+        assert content.startswith(b'\x89PNG')
+
+    def test_dedup(self):
+        plotter = CountingPlotter()
+        data = body(expression="x^2", x_min=0, x_max=1, points=5)
+        jobs = [make_job('/plot', data) for _ in range(3)]
+        responses = run_batch(jobs, Parser(), plotter)
+        assert plotter.calls == ['plot']
+        assert responses[0] == responses[1] == responses[2]
+
+    def test_shared_grid(self):
+        plotter = CountingPlotter()
+        jobs = [make_job('/plot', body(expression=e, x_min=0, x_max=1,
+                                       points=5))
+                for e in ["x^2", "2*x", "x^2", "3"]]
+        jobs.append(make_job('/plot', body(expression="x", x_min=0, x_max=2,
+                                           points=5)))
+        responses = run_batch(jobs, Parser(), plotter)
+
+        assert sorted(plotter.calls, key=str) == [('plot_many', 3), 'plot']
+        assert json.loads(responses[1][2])['y'] == [0, 0.5, 1, 1.5, 2]
+        assert json.loads(responses[3][2])['y'] == [3, 3, 3, 3, 3]
+        assert json.loads(responses[4][2])['y'] == [0, 0.5, 1, 1.5, 2]
+
+    def test_errors(self):
+        jobs = [make_job('/plot', body(expression="x^", x_min=0, x_max=1)),
+                make_job('/plot', body(expression="x", x_min=1, x_max=0)),
+                make_job('/parse', body(expression="")),
+                make_job('/parse', body(expression="x"))]
+        statuses = [r[0] for r in run_batch(jobs, Parser(), Plotter())]
+        assert statuses == [400, 400, 400, 200]
+        assert 'error' in json.loads(run_batch(jobs[:1], Parser(),
+                                               Plotter())[0][2])
+
+    def test_batching_independent(self):
+        # alone on its grid an expression goes through plot(), shared
+        # through plot_many(), both must answer the same
+        alone = [make_job('/plot', body(expression="x^2", x_min=-1, x_max=1,
+                                        points=3)),
+                 make_job('/plot', body(expression="x+1/0", x_min=-2,
+                                        x_max=2, points=3))]
+        shared = [make_job('/plot', body(expression=e, x_min=-2, x_max=2,
+                                         points=3))
+                  for e in ["x^2", "x+1/0"]]
+        for jobs in (alone, shared):
+            responses = run_batch(jobs, Parser(), Plotter())
+            assert [r[0] for r in responses] == [200, 200]
+            assert json.loads(responses[1][2])['y'] == [None, None, None]
+
+    def test_unexpected_error(self):
+        class FailingPlotter(Plotter):
+            def plot(self, tree, x_min, x_max, *args, **kwargs):
+                if x_min == 5:
+                    raise RuntimeError("boom")
+                return super().plot(tree, x_min, x_max, *args, **kwargs)
+
+        jobs = [make_job('/plot', body(expression="x", x_min=0, x_max=1)),
+                make_job('/plot', body(expression="x", x_min=5, x_max=6))]
+        statuses = [r[0] for r in run_batch(jobs, Parser(),
+                                             FailingPlotter())]
+        assert statuses == [200, 500]
+
+    def test_render_error(self, monkeypatch):
+        import plotter.batch
+        render_png = plotter.batch.render_png
+
+        def failing(output, x, y, expression, *args):
+            if expression == "x":
+                raise RuntimeError("boom")
+            render_png(output, x, y, expression, *args)
+
+        monkeypatch.setattr(plotter.batch, 'render_png', failing)
+        jobs = [make_job('/render', body(expression=e, x_min=0, x_max=1,
+                                         width=100, height=80))
+                for e in ["x", "x^2"]]
+        responses = run_batch(jobs, Parser(), Plotter())
+        assert [r[0] for r in responses] == [500, 200]
+        assert responses[1][2].startswith(b'\x89PNG')
+
+
+@pytest.mark.unit
+class TestPlotServer(object):
+    def test_plot(self):
+        async def run(port):
+            return await post(port, '/plot', body(expression="2*x", x_min=0,
+                                                  x_max=1, points=3))
+
+        status, headers, content = serve(run)
+        assert status == 200
+        assert headers['Content-Type'] == JSON_TYPE
+        assert json.loads(content)['y'] == [0, 1, 2]
+
+    def test_errors(self):
+        async def run(port):
+            return [(await post(port, path, data))[0] for path, data in [
+                ('/nothing', b'{}'), ('/parse', b'{'),
+                ('/parse', b'x' * (MAX_BODY + 1))]]
+
+        assert serve(run) == [404, 400, 413]
+
+    def test_huge_numbers(self):
+        async def run(port):
+            return [(await post(port, '/plot', data))[0] for data in [
+                body(expression="x", x_min=0, x_max=1, points=1e300),
+                body(expression="x", x_min=10 ** 400, x_max=1)]]
+
+        assert serve(run) == [400, 400]
+
+    def test_method(self):
+        async def run(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b"GET /plot HTTP/1.0\r\n\r\n")
+            response = await reader.read()
+            writer.close()
+            return response
+
+        assert serve(run).startswith(b"HTTP/1.1 405")
+
+    def test_keep_alive(self):
+        async def run(port):
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            statuses = []
+            for expression in ["x", "x^2"]:
+                data = body(expression=expression)
+                writer.write(f"POST /parse HTTP/1.1\r\nContent-Length: "
+                             f"{len(data)}\r\n\r\n".encode('latin-1') + data)
+                status = (await reader.readline()).split()[1]
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line == b'\r\n':
+                        break
+                    if line.lower().startswith(b'content-length'):
+                        length = int(line.split(b':')[1])
+                await reader.readexactly(length)
+                statuses.append(int(status))
+            writer.close()
+            return statuses
+
+        assert serve(run) == [200, 200]
+
+    def test_concurrent(self):
+        async def run(port):
+            return await asyncio.gather(*[
+                post(port, '/plot', body(expression=f"x*{i % 4}", x_min=0,
+                                         x_max=1, points=3))
+                for i in range(16)])
+
+        responses = serve(run, workers=2, max_queue=16)
+        for i, (status, headers, content) in enumerate(responses):
+            assert status == 200
+            assert json.loads(content)['y'] == [0, (i % 4) / 2, i % 4]
+
+    def test_backpressure(self):
+        async def run(port):
+            return await asyncio.gather(*[
+                post(port, '/plot', body(expression=f"x^{i}", x_min=0,
+                                         x_max=1, points=10 ** 5))
+                for i in range(32)])
+
+        responses = serve(run, workers=1, max_queue=2, max_batch=1)
+        statuses = [status for status, headers, content in responses]
+        assert 503 in statuses and 200 in statuses
+        busy = [headers for status, headers, content in responses
+                if status == 503]
+        assert busy[0]['Retry-After'] == '1'
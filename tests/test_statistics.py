@@ -0,0 +1,87 @@
+import pytest
+import numpy as np
+from plotter.services.statistics import *
+
+
+def reduce(x, y, chunk_size):
+    stats = StreamingStats()
+    for start in range(0, len(x), chunk_size):
+        stats.update(x[start:start+chunk_size], y[start:start+chunk_size])
+    return stats
+
+
+@pytest.mark.unit
+class TestStreamingStats(object):
+    @pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1000])
+    def test_chunking_doesnt_matter(self, chunk_size):
+        x = np.linspace(-1, 2, 101)
+        y = np.sin(3 * x)
+        stats = reduce(x, y, chunk_size)
+        whole = reduce(x, y, len(x))
+
+        assert stats.count == 101
+        assert stats.min == y.min() and stats.argmin == x[np.argmin(y)]
+        assert stats.max == y.max() and stats.argmax == x[np.argmax(y)]
+        assert np.isclose(stats.mean, y.mean())
+        assert np.isclose(stats.trapezoid, np.trapezoid(y, x))
+        assert np.isclose(stats.simpson, whole.simpson)
+
+    @pytest.mark.parametrize("n", [3, 5, 51])
+    def test_simpson_exact_for_cubics(self, n):
+        x = np.linspace(0, 2, n)
+        y = x ** 3 - x
+        assert np.isclose(reduce(x, y, 4).simpson, 2.0, rtol=0, atol=1e-12)
+
+    @pytest.mark.parametrize("n", [4, 6, 50])
+    def test_simpson_odd_intervals(self, n):
+        x = np.linspace(0, 2, n)
+        # the last interval is closed with a quadratic
+        y = 3 * x ** 2 - x
+        assert np.isclose(reduce(x, y, 4).simpson, 6.0, rtol=0, atol=1e-12)
+
+    def test_simpson_non_uniform(self):
+        x = np.sort(np.random.default_rng(0).uniform(0, 1, 41))
+        x[0], x[-1] = 0, 1
+        stats = reduce(x, x ** 2, 5)
+        assert np.isclose(stats.simpson, 1 / 3, rtol=0, atol=1e-12)
+
+    def test_simpson_converges(self):
+        x = np.linspace(0, 2, 1001)
+        stats = reduce(x, np.exp(x), 64)
+        assert abs(stats.simpson - (np.e ** 2 - 1)) < 1e-11
+        assert abs(stats.trapezoid - (np.e ** 2 - 1)) > 1e-7
+
+    def test_non_finite(self):
+        x = np.linspace(0, 1, 6)
+        y = np.array([1.0, np.nan, -np.inf, 5.0, -2.0, np.nan])
+        stats = reduce(x, y, 2)
+
+        assert stats.nan_count == 2 and stats.inf_count == 1
+        assert stats.finite_count == 3
+        assert stats.min == -2 and stats.argmin == x[4]
+        assert stats.max == 5 and stats.argmax == x[3]
+        assert np.isclose(stats.mean, 4 / 3)
+        assert np.isnan(stats.trapezoid) and np.isnan(stats.simpson)
+
+    def test_empty(self):
+        stats = StreamingStats()
+        assert np.isnan(stats.mean) and np.isnan(stats.min)
+        assert np.isnan(stats.simpson)
+        assert stats.y_limits() is None
+
+    def test_summary(self):
+        x = np.linspace(0, 1, 10)
+        stats = reduce(x, x ** 2, 3)
+        restored = StreamingStats.from_summary(stats.summary())
+
+        assert restored.count == 10 and restored.finite_count == 10
+        assert restored.min == stats.min and restored.argmax == stats.argmax
+        assert restored.mean == stats.mean
+        assert restored.trapezoid == stats.trapezoid
+        assert restored.simpson == stats.simpson
+
+    def test_y_limits(self):
+        x = np.linspace(0, 1, 10)
+        assert np.allclose(reduce(x, x, 3).y_limits(0.1), (-0.1, 1.1))
+        low, high = reduce(x, np.zeros(10), 3).y_limits()
+        assert low < 0 < high